@@ -1,28 +1,635 @@
-"""Minimal stub of the ``chromadb`` package."""
+"""Minimal stub of the ``chromadb`` package.
 
-class _DummyCollection:  # pragma: no cover - simple in-memory stub
-    def __init__(self):
-        self.items = {}
+The collection keeps its embeddings in a contiguous ``float32`` matrix with
+ids and metadatas in parallel lists, so ``query`` is a single matrix product
+instead of a Python loop and retrieval code can be exercised end to end.
+
+Storage is split into a hot part scanned by every query (the 64-byte aligned
+embedding matrix and its precomputed row norms) and a cold part that is only
+touched for the final top-k rows (ids and metadatas).  Hot buffers grow by
+doubling, so adding one row at a time stays amortised O(1).  The exact scan
+walks the matrix in row tiles, normalising each tile with the stored norms and
+folding it into a running top-k, so it never materialises the full
+``(N, n_queries)`` similarity matrix.  With ``numba`` installed a single query
+instead runs one fused parallel kernel that also indexes filtered rows in place
+rather than gathering them.  Collections created with
+``metadata={"quantization": "sq8"}`` additionally keep int8 codes with a
+per-row scale; queries scan the codes and re-rank the best candidates on the
+float32 rows.
+
+``metadata={"scan": "panorama"}`` keeps a rotated copy of the unit rows in
+an orthogonal basis ordered by energy (uncentred PCA), stored level-major:
+one contiguous block of columns per level plus the norm of everything after
+it.  A query accumulates similarity level by level and drops rows whose upper
+bound can no longer reach the current top-k, so results stay exact while
+embeddings whose energy decays quickly touch only a fraction of the matrix.
+The basis is refitted as the collection grows until it has seen
+``min(N, dim)`` rows, and new rows are rotated lazily at query time.
+
+``metadata={"index": "hnsw"}`` answers unfiltered queries from an approximate
+usearch HNSW graph when ``usearch`` is installed, and falls back to the exact
+scan otherwise.  The graph is fed lazily at query time and rebuilt after
+deletes or overwrites.
+
+``PersistentClient(path)`` returns one shared client per resolved path, so
+every agent opened on the same path sees the same collections, as it would
+with the on-disk store.  Without a path each call gets a private client.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+try:
+    from usearch.index import Index as _HNSWIndex, MetricKind as _MetricKind
+
+    USEARCH_AVAILABLE = True
+except ImportError:
+    USEARCH_AVAILABLE = False
+
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+_ALIGNMENT = 64  # one cache line
+
+
+def _aligned_empty(shape, dtype=np.float32, alignment=_ALIGNMENT):
+    """Allocate an uninitialised array whose data starts on a cache line."""
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buf = np.empty(nbytes + alignment, dtype=np.uint8)
+    offset = (-buf.ctypes.data) % alignment
+    return buf[offset : offset + nbytes].view(dtype).reshape(shape)
+
+
+def _matches(metadata, where):
+    """Return ``True`` if ``metadata`` satisfies a flat equality filter."""
+    if not where:
+        return True
+    return all(metadata.get(key) == value for key, value in where.items())
+
+
+def _quantize(vectors):
+    """Scalar-quantise rows to int8 codes with one float32 scale per row."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _top_k(scores, k):
+    """Indices of the ``k`` largest ``scores``, best first."""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _fit_rotation(unit_rows):
+    """Orthogonal basis of ``unit_rows`` ordered by decreasing energy."""
+    sample = unit_rows.astype(np.float64)
+    # eigenvectors of the (dim, dim) Gram matrix; always a full square basis
+    eigvals, eigvecs = np.linalg.eigh(sample.T @ sample)
+    order = np.argsort(eigvals)[::-1]
+    return np.ascontiguousarray(eigvecs[:, order], dtype=np.float32)
+
+
+def _unit(rows):
+    """L2-normalise ``rows``; zero rows stay zero."""
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    return np.divide(rows, norms, out=np.zeros_like(rows), where=norms > 0)
+
+
+if NUMBA_AVAILABLE:
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_kernel(matrix, norms, q_unit, rows, n_rows):
+        """Cosine of one unit query against ``rows`` (the first ``n_rows``
+        rows when ``rows`` is empty), reading the matrix in place."""
+        out = np.empty(n_rows, dtype=np.float32)
+        for p in numba.prange(n_rows):
+            i = np.intp(p) if rows.shape[0] == 0 else np.intp(rows[p])
+            s = np.float32(0.0)
+            for j in range(matrix.shape[1]):
+                s += matrix[i, j] * q_unit[j]
+            out[p] = s / norms[i] if norms[i] > 0 else np.float32(0.0)
+        return out
+
+
+def _grow(buf, size, width, dtype):
+    """Return ``buf`` or an aligned copy with room for ``size`` rows.
+
+    Capacity doubles on overflow so a run of single-row appends costs
+    amortised O(1) copies per row.
+    """
+    shape = () if width is None else (width,)
+    if buf is not None and buf.shape[0] >= size and buf.shape[1:] == shape:
+        return buf
+    capacity = max(size, 16 if buf is None else 2 * buf.shape[0])
+    grown = _aligned_empty((capacity,) + shape, dtype)
+    if buf is not None and buf.shape[1:] == shape:
+        grown[: buf.shape[0]] = buf
+    return grown
+
+
+class _DummyCollection:
+    # SQ8 mode scans this many candidates per requested result before the
+    # exact float32 re-rank.
+    RERANK_FACTOR = 4
+    # SQ8 mode upcasts this many code rows per BLAS call.
+    SCAN_BLOCK = 1024
+    # The exact scan keeps at most this many rows of similarities alive.
+    TOPK_BLOCK = 4096
+    # Panorama mode splits the rotated dimensions into this many levels and
+    # fits the basis on at most this many rows.
+    PANORAMA_LEVELS = 8
+    PANORAMA_FIT_ROWS = 4096
+    # HNSW graph parameters for ``{"index": "hnsw"}``.
+    HNSW_CONNECTIVITY = 24
+    HNSW_EXPANSION_ADD = 128
+    HNSW_EXPANSION_SEARCH = 100
+
+    def __init__(self, name=None, metadata=None):
+        self.name = name
+        self.metadata = metadata or {}
+        # ``{"quantization": "sq8"}`` scans int8 codes and re-ranks on float32
+        self.quantized = self.metadata.get("quantization") == "sq8"
+        # hot: capacity-doubling aligned buffers, the first ``_size`` rows valid
+        self._size = 0
+        self._dim = 0
+        self._embeddings = None  # (cap, dim) float32
+        self._norms = None  # (cap,) L2 norm per row
+        self._codes = None  # (cap, dim) int8, SQ8 mode only
+        self._scales = None  # (cap,) float32, SQ8 mode only
+        # ``{"scan": "panorama"}`` prunes rows level by level during the scan
+        self.panorama = self.metadata.get("scan") == "panorama"
+        self._rotation = None  # (dim, dim) orthogonal basis
+        self._fit_rows = 0  # rows the basis was fitted on
+        self._rotated_rows = 0  # leading rows whose rotated copy is current
+        self._level_bounds = []  # [(start, stop)] column range per level
+        self._levels = []  # per level: (cap, width) contiguous float32 block
+        self._tails = []  # per level: (cap,) norm of the columns after it
+        # (partial products computed, exhaustive count) for the last query
+        self.last_scan = (0, 0)
+        # ``{"index": "hnsw"}`` uses usearch when it is installed
+        self.hnsw = self.metadata.get("index") == "hnsw" and USEARCH_AVAILABLE
+        self._hnsw_index = None
+        self._hnsw_rows = 0  # leading rows already in the graph
+        # cold: gathered only for the returned rows
+        self.ids = []
+        self.metas = []
+        self._index = {}  # id -> row
+
+    # Views of the valid rows; slicing never copies.
+    @property
+    def embeddings(self):
+        return None if self._embeddings is None else self._embeddings[: self._size]
+
+    @property
+    def norms(self):
+        return None if self._norms is None else self._norms[: self._size]
+
+    @property
+    def codes(self):
+        return None if self._codes is None else self._codes[: self._size]
+
+    @property
+    def scales(self):
+        return None if self._scales is None else self._scales[: self._size]
+
+    @property
+    def dim(self):
+        """Embedding dimension, or ``None`` until a vector has been added."""
+        return self._dim or None
+
+    def _as_batch(self, embeddings, n):
+        """Validate ``embeddings`` against ``n`` ids and the collection dim."""
+        if embeddings is None:
+            return None
+        batch = np.asarray(embeddings, dtype=np.float32)
+        if batch.ndim == 1 and n == 1:
+            batch = batch.reshape(1, -1)
+        if batch.ndim != 2 or batch.shape[0] != n:
+            raise ValueError(
+                f"expected {n} embeddings (one per id), got shape {batch.shape}"
+            )
+        if self.dim is not None and batch.shape[1] != self.dim:
+            raise ValueError(
+                f"embedding dimension {batch.shape[1]} does not match "
+                f"collection dimension {self.dim}"
+            )
+        return batch
+
+    def _write_rows(self, rows, batch):
+        """Write ``batch`` into ``rows`` of every hot buffer."""
+        self._embeddings[rows] = batch
+        self._norms[rows] = np.linalg.norm(batch, axis=1)
+        if self.quantized:
+            self._codes[rows], self._scales[rows] = _quantize(batch)
+        first = rows.start if isinstance(rows, slice) else min(rows)
+        self._rotated_rows = min(self._rotated_rows, first)
+        if first < self._hnsw_rows:
+            self._hnsw_index = None
+
+    def _append_rows(self, batch):
+        """Append ``batch`` to every hot buffer."""
+        start, size = self._size, self._size + batch.shape[0]
+        self._norms = _grow(self._norms, size, None, np.float32)
+        if self.quantized:
+            self._scales = _grow(self._scales, size, None, np.float32)
+        if batch.shape[1] == 0:
+            # metadata-only rows before any vector: nothing to store yet
+            self._norms[start:size] = 0.0
+            self._size = size
+            return
+
+        widen = self._dim != batch.shape[1]
+        self._dim = batch.shape[1]
+        self._embeddings = _grow(self._embeddings, size, self._dim, np.float32)
+        if self.quantized:
+            self._codes = _grow(self._codes, size, self._dim, np.int8)
+        if widen and start:
+            # earlier metadata-only rows become zero vectors
+            self._embeddings[:start] = 0.0
+            if self.quantized:
+                self._codes[:start] = 0
+                self._scales[:start] = 1.0
+        self._write_rows(slice(start, size), batch)
+        self._size = size
 
     def add(self, embeddings=None, metadatas=None, ids=None, **kwargs):
-        self.items.update({i: m for i, m in zip(ids or [], metadatas or [])})
+        """Add rows; an id that already exists is overwritten in place.
+
+        Without ``embeddings`` only the metadata is stored (or updated); new
+        rows then hold a zero vector, i.e. distance 1 to every query.
+        """
+        ids = list(ids or [])
+        if not ids:
+            return
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in ids]
+        if len(metadatas) != len(ids):
+            raise ValueError(
+                f"expected {len(ids)} metadatas (one per id), got {len(metadatas)}"
+            )
+        batch = self._as_batch(embeddings, len(ids))
+
+        # the last occurrence of an id wins, as with repeated add() calls
+        latest = {doc_id: pos for pos, doc_id in enumerate(ids)}
+        updated = [(self._index[i], p) for i, p in latest.items() if i in self._index]
+        fresh = [p for i, p in latest.items() if i not in self._index]
+
+        for row, pos in updated:
+            self.metas[row] = metadatas[pos]
+        if updated and batch is not None:
+            rows, positions = zip(*updated)
+            self._write_rows(list(rows), batch[list(positions)])
+
+        if fresh:
+            if len(fresh) == len(ids):
+                # common case: every id is new, so no per-row gathering
+                new_ids, new_metas, new = ids, metadatas, batch
+            else:
+                new_ids = [ids[p] for p in fresh]
+                new_metas = [metadatas[p] for p in fresh]
+                new = None if batch is None else batch[fresh]
+            if new is None:
+                new = np.zeros((len(fresh), self._dim), dtype=np.float32)
+            self._append_rows(new)
+            start = len(self.ids)
+            self._index.update(zip(new_ids, range(start, start + len(new_ids))))
+            self.ids.extend(new_ids)
+            self.metas.extend(new_metas)
+
+    def _cosine(self, rows, queries, q_norms):
+        """Exact cosine similarity of ``rows`` (all when ``None``), (N, Q)."""
+        if rows is None:
+            matrix, norms = self.embeddings, self.norms
+        else:
+            matrix, norms = self._embeddings[rows], self._norms[rows]
+        sims = matrix @ queries.T
+        denom = np.outer(norms, q_norms)
+        return np.divide(sims, denom, out=np.zeros_like(sims), where=denom > 0)
+
+    def _exact_search(self, rows, queries, k):
+        """Exact top-k cosine search over ``rows`` (all when ``None``).
+
+        Rows are read ``TOPK_BLOCK`` at a time for all queries at once; each
+        tile is scaled by its reciprocal row norms and merged into the running
+        top-k, so peak memory is O(TOPK_BLOCK * Q) rather than O(N * Q).
+        Returns one ``(row_indices, similarities)`` pair per query.
+        """
+        n_rows = self._size if rows is None else len(rows)
+        n_queries = queries.shape[0]
+        if NUMBA_AVAILABLE and n_queries == 1 and k > 0:
+            # one fused pass: dot product, norm division and, for filtered
+            # queries, row selection without gathering a copy of the rows
+            selected = np.empty(0, np.intp) if rows is None else rows.astype(np.intp)
+            sims = _cosine_kernel(
+                self._embeddings, self._norms, _unit(queries)[0], selected, n_rows
+            )
+            top = _top_k(sims, k)
+            return [(top if rows is None else selected[top], sims[top])]
+
+        q_unit = np.ascontiguousarray(_unit(queries).T)
+        best = np.empty((n_queries, 0), dtype=np.float32)
+        best_rows = np.empty((n_queries, 0), dtype=np.intp)
+        for lo in range(0, n_rows if k > 0 else 0, self.TOPK_BLOCK):
+            hi = min(lo + self.TOPK_BLOCK, n_rows)
+            if rows is None:
+                tile_rows = np.arange(lo, hi)
+                tile, norms = self._embeddings[lo:hi], self._norms[lo:hi]
+            else:
+                tile_rows = rows[lo:hi].astype(np.intp)
+                tile, norms = self._embeddings[tile_rows], self._norms[tile_rows]
+            inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+            sims = tile @ q_unit
+            sims *= inv[:, None]
+
+            scores = np.hstack([best, sims.T])
+            candidates = np.hstack(
+                [best_rows, np.broadcast_to(tile_rows, (n_queries, hi - lo))]
+            )
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                candidates = np.take_along_axis(candidates, keep, axis=1)
+            best, best_rows = scores, candidates
+
+        order = np.argsort(-best, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [(best_rows[col], best[col]) for col in range(n_queries)]
+
+    def _sync_rotation(self):
+        """(Re)fit the Panorama basis if needed and rotate pending rows."""
+        target = min(self._size, self._dim)
+        if self._rotation is None or (
+            self._fit_rows < target and self._size >= 2 * self._fit_rows
+        ):
+            self._rotation = _fit_rotation(
+                _unit(self.embeddings[: self.PANORAMA_FIT_ROWS])
+            )
+            self._fit_rows = self._size
+            self._rotated_rows = 0
+            n_levels = min(self.PANORAMA_LEVELS, self._dim)
+            edges = np.linspace(0, self._dim, n_levels + 1).astype(int)
+            self._level_bounds = list(zip(edges[:-1], edges[1:]))
+            self._levels = [None] * n_levels
+            self._tails = [None] * n_levels
+
+        start, size = self._rotated_rows, self._size
+        if start == size:
+            return
+        for level, (a, b) in enumerate(self._level_bounds):
+            self._levels[level] = _grow(self._levels[level], size, b - a, np.float32)
+            self._tails[level] = _grow(self._tails[level], size, None, np.float32)
+        for lo in range(start, size, self.SCAN_BLOCK):
+            hi = min(lo + self.SCAN_BLOCK, size)
+            rotated = _unit(self._embeddings[lo:hi]) @ self._rotation
+            remaining = np.square(rotated).sum(axis=1)
+            for level, (a, b) in enumerate(self._level_bounds):
+                self._levels[level][lo:hi] = rotated[:, a:b]
+                remaining -= np.square(rotated[:, a:b]).sum(axis=1)
+                self._tails[level][lo:hi] = np.sqrt(np.maximum(remaining, 0.0))
+        self._rotated_rows = size
+
+    def _panorama_search(self, rows, queries, q_norms, k):
+        """Exact top-k cosine search with level-wise bound pruning.
+
+        Returns one ``(row_indices, similarities)`` pair per query.
+        """
+        self._sync_rotation()
+        n_rows = self._size if rows is None else len(rows)
+        q = _unit(queries) @ self._rotation
+        q_tails = []
+        remaining = np.square(q).sum(axis=1)
+        for a, b in self._level_bounds:
+            remaining = remaining - np.square(q[:, a:b]).sum(axis=1)
+            q_tails.append(np.sqrt(np.maximum(remaining, 0.0)))
+
+        # the first level is read for every row, contiguously and for all
+        # queries at once; later levels only gather the surviving rows, or
+        # the query falls back to the exact matmul when few were pruned
+        a, b = self._level_bounds[0]
+        if rows is None:
+            first = self._levels[0][: self._size]
+            first_tail = self._tails[0][: self._size]
+        else:
+            first, first_tail = self._levels[0][rows], self._tails[0][rows]
+        first_partial = first @ q[:, a:b].T
+
+        computed = n_rows * queries.shape[0]
+        found = [None] * queries.shape[0]
+        unpruned = []  # queries where the first level pruned too little
+        for col in range(queries.shape[0]):
+            alive = np.arange(n_rows) if rows is None else rows.astype(np.intp)
+            partial = first_partial[:, col]
+            tail = first_tail
+            for level in range(len(self._level_bounds)):
+                if level:
+                    if 2 * len(alive) > n_rows:
+                        # energy does not decay fast enough for this query;
+                        # a plain matmul is cheaper than gathering rows
+                        unpruned.append(col)
+                        break
+                    a, b = self._level_bounds[level]
+                    partial = partial + self._levels[level][alive] @ q[col, a:b]
+                    tail = self._tails[level][alive]
+                    computed += len(alive)
+                if len(alive) > k and q_norms[col] > 0:
+                    slack = tail * q_tails[level][col]
+                    # k-th best lower bound: rows whose upper bound falls
+                    # below it cannot make the final top-k
+                    threshold = np.partition(partial - slack, len(alive) - k)[-k]
+                    keep = partial + slack >= threshold
+                    alive, partial = alive[keep], partial[keep]
+            else:
+                top = _top_k(partial, k)
+                found[col] = (alive[top], partial[top])
+
+        if unpruned:
+            exact = self._exact_search(rows, queries[unpruned], k)
+            levels = len(self._level_bounds)
+            computed += len(unpruned) * n_rows * (levels - 1)
+            for col, hit in zip(unpruned, exact):
+                found[col] = hit
+
+        self.last_scan = (
+            computed,
+            n_rows * queries.shape[0] * len(self._level_bounds),
+        )
+        return found
 
-    def query(self, *_, **__):
-        return {"ids": [[]], "metadatas": [[]], "distances": [[]]}
+    def _hnsw_search(self, queries, k):
+        """Approximate top-k cosine search over the usearch HNSW graph.
 
-    def get(self, **__):
-        return {"ids": list(self.items.keys()), "metadatas": list(self.items.values())}
+        Returns one ``(row_indices, similarities)`` pair per query.
+        """
+        if self._hnsw_index is None:
+            self._hnsw_index = _HNSWIndex(
+                ndim=self._dim,
+                metric=_MetricKind.Cos,
+                connectivity=self.HNSW_CONNECTIVITY,
+                expansion_add=self.HNSW_EXPANSION_ADD,
+                expansion_search=self.HNSW_EXPANSION_SEARCH,
+            )
+            self._hnsw_rows = 0
+        if self._hnsw_rows < self._size:
+            # graph keys are row numbers
+            keys = np.arange(self._hnsw_rows, self._size, dtype=np.uint64)
+            self._hnsw_index.add(keys, self._embeddings[self._hnsw_rows : self._size])
+            self._hnsw_rows = self._size
+
+        matches = self._hnsw_index.search(queries, k)
+        if not hasattr(matches, "counts"):
+            # a single query comes back as Matches with 1-D keys/distances
+            # rather than BatchMatches; lift it to the batch layout
+            keys = np.asarray(matches.keys).reshape(1, -1)
+            distances = np.asarray(matches.distances).reshape(1, -1)
+            counts = [keys.shape[1]]
+        else:
+            keys, distances, counts = matches.keys, matches.distances, matches.counts
+        found = []
+        for col in range(queries.shape[0]):
+            count = int(counts[col])
+            rows = keys[col, :count].astype(np.intp)
+            found.append((rows, 1.0 - distances[col, :count]))
+        return found
+
+    def _approx_cosine(self, rows, queries, q_norms):
+        """Cosine similarity estimated from the int8 codes, (N, Q).
+
+        The codes are upcast ``SCAN_BLOCK`` rows at a time into one reused
+        float32 block so the product runs through BLAS without ever widening
+        the whole code matrix.  float32 holds integer sums exactly up to
+        2**24, i.e. every int8 dot product for dim <= 1040; beyond that the
+        rounding is far below the quantisation error.
+        """
+        if rows is None:
+            codes, scales, norms = self.codes, self.scales, self.norms
+        else:
+            codes = self._codes[rows]
+            scales, norms = self._scales[rows], self._norms[rows]
+        q_codes, q_scales = _quantize(queries)
+        q_block = q_codes.T.astype(np.float32)
+
+        dots = np.empty((codes.shape[0], queries.shape[0]), dtype=np.float32)
+        block = np.empty(
+            (min(self.SCAN_BLOCK, codes.shape[0]), codes.shape[1]), dtype=np.float32
+        )
+        for start in range(0, codes.shape[0], self.SCAN_BLOCK):
+            chunk = codes[start : start + self.SCAN_BLOCK]
+            upcast = block[: chunk.shape[0]]
+            upcast[...] = chunk
+            np.matmul(upcast, q_block, out=dots[start : start + chunk.shape[0]])
+
+        dots *= np.outer(scales, q_scales)
+        denom = np.outer(norms, q_norms)
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def query(self, query_embeddings=None, n_results=10, where=None, **__):
+        if query_embeddings is None:
+            return {"ids": [[]], "metadatas": [[]], "distances": [[]]}
+
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        n_queries = queries.shape[0]
+        if self.dim is None:
+            return {
+                "ids": [[] for _ in range(n_queries)],
+                "metadatas": [[] for _ in range(n_queries)],
+                "distances": [[] for _ in range(n_queries)],
+            }
+
+        # ``rows`` is None for an unfiltered scan, which then reads the hot
+        # buffers in place instead of gathering a copy
+        rows = None
+        n_rows = self._size
+        if where:
+            rows = np.array(
+                [i for i, m in enumerate(self.metas) if _matches(m, where)],
+                dtype=np.uint32,
+            )
+            n_rows = len(rows)
+
+        def row_ids(positions):
+            return positions if rows is None else rows[positions]
+
+        q_norms = np.linalg.norm(queries, axis=1)
+        k = min(n_results, n_rows)
+        found = None  # per-query (rows, similarities); SQ8 re-ranks below
+        if self.hnsw and rows is None and k:
+            found = self._hnsw_search(queries, k)
+        elif self.quantized:
+            approx = self._approx_cosine(rows, queries, q_norms)
+            n_candidates = min(n_rows, k * self.RERANK_FACTOR)
+        elif self.panorama:
+            found = self._panorama_search(rows, queries, q_norms, k)
+        else:
+            found = self._exact_search(rows, queries, k)
+
+        result = {"ids": [], "metadatas": [], "distances": []}
+        for col in range(n_queries):
+            if found is not None:
+                picked, best = found[col]
+            elif self.quantized:
+                candidates = row_ids(_top_k(approx[:, col], n_candidates))
+                scores = self._cosine(
+                    candidates, queries[col : col + 1], q_norms[col : col + 1]
+                )[:, 0]
+                top = _top_k(scores, k)
+                picked, best = candidates[top], scores[top]
+            result["ids"].append([self.ids[i] for i in picked])
+            result["metadatas"].append([self.metas[i] for i in picked])
+            result["distances"].append((1.0 - best).tolist())
+        return result
+
+    def get(self, ids=None, where=None, limit=None, include=None, **__):
+        if ids is not None:
+            rows = [self._index[i] for i in ids if i in self._index]
+        else:
+            rows = [i for i in range(len(self.ids)) if _matches(self.metas[i], where)]
+        if limit is not None:
+            rows = rows[:limit]
+        has_vectors = rows and self._embeddings is not None
+        embeddings = list(self._embeddings[rows]) if has_vectors else []
+        return {
+            "ids": [self.ids[i] for i in rows],
+            "metadatas": [self.metas[i] for i in rows],
+            "embeddings": embeddings,
+        }
 
     def count(self):
-        return len(self.items)
+        return len(self.ids)
 
     def delete(self, ids=None):
-        for i in ids or []:
-            self.items.pop(i, None)
+        doomed = set(ids or [])
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in doomed]
+        if len(keep) == len(self.ids):
+            return
+        # rows before the first deleted one do not move
+        keep_from = next(
+            (row for row, kept in enumerate(keep) if row != kept), len(keep)
+        )
+        self.ids = [self.ids[i] for i in keep]
+        self.metas = [self.metas[i] for i in keep]
+        self._index = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._rotated_rows = min(self._rotated_rows, keep_from)
+        if keep_from < self._hnsw_rows:
+            self._hnsw_index = None
+        # compact in place; the buffers keep their capacity and alignment
+        for buf in (self._embeddings, self._norms, self._codes, self._scales):
+            if buf is not None:
+                buf[: len(keep)] = buf[keep]
+        self._size = len(keep)
 
 
-class PersistentClient:  # pragma: no cover - simple stub
-    def __init__(self, *_, **__):
+class _Client:
+    def __init__(self):
         self.collections = {}
 
     def get_collection(self, name, *_args, **_kwargs):
@@ -30,10 +637,34 @@ class PersistentClient:  # pragma: no cover - simple stub
             raise Exception("collection not found")
         return self.collections[name]
 
-    def create_collection(self, name, *_args, **_kwargs):
-        col = _DummyCollection()
+    def create_collection(self, name, *_args, metadata=None, **_kwargs):
+        col = _DummyCollection(name, metadata)
         self.collections[name] = col
         return col
 
     def delete_collection(self, name, *_args, **_kwargs):
         self.collections.pop(name, None)
+
+
+_clients = {}  # resolved path -> shared _Client
+_clients_lock = threading.Lock()
+
+
+def PersistentClient(path=None, *_args, **_kwargs):
+    """Return the client for ``path``, shared by everyone opening that path.
+
+    Clients are never evicted: they hold the only copy of their collections.
+    """
+    if path is None:
+        return _Client()
+    key = os.path.realpath(os.fspath(path))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _Client()
+        return client
+
+
+def EphemeralClient(*_args, **_kwargs):
+    """Return a new in-memory client that is not shared with anyone."""
+    return _Client()
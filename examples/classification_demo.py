@@ -3,10 +3,12 @@
 展示如何使用分类器进行智能文档分类
 """
 
+import contextlib
+import functools
+import io
 import sys
 from pathlib import Path
 import logging
-import yaml
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent
@@ -16,6 +18,23 @@ from ods.classifiers.classifier import DocumentClassifier
 from ods.classifiers.retrieval_agent import RetrievalAgent
 from ods.classifiers.llm_classifier import LLMClassifier
 from ods.classifiers.rule_checker import RuleChecker
+from ods.utils.file_utils import load_yaml_cached
+
+
+def buffered_output(func):
+    """收集演示函数的输出，结束时一次性写到标准输出"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                return func(*args, **kwargs)
+        finally:
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
+
+    return wrapper
 
 
 def setup_logging():
@@ -35,14 +54,14 @@ def load_config():
         return None
 
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-        return config
+        # 解析结果按 mtime 缓存为 JSON，重复运行时跳过 YAML 解析
+        return load_yaml_cached(config_path)
     except Exception as e:
         print(f"配置文件加载失败: {e}")
         return None
 
 
+@buffered_output
 def demo_retrieval_agent():
     """演示检索代理"""
     print("\n=== 检索代理演示 ===")
@@ -68,6 +87,7 @@ def demo_retrieval_agent():
         print(f"检索代理演示失败: {e}")
 
 
+@buffered_output
 def demo_llm_classifier():
     """演示LLM分类器"""
     print("\n=== LLM分类器演示 ===")
@@ -97,6 +117,7 @@ def demo_llm_classifier():
     print("\n注意: 实际使用需要设置有效的API密钥")
 
 
+@buffered_output
 def demo_rule_checker():
     """演示规则检查器"""
     print("\n=== 规则检查器演示 ===")
@@ -132,6 +153,7 @@ def demo_rule_checker():
         print(f"规则检查器演示失败: {e}")
 
 
+@buffered_output
 def demo_document_classifier():
     """演示文档分类器"""
     print("\n=== 文档分类器演示 ===")
@@ -189,6 +211,7 @@ def demo_document_classifier():
         print(f"文档分类器演示失败: {e}")
 
 
+@buffered_output
 def demo_classification_workflow():
     """演示分类工作流"""
     print("\n=== 分类工作流演示 ===")
@@ -209,6 +232,7 @@ def demo_classification_workflow():
     print("  - 完整的审计和回滚机制")
 
 
+@buffered_output
 def demo_advanced_features():
     """演示高级功能"""
     print("\n=== 高级功能演示 ===")
@@ -228,6 +252,7 @@ def demo_advanced_features():
     print("  - 多语言支持")
 
 
+@buffered_output
 def demo_integration():
     """演示系统集成"""
     print("\n=== 系统集成演示 ===")
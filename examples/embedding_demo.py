@@ -3,11 +3,13 @@
 展示如何使用嵌入生成器处理文档
 """
 
+import contextlib
+import functools
+import io
 import sys
 import os
 from pathlib import Path
 import logging
-import yaml
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent
@@ -16,6 +18,23 @@ sys.path.insert(0, str(project_root))
 from ods.embeddings.embedder import Embedder
 from ods.embeddings.text_processor import TextProcessor
 from ods.embeddings.models import EmbeddingModelFactory
+from ods.utils.file_utils import load_yaml_cached
+
+
+def buffered_output(func):
+    """收集演示函数的输出，结束时一次性写到标准输出"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                return func(*args, **kwargs)
+        finally:
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
+
+    return wrapper
 
 
 def setup_logging():
@@ -35,14 +54,14 @@ def load_config():
         return None
 
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-        return config
+        # 解析结果按 mtime 缓存为 JSON，重复运行时跳过 YAML 解析
+        return load_yaml_cached(config_path)
     except Exception as e:
         print(f"配置文件加载失败: {e}")
         return None
 
 
+@buffered_output
 def demo_text_processor():
     """演示文本处理器"""
     print("\n=== 文本处理器演示 ===")
@@ -90,6 +109,7 @@ def demo_text_processor():
     print(f"文本统计: {stats}")
 
 
+@buffered_output
 def demo_embedding_models():
     """演示嵌入模型"""
     print("\n=== 嵌入模型演示 ===")
@@ -123,6 +143,7 @@ def demo_embedding_models():
     print(f"  {api_config}")
 
 
+@buffered_output
 def demo_embedder():
     """演示嵌入生成器"""
     print("\n=== 嵌入生成器演示 ===")
@@ -157,6 +178,7 @@ def demo_embedder():
     print("  或者使用API模型: pip install openai")
 
 
+@buffered_output
 def demo_workflow_integration():
     """演示工作流集成"""
     print("\n=== 工作流集成演示 ===")
@@ -11,28 +11,33 @@
 
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import json
 
+import numpy as np
+
 from ods.storage.index_updater import IndexUpdater
 
+# 临时目录在后台删除，不阻塞后续演示；main 结束前等待删除完成
+_cleanup_pool = ThreadPoolExecutor(max_workers=2)
 
-def demo_basic_index_update():
-    """演示基本的索引更新操作"""
-    print("=== 基本索引更新演示 ===")
 
-    # 创建临时配置
-    temp_dir = tempfile.mkdtemp()
-    config = {
+def _make_config(temp_dir: str, *, in_memory: bool = True) -> dict:
+    """演示用配置；in_memory 时 SQLite 和向量库都只在内存中，不写磁盘"""
+    return {
         "database": {
-            "sqlite_path": str(Path(temp_dir) / "audit.db"),
+            "sqlite_path": (
+                ":memory:" if in_memory else str(Path(temp_dir) / "audit.db")
+            ),
             "audit_table": "file_operations",
             "status_table": "file_status",
         },
         "vector_store": {
             "chroma_path": str(Path(temp_dir) / "chroma_db"),
             "collection_name": "documents",
+            "ephemeral": in_memory,
         },
         "llama_index": {
             "enable": False,  # 简化演示
@@ -41,10 +46,19 @@ def demo_basic_index_update():
         "classification": {"review_threshold": 0.6},
     }
 
+
+def _demo_embeddings(count: int, dim: int = 10) -> np.ndarray:
+    """生成演示向量矩阵，每行是一个文档的向量"""
+    scales = 0.1 * np.arange(1, count + 1, dtype=np.float32)
+    return np.repeat(scales[:, None], dim, axis=1)
+
+
+def demo_basic_index_update(index_updater: IndexUpdater):
+    """演示基本的索引更新操作"""
+    print("=== 基本索引更新演示 ===")
+
     try:
-        # 初始化索引更新器
-        index_updater = IndexUpdater(config)
-        print("✓ 索引更新器初始化成功")
+        index_updater.reset()
 
         # 模拟文件移动结果
         move_result = {
@@ -97,34 +111,14 @@ def demo_basic_index_update():
 
     except Exception as e:
         print(f"✗ 索引更新失败: {e}")
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-def demo_audit_log_query():
+def demo_audit_log_query(index_updater: IndexUpdater):
     """演示审计日志查询"""
     print("\n=== 审计日志查询演示 ===")
 
-    temp_dir = tempfile.mkdtemp()
-    config = {
-        "database": {
-            "sqlite_path": str(Path(temp_dir) / "audit.db"),
-            "audit_table": "file_operations",
-            "status_table": "file_status",
-        },
-        "vector_store": {
-            "chroma_path": str(Path(temp_dir) / "chroma_db"),
-            "collection_name": "documents",
-        },
-        "llama_index": {
-            "enable": False,
-            "index_path": str(Path(temp_dir) / "llama_index"),
-        },
-        "classification": {"review_threshold": 0.6},
-    }
-
     try:
-        index_updater = IndexUpdater(config)
+        index_updater.reset()
 
         # 创建一些测试记录
         test_files = [
@@ -145,6 +139,10 @@ def demo_audit_log_query():
             },
         ]
 
+        # 一次生成所有演示向量，第 i 行为 [0.1 * (i + 1)] * 10
+        embeddings = _demo_embeddings(len(test_files))
+
+        items = []
         for i, file_info in enumerate(test_files):
             move_result = {
                 "moved": True,
@@ -154,7 +152,7 @@ def demo_audit_log_query():
 
             document_data = {
                 "text_content": f'这是{file_info["category"]}文档的内容',
-                "embedding": [0.1 * (i + 1)] * 10,
+                "embedding": embeddings[i],
             }
 
             classification_result = {
@@ -163,10 +161,18 @@ def demo_audit_log_query():
                 "tags": [file_info["category"]],
             }
 
-            index_updater.update_indexes(
-                move_result, document_data, classification_result, 1.0
+            items.append(
+                {
+                    "move_result": move_result,
+                    "document_data": document_data,
+                    "classification_result": classification_result,
+                    "processing_time": 1.0,
+                }
             )
 
+        # 所有记录在一个事务中写入
+        index_updater.update_indexes_batch(items)
+
         print("✓ 测试记录创建完成")
 
         # 查询所有记录
@@ -183,9 +189,9 @@ def demo_audit_log_query():
         )
         print(f"✓ 特定文件记录: {len(specific_records)} 条")
 
-        # 显示最新记录详情
-        if all_records:
-            latest = all_records[0]
+        # 显示最新记录详情，只读取第一条
+        latest = next(index_updater.iter_audit_records(limit=1), None)
+        if latest:
             print(f"  最新记录:")
             print(f"    文件: {latest['file_path']}")
             print(f"    类别: {latest['category']}")
@@ -195,34 +201,17 @@ def demo_audit_log_query():
 
     except Exception as e:
         print(f"✗ 审计日志查询失败: {e}")
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-def demo_file_status_management():
+def demo_file_status_management(index_updater: IndexUpdater):
     """演示文件状态管理"""
     print("\n=== 文件状态管理演示 ===")
 
+    # 状态记录会读取文件的修改时间，需要真实文件
     temp_dir = tempfile.mkdtemp()
-    config = {
-        "database": {
-            "sqlite_path": str(Path(temp_dir) / "audit.db"),
-            "audit_table": "file_operations",
-            "status_table": "file_status",
-        },
-        "vector_store": {
-            "chroma_path": str(Path(temp_dir) / "chroma_db"),
-            "collection_name": "documents",
-        },
-        "llama_index": {
-            "enable": False,
-            "index_path": str(Path(temp_dir) / "llama_index"),
-        },
-        "classification": {"review_threshold": 0.6},
-    }
 
     try:
-        index_updater = IndexUpdater(config)
+        index_updater.reset()
 
         # 创建测试文件
         test_file = Path(temp_dir) / "test_document.txt"
@@ -277,36 +266,20 @@ def demo_file_status_management():
     except Exception as e:
         print(f"✗ 文件状态管理失败: {e}")
     finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        _cleanup_pool.submit(shutil.rmtree, temp_dir, ignore_errors=True)
 
 
-def demo_statistics():
+def demo_statistics(index_updater: IndexUpdater):
     """演示统计信息获取"""
     print("\n=== 统计信息演示 ===")
 
-    temp_dir = tempfile.mkdtemp()
-    config = {
-        "database": {
-            "sqlite_path": str(Path(temp_dir) / "audit.db"),
-            "audit_table": "file_operations",
-            "status_table": "file_status",
-        },
-        "vector_store": {
-            "chroma_path": str(Path(temp_dir) / "chroma_db"),
-            "collection_name": "documents",
-        },
-        "llama_index": {
-            "enable": False,
-            "index_path": str(Path(temp_dir) / "llama_index"),
-        },
-        "classification": {"review_threshold": 0.6},
-    }
-
     try:
-        index_updater = IndexUpdater(config)
+        index_updater.reset()
 
         # 创建多样化的测试数据
         categories = ["工作", "个人", "财务", "其他"]
+        embeddings = _demo_embeddings(10)
+        items = []
         for i in range(10):
             category = categories[i % len(categories)]
             confidence = 0.6 + (i % 4) * 0.1  # 0.6-0.9
@@ -319,7 +292,7 @@ def demo_statistics():
 
             document_data = {
                 "text_content": f"这是{category}文档{i}的内容",
-                "embedding": [0.1 * (i + 1)] * 10,
+                "embedding": embeddings[i],
             }
 
             classification_result = {
@@ -328,12 +301,23 @@ def demo_statistics():
                 "tags": [category],
             }
 
-            index_updater.update_indexes(
-                move_result, document_data, classification_result, 1.0
+            items.append(
+                {
+                    "move_result": move_result,
+                    "document_data": document_data,
+                    "classification_result": classification_result,
+                    "processing_time": 1.0,
+                }
             )
 
+        index_updater.update_indexes_batch(items)
+
         print("✓ 测试数据创建完成")
 
+        # 写入缓冲的向量记录
+        flush_result = index_updater.flush_vector_buffer()
+        print(f"✓ 向量记录写入: {flush_result.get('flushed', 0)} 条")
+
         # 获取统计信息
         stats = index_updater.get_statistics()
 
@@ -350,34 +334,14 @@ def demo_statistics():
 
     except Exception as e:
         print(f"✗ 统计信息获取失败: {e}")
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-def demo_rollback_operation():
+def demo_rollback_operation(index_updater: IndexUpdater):
     """演示操作回滚"""
     print("\n=== 操作回滚演示 ===")
 
-    temp_dir = tempfile.mkdtemp()
-    config = {
-        "database": {
-            "sqlite_path": str(Path(temp_dir) / "audit.db"),
-            "audit_table": "file_operations",
-            "status_table": "file_status",
-        },
-        "vector_store": {
-            "chroma_path": str(Path(temp_dir) / "chroma_db"),
-            "collection_name": "documents",
-        },
-        "llama_index": {
-            "enable": False,
-            "index_path": str(Path(temp_dir) / "llama_index"),
-        },
-        "classification": {"review_threshold": 0.6},
-    }
-
     try:
-        index_updater = IndexUpdater(config)
+        index_updater.reset()
 
         # 创建一个操作记录
         move_result = {
@@ -415,8 +379,6 @@ def demo_rollback_operation():
 
     except Exception as e:
         print(f"✗ 操作回滚失败: {e}")
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 def main():
@@ -424,12 +386,29 @@ def main():
     print("索引更新器演示程序")
     print("=" * 50)
 
-    # 运行各个演示
-    demo_basic_index_update()
-    demo_audit_log_query()
-    demo_file_status_management()
-    demo_statistics()
-    demo_rollback_operation()
+    # 所有演示共用一个索引更新器，每个演示开始前清空数据
+    temp_dir = tempfile.mkdtemp()
+    config = _make_config(temp_dir)
+    config["vector_store"]["flush_size"] = 512
+
+    index_updater = None
+    try:
+        index_updater = IndexUpdater(config)
+        print("✓ 索引更新器初始化成功")
+
+        # 运行各个演示
+        demo_basic_index_update(index_updater)
+        demo_audit_log_query(index_updater)
+        demo_file_status_management(index_updater)
+        demo_statistics(index_updater)
+        demo_rollback_operation(index_updater)
+    except Exception as e:
+        print(f"✗ 索引更新器初始化失败: {e}")
+    finally:
+        if index_updater is not None:
+            index_updater.close()
+        _cleanup_pool.submit(shutil.rmtree, temp_dir, ignore_errors=True)
+        _cleanup_pool.shutdown(wait=True)
 
     print("\n" + "=" * 50)
     print("演示完成！")
@@ -6,15 +6,17 @@
 
 import sys
 import os
+import shutil
 from pathlib import Path
 import logging
-import yaml
+import tempfile
 from datetime import datetime
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from ods.naming.renamer import Renamer
+from ods.utils.file_utils import load_yaml_cached
 
 
 def setup_logging():
@@ -29,8 +31,8 @@ def load_config():
     """加载配置"""
     config_file = project_root / "config" / "rules.yaml"
     if config_file.exists():
-        with open(config_file, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f)
+        # 同一进程内按 mtime 缓存，重复加载不再解析 YAML
+        return load_yaml_cached(config_file)
     return {}
 
 
@@ -211,7 +213,10 @@ def demo_filename_truncation():
 
     for filename in test_filenames:
         truncated = renamer._truncate_filename(filename)
-        print(f"原始长度: {len(filename)} -> 截断后长度: {len(truncated)}")
+        print(
+            f"原始长度: {len(filename)} 字符/{len(filename.encode('utf-8'))} 字节 -> "
+            f"截断后长度: {len(truncated)} 字符/{len(truncated.encode('utf-8'))} 字节"
+        )
         print(f"原始: '{filename}'")
         print(f"截断后: '{truncated}'")
         print()
@@ -225,14 +230,14 @@ def demo_conflict_resolution():
 
     renamer = Renamer(config)
 
-    # 创建测试文件
-    test_dir = Path("demo_output/工作")
-    test_dir.mkdir(parents=True, exist_ok=True)
+    # 在临时目录中创建测试文件，退出时整体清理
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_dir = Path(temp_dir) / "工作"
+        test_dir.mkdir()
 
-    test_file = test_dir / "document.pdf"
-    test_file.write_text("test content")
+        test_file = test_dir / "document.pdf"
+        test_file.write_text("test content")
 
-    try:
         # 测试后缀冲突解决
         path = str(test_file)
         resolved_path = renamer._resolve_filename_conflict_with_suffix(path)
@@ -245,11 +250,6 @@ def demo_conflict_resolution():
         timestamp_path = renamer._resolve_filename_conflict_with_timestamp(path)
         print(f"时间戳解决路径: {timestamp_path}")
 
-    finally:
-        # 清理测试文件
-        if test_file.exists():
-            test_file.unlink()
-
 
 def demo_jinja2_templates():
     """演示Jinja2模板"""
@@ -415,10 +415,7 @@ def main():
         # 清理演示文件
         if Path("demo_naming_templates.yaml").exists():
             Path("demo_naming_templates.yaml").unlink()
-        if Path("demo_output").exists():
-            import shutil
-
-            shutil.rmtree("demo_output")
+        shutil.rmtree("demo_output", ignore_errors=True)
 
 
 if __name__ == "__main__":
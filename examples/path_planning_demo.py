@@ -6,15 +6,17 @@
 
 import sys
 import os
+import shutil
 from pathlib import Path
 import logging
-import yaml
+import tempfile
 from datetime import datetime
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from ods.path_planner.path_planner import PathPlanner
+from ods.utils.file_utils import load_yaml_cached
 
 
 def setup_logging():
@@ -29,8 +31,8 @@ def load_config():
     """加载配置"""
     config_file = project_root / "config" / "rules.yaml"
     if config_file.exists():
-        with open(config_file, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f)
+        # 同一进程内按 mtime 缓存，重复加载不再解析 YAML
+        return load_yaml_cached(config_file)
     return {}
 
 
@@ -125,14 +127,14 @@ def demo_path_conflicts():
 
     planner = PathPlanner(config)
 
-    # 创建测试文件
-    test_dir = Path("demo_output/工作")
-    test_dir.mkdir(parents=True, exist_ok=True)
+    # 在临时目录中创建测试文件，退出时整体清理
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_dir = Path(temp_dir) / "工作"
+        test_dir.mkdir()
 
-    test_file = test_dir / "document.pdf"
-    test_file.write_text("test content")
+        test_file = test_dir / "document.pdf"
+        test_file.write_text("test content")
 
-    try:
         # 测试冲突解决
         target_path = str(test_file)
         original_path = "/test/document.pdf"
@@ -145,11 +147,6 @@ def demo_path_conflicts():
         print(f"解决方式: {conflict_info['resolution']}")
         print(f"建议路径: {conflict_info['suggested_path']}")
 
-    finally:
-        # 清理测试文件
-        if test_file.exists():
-            test_file.unlink()
-
 
 def demo_directory_structure():
     """演示目录结构创建"""
@@ -298,10 +295,7 @@ def main():
 
     finally:
         # 清理演示目录
-        if Path("demo_output").exists():
-            import shutil
-
-            shutil.rmtree("demo_output")
+        shutil.rmtree("demo_output", ignore_errors=True)
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 END = "END"
 
 class StateGraph:
@@ -6,6 +8,7 @@ class StateGraph:
         self.nodes = {}
         self.edges = {}
         self.entry = None
+        self._node_order = ()
 
     def add_node(self, name, func):
         self.nodes[name] = func
@@ -17,4 +20,43 @@ class StateGraph:
         self.edges.setdefault(src, []).append(dest)
 
     def compile(self):
+        # Freeze the graph: adjacency lists become tuples and the node table a
+        # read-only view, so a compiled graph can be shared across threads.
+        self.edges = {src: tuple(dests) for src, dests in self.edges.items()}
+        self.nodes = MappingProxyType(dict(self.nodes))
+        self._node_order = self._topological_order()
         return self
+
+    def _topological_order(self):
+        """Nodes reachable from the entry point, parents before children."""
+        reachable, stack = [], [self.entry] if self.entry is not None else []
+        seen = set(stack)
+        while stack:
+            node = stack.pop()
+            reachable.append(node)
+            for dest in self.edges.get(node, ()):
+                if dest != END and dest not in seen:
+                    seen.add(dest)
+                    stack.append(dest)
+
+        indegree = dict.fromkeys(reachable, 0)
+        for node in reachable:
+            for dest in self.edges.get(node, ()):
+                if dest in indegree:
+                    indegree[dest] += 1
+
+        order = []
+        ready = [node for node in reachable if indegree[node] == 0]
+        while ready:
+            node = ready.pop(0)
+            order.append(node)
+            for dest in self.edges.get(node, ()):
+                if dest in indegree:
+                    indegree[dest] -= 1
+                    if indegree[dest] == 0:
+                        ready.append(dest)
+
+        # Nodes on a cycle keep their discovery order after the acyclic part.
+        ordered = set(order)
+        order.extend(node for node in reachable if node not in ordered)
+        return tuple(order)
@@ -9,16 +9,39 @@ __version__ = "0.1.0"
 __author__ = "Auto File Classification Team"
 __email__ = "team@example.com"
 
-try:
-    from .core.workflow import DocumentClassificationWorkflow
-except Exception:  # pragma: no cover - 依赖未安装时提供降级导入
-    DocumentClassificationWorkflow = None
+import importlib
 
-from .core.config import Config
-from .core.database import Database
+# 子模块在首次访问对应属性时才导入（PEP 562），
+# 只用到 ods.path_planner 等轻量模块的脚本不必加载 torch/chromadb 等依赖
+_LAZY_ATTRS = {
+    "DocumentClassificationWorkflow": ".core.workflow",
+    "Config": ".core.config",
+    "Database": ".core.database",
+}
 
 __all__ = [
     "DocumentClassificationWorkflow",
     "Config",
     "Database",
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    except Exception:
+        if name != "DocumentClassificationWorkflow":
+            raise
+        # 依赖未安装时提供降级导入
+        value = None
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -2,10 +2,15 @@
 分类器模块
 """
 
-from .classifier import DocumentClassifier
-from .retrieval_agent import RetrievalAgent
-from .llm_classifier import LLMClassifier
-from .rule_checker import RuleChecker
+import importlib
+
+# 子模块在首次访问对应属性时才导入（PEP 562），避免 import 本包就加载 chromadb/openai
+_LAZY_ATTRS = {
+    "DocumentClassifier": ".classifier",
+    "RetrievalAgent": ".retrieval_agent",
+    "LLMClassifier": ".llm_classifier",
+    "RuleChecker": ".rule_checker",
+}
 
 __all__ = [
     "DocumentClassifier",
@@ -13,3 +18,17 @@ __all__ = [
     "LLMClassifier",
     "RuleChecker",
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,10 +3,26 @@
 整合检索代理、LLM分类器和规则检查器
 """
 
+import asyncio
+import functools
+import itertools
 import logging
+import os
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional, Tuple
-from pathlib import Path
+
+import numpy as np
+
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 from .retrieval_agent import RetrievalAgent
 from .llm_classifier import LLMClassifier
@@ -14,6 +30,46 @@ from .rule_checker import RuleChecker
 
 BaseLLMClassifier = LLMClassifier
 
+# 类别名驻留后，相同类别的字符串比较在身份检查处即可返回
+_DEFAULT_CATEGORIES = tuple(sys.intern(c) for c in ("工作", "个人", "财务", "其他"))
+_UNCATEGORIZED = sys.intern("Uncategorized")
+
+
+@functools.lru_cache(maxsize=None)
+def _centroid_scorer(n_categories: int):
+    """生成按类别数特化的中心打分内核
+
+    返回 score(embeddings, centroids) -> (labels, scores)，两者都应已按行归一化。
+    安装 numba 时类别数作为编译期常量，类别循环可被完全展开；否则退回 numpy 矩阵乘。
+    """
+    if not NUMBA_AVAILABLE:
+
+        def score(embeddings, centroids):
+            sims = embeddings @ centroids[:n_categories].T
+            labels = sims.argmax(axis=1).astype(np.int32)
+            return labels, sims[np.arange(len(labels)), labels]
+
+        return score
+
+    @numba.njit(fastmath=True)
+    def score(embeddings, centroids):
+        n, dim = embeddings.shape
+        labels = np.empty(n, dtype=np.int32)
+        scores = np.empty(n, dtype=np.float32)
+        for i in range(n):
+            best, best_score = 0, np.float32(-np.inf)
+            for c in range(n_categories):
+                s = np.float32(0.0)
+                for j in range(dim):
+                    s += embeddings[i, j] * centroids[c, j]
+                if s > best_score:
+                    best, best_score = c, s
+            labels[i] = best
+            scores[i] = best_score
+        return labels, scores
+
+    return score
+
 
 class DocumentClassifier:
     """文档分类器 - 整合所有分类组件"""
@@ -24,10 +80,31 @@ class DocumentClassifier:
 
         # 分类配置
         self.classification_config = config.get('classification', {})
-        self.categories = self.classification_config.get('categories', ['工作', '个人', '财务', '其他'])
+        self.categories = tuple(
+            sys.intern(c)
+            for c in self.classification_config.get('categories', _DEFAULT_CATEGORIES)
+        )
         self.confidence_threshold = self.classification_config.get('confidence_threshold', 0.8)
         self.review_threshold = self.classification_config.get('review_threshold', 0.6)
         self.max_tags = self.classification_config.get('max_tags', 3)
+        # 批量分类的线程数，LLM 调用以网络等待为主，多线程可以重叠请求；
+        # 默认串行，需要时显式开启
+        self.batch_workers = self.classification_config.get('batch_workers', 1)
+        # 批量分类时向量记录攒够该数量再一次性写入
+        self.vector_flush_size = self.classification_config.get(
+            'vector_flush_size', 64
+        )
+        # 批量分类时是否按类别中心给出参考类别（每批要为每个类别查询一次向量库）
+        self.centroid_hints = self.classification_config.get('centroid_hints', False)
+        # 向量库客户端不保证线程安全，写入和缓冲区都由这把锁保护
+        self._vector_lock = threading.Lock()
+        self._pending_vector_adds: List[Tuple[str, Any, Dict[str, Any], str]] = []
+        self._active_batches = 0
+        # 批量分类期间共用的分类时间戳，结果中没有时间戳时使用
+        self._batch_timestamp: Optional[float] = None
+        # 文档 ID = 初始化时间 + 自增序号，同一秒内分类的文档也不会重复
+        self._id_epoch = int(time.time())
+        self._id_counter = itertools.count()
         
         from .retrieval_agent import RetrievalAgent as ModuleRetrieval
         from .llm_classifier import LLMClassifier as ModuleLLM
@@ -50,7 +127,7 @@ class DocumentClassifier:
             start_time = time.time()
             file_path = document_data.get("file_path", "")
 
-            self.logger.info(f"开始分类文档: {file_path}")
+            self.logger.info("开始分类文档: %s", file_path)
 
             # 1. LLM分类
             llm_result = self.llm_classifier.classify_document(document_data)
@@ -67,17 +144,17 @@ class DocumentClassifier:
             # 4. 如果分类成功，添加到向量数据库
             if (
                 final_result.get("primary_category")
-                and final_result.get("primary_category") != "Uncategorized"
+                and final_result.get("primary_category") != _UNCATEGORIZED
             ):
                 self._add_to_vector_database(document_data, final_result)
 
             self.logger.info(
-                f"文档分类完成: {file_path} -> {final_result.get('primary_category')}"
+                "文档分类完成: %s -> %s", file_path, final_result.get("primary_category")
             )
             return final_result
 
         except Exception as e:
-            self.logger.error(f"文档分类失败: {e}")
+            self.logger.error("文档分类失败: %s", e)
             return self._create_error_result(str(e), document_data)
 
     def _add_to_vector_database(
@@ -85,6 +162,14 @@ class DocumentClassifier:
     ) -> bool:
         """将分类后的文档添加到向量数据库"""
         try:
+            # 热路径上避免构造 Path 对象，文件名只拆分一次
+            file_path = document_data.get('file_path', '')
+            stem, ext = os.path.splitext(os.path.basename(file_path))
+
+            timestamp = classification_result.get('classification_timestamp')
+            if timestamp is None:
+                timestamp = self._batch_timestamp or time.time()
+
             # 准备元数据
             metadata = {
                 'category': classification_result['primary_category'],
@@ -92,10 +177,10 @@ class DocumentClassifier:
                 'tags': classification_result.get('tags', []),
                 'confidence_score': classification_result.get('confidence_score', 0.0),
                 'needs_review': classification_result.get('needs_review', False),
-                'classification_timestamp': classification_result.get('classification_timestamp', time.time()),
-                'file_path': document_data.get('file_path', ''),
+                'classification_timestamp': timestamp,
+                'file_path': file_path,
                 'file_size': document_data.get('metadata', {}).get('size', 0),
-                'file_type': Path(document_data.get('file_path', '')).suffix.lower()
+                'file_type': ext.lower()
             }
 
             # 获取嵌入向量
@@ -108,53 +193,180 @@ class DocumentClassifier:
             text_chunk = document_data.get("summary", "")[:1000]  # 限制长度
 
             # 生成文档ID
-            doc_id = (
-                f"{int(time.time())}_{Path(document_data.get('file_path', '')).stem}"
-            )
-
-            # 添加到向量数据库
-            success = self.retrieval_agent.add_document(
-                doc_id=doc_id,
-                embedding=embedding,
-                metadata=metadata,
-                text_chunk=text_chunk,
-            )
+            doc_id = f"{self._id_epoch}_{next(self._id_counter)}_{stem}"
+
+            entry = (doc_id, embedding, metadata, text_chunk)
+            with self._vector_lock:
+                if self._active_batches:
+                    # 批量分类中只入队，由 flush_vector_buffer 一次写入
+                    self._pending_vector_adds.append(entry)
+                    if len(self._pending_vector_adds) < self.vector_flush_size:
+                        return True
+                    pending, self._pending_vector_adds = self._pending_vector_adds, []
+                    return self.retrieval_agent.add_documents(pending)
+
+                # 添加到向量数据库
+                success = self.retrieval_agent.add_document(
+                    doc_id=doc_id,
+                    embedding=embedding,
+                    metadata=metadata,
+                    text_chunk=text_chunk,
+                )
 
             if success:
-                self.logger.info(f"文档已添加到向量数据库: {doc_id}")
+                self.logger.info("文档已添加到向量数据库: %s", doc_id)
             else:
-                self.logger.warning(f"文档添加到向量数据库失败: {doc_id}")
+                self.logger.warning("文档添加到向量数据库失败: %s", doc_id)
 
             return success
 
         except Exception as e:
-            self.logger.error(f"添加文档到向量数据库失败: {e}")
+            self.logger.error("添加文档到向量数据库失败: %s", e)
             return False
 
     def batch_classify(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """批量分类文档"""
-        results = []
+        """批量分类文档
+
+        配置了 classification.batch_workers > 1 时在线程池中并发分类，
+        返回结果的顺序与输入一致。
+        """
+        centroid_hints = self._score_by_centroids(documents)
+        classify = functools.partial(
+            self._classify_batch_item, total=len(documents), hints=centroid_hints
+        )
+
+        with self._batch_scope():
+            if len(documents) <= 1 or self.batch_workers <= 1:
+                return [classify(i, doc) for i, doc in enumerate(documents)]
+
+            with ThreadPoolExecutor(
+                max_workers=min(self.batch_workers, len(documents))
+            ) as executor:
+                return list(executor.map(classify, range(len(documents)), documents))
+
+    async def batch_classify_async(
+        self, documents: List[Dict[str, Any]], concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """在事件循环中批量分类文档
+
+        最多 concurrency 个文档（默认 batch_workers）同时分类，
+        结果顺序与输入一致，可在已有事件循环中直接 await。
+        """
+        centroid_hints = self._score_by_centroids(documents)
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.batch_workers))
+
+        async def classify(index: int, document: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                # LLM 客户端是同步的，放到线程中执行以免阻塞事件循环
+                return await asyncio.to_thread(
+                    self._classify_batch_item,
+                    index,
+                    document,
+                    len(documents),
+                    centroid_hints,
+                )
 
-        for i, document in enumerate(documents):
-            try:
-                self.logger.info(
-                    f"处理文档 {i+1}/{len(documents)}: {document.get('file_path', '')}"
+        with self._batch_scope():
+            return list(
+                await asyncio.gather(
+                    *(classify(i, doc) for i, doc in enumerate(documents))
                 )
-                result = self.classify_document(document)
-                results.append(result)
+            )
+
+    @contextmanager
+    def _batch_scope(self):
+        """批量分类期间缓冲向量写入，最外层批次结束时统一写入"""
+        with self._vector_lock:
+            if not self._active_batches:
+                self._batch_timestamp = time.time()
+            self._active_batches += 1
+        try:
+            yield
+        finally:
+            with self._vector_lock:
+                self._active_batches -= 1
+                if not self._active_batches:
+                    self._batch_timestamp = None
+            self.flush_vector_buffer()
+
+    def flush_vector_buffer(self) -> bool:
+        """把批量分类中缓冲的向量记录一次性写入向量数据库"""
+        with self._vector_lock:
+            pending, self._pending_vector_adds = self._pending_vector_adds, []
+            if not pending:
+                return True
+            success = self.retrieval_agent.add_documents(pending)
+
+        if success:
+            self.logger.info("%d 个文档已批量添加到向量数据库", len(pending))
+        else:
+            self.logger.warning("批量添加 %d 个文档到向量数据库失败", len(pending))
+        return success
+
+    def _classify_batch_item(
+        self,
+        index: int,
+        document: Dict[str, Any],
+        total: int,
+        hints: Dict[int, Tuple[str, float]],
+    ) -> Dict[str, Any]:
+        """分类批量中的单个文档并附加进度信息"""
+        try:
+            # 参数延迟格式化，日志级别高于 INFO 时不拼接字符串
+            self.logger.info(
+                "处理文档 %d/%d: %s", index + 1, total, document.get("file_path", "")
+            )
+            result = self.classify_document(document)
 
-                # 添加进度信息
-                result["batch_index"] = i
-                result["batch_total"] = len(documents)
+            # 添加进度信息
+            result["batch_index"] = index
+            result["batch_total"] = total
+            if index in hints:
+                category, similarity = hints[index]
+                result["centroid_category"] = category
+                result["centroid_similarity"] = similarity
+            return result
 
-            except Exception as e:
-                self.logger.error(f"批量分类文档失败: {e}")
-                error_result = self._create_error_result(str(e), document)
-                error_result["batch_index"] = i
-                error_result["batch_total"] = len(documents)
-                results.append(error_result)
+        except Exception as e:
+            self.logger.error("批量分类文档失败: %s", e)
+            error_result = self._create_error_result(str(e), document)
+            error_result["batch_index"] = index
+            error_result["batch_total"] = total
+            return error_result
+
+    def _score_by_centroids(
+        self, documents: List[Dict[str, Any]]
+    ) -> Dict[int, Tuple[str, float]]:
+        """一次内核调用求出整批文档最接近的类别中心，未开启 centroid_hints 时为空"""
+        if not self.centroid_hints:
+            return {}
+        indices = [i for i, d in enumerate(documents) if d.get("embedding") is not None]
+        if not indices:
+            return {}
+
+        try:
+            names, centroids = self.retrieval_agent.get_category_centroids(
+                self.categories
+            )
+            if not names:
+                return {}
 
-        return results
+            embeddings = np.asarray(
+                [documents[i]["embedding"] for i in indices], dtype=np.float32
+            )
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.where(norms > 0, norms, 1.0)
+            labels, scores = _centroid_scorer(len(names))(
+                np.ascontiguousarray(embeddings), centroids
+            )
+        except Exception as e:
+            self.logger.warning(f"类别中心打分失败: {e}")
+            return {}
+
+        return {
+            i: (names[label], float(score))
+            for i, label, score in zip(indices, labels, scores)
+        }
 
     def get_classification_statistics(self) -> Dict[str, Any]:
         """获取分类统计信息"""
@@ -169,7 +381,7 @@ class DocumentClassifier:
             stats = {
                 "vector_database": vector_stats,
                 "rules": rules_summary,
-                "categories": self.categories,
+                "categories": list(self.categories),
                 "confidence_threshold": self.confidence_threshold,
                 "review_threshold": self.review_threshold,
                 "max_tags": self.max_tags,
@@ -201,14 +413,14 @@ class DocumentClassifier:
             )
 
             if success:
-                self.logger.info(f"文档分类已更新: {doc_id}")
+                self.logger.info("文档分类已更新: %s", doc_id)
             else:
-                self.logger.warning(f"文档分类更新失败: {doc_id}")
+                self.logger.warning("文档分类更新失败: %s", doc_id)
 
             return success
 
         except Exception as e:
-            self.logger.error(f"更新文档分类失败: {e}")
+            self.logger.error("更新文档分类失败: %s", e)
             return False
 
     def search_similar_documents(
@@ -231,49 +443,71 @@ class DocumentClassifier:
             self.logger.error(f"获取类别示例失败: {e}")
             return []
 
-    def test_all_components(self) -> Dict[str, bool]:
-        """测试所有组件"""
+    def test_all_components(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """测试所有组件
+
+        三个探测并发执行，耗时取决于最慢的一个；超过 timeout 秒
+        未返回的组件视为不可用，不会阻塞其他组件的结果。
+        """
+        probes = {
+            "vector_database": lambda: bool(
+                self.retrieval_agent.get_collection_stats()
+            ),
+            "llm_classifier": self.llm_classifier.test_connection,
+            "rule_checker": lambda: bool(self.rule_checker.get_rules_summary()),
+        }
         test_results = {}
 
+        executor = ThreadPoolExecutor(max_workers=len(probes))
         try:
-            # 测试向量数据库
-            vector_stats = self.retrieval_agent.get_collection_stats()
-            test_results["vector_database"] = bool(vector_stats)
-
-            # 测试LLM分类器
-            test_results["llm_classifier"] = self.llm_classifier.test_connection()
-
-            # 测试规则检查器
-            rules_summary = self.rule_checker.get_rules_summary()
-            test_results["rule_checker"] = bool(rules_summary)
-
-            self.logger.info("组件测试完成")
-
-        except Exception as e:
-            self.logger.error(f"组件测试失败: {e}")
-            test_results["error"] = str(e)
-
+            futures = {name: executor.submit(probe) for name, probe in probes.items()}
+            wait(futures.values(), timeout=timeout)
+            for name, future in futures.items():
+                if not future.done():
+                    self.logger.error(f"组件测试超时: {name}")
+                    test_results[name] = False
+                    continue
+                try:
+                    test_results[name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"组件测试失败: {name}: {e}")
+                    test_results[name] = False
+                    test_results.setdefault("error", str(e))
+        finally:
+            # 不等待超时的探测线程结束
+            executor.shutdown(wait=False)
+
+        self.logger.info("组件测试完成")
         return test_results
 
+    # 错误结果中不变的字段，可变值（列表）在每次复制后重新赋值，避免共享
+    _ERROR_TEMPLATE = {
+        "primary_category": "Error",
+        "secondary_categories": None,
+        "confidence_score": 0.0,
+        "reasoning": None,
+        "needs_review": True,
+        "suggested_tags": None,
+        "similar_documents_count": 0,
+        "classification_timestamp": None,
+        "model_used": "none",
+        "provider": "none",
+        "file_path": None,
+        "classification_method": "error",
+        "total_processing_time": 0.0,
+    }
+
     def _create_error_result(
         self, error_message: str, document_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """创建错误结果"""
-        return {
-            "primary_category": "Error",
-            "secondary_categories": [],
-            "confidence_score": 0.0,
-            "reasoning": f"分类过程中出现错误: {error_message}",
-            "needs_review": True,
-            "suggested_tags": ["ERROR"],
-            "similar_documents_count": 0,
-            "classification_timestamp": time.time(),
-            "model_used": "none",
-            "provider": "none",
-            "file_path": document_data.get("file_path", ""),
-            "classification_method": "error",
-            "total_processing_time": 0.0,
-        }
+        result = self._ERROR_TEMPLATE.copy()
+        result["secondary_categories"] = []
+        result["reasoning"] = f"分类过程中出现错误: {error_message}"
+        result["suggested_tags"] = ["ERROR"]
+        result["classification_timestamp"] = time.time()
+        result["file_path"] = document_data.get("file_path", "")
+        return result
 
     def export_classification_data(self, export_path: str) -> bool:
         """导出分类数据"""
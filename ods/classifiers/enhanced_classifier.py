@@ -4,15 +4,63 @@
 支持多标签分类、置信度阈值、审核机制等高级功能
 """
 
+import asyncio
+import bisect
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 import json
 
+import numpy as np
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from .classifier import DocumentClassifier
 from .llm_classifier import LLMClassifier
 from .retrieval_agent import RetrievalAgent
 from ..rules.enhanced_rule_engine import EnhancedRuleEngine
+from ..utils.text_utils import extract_json_object
+
+# 置信度等级分界点（左闭），_CONF_LABELS 比分界点多一项
+_CONF_THRESHOLDS = (0.6, 0.7, 0.8, 0.9)
+_CONF_LABELS = ("very_low", "low", "medium", "high", "very_high")
+
+# 按置信度确定的 (状态, 是否需要审核, 审核原因)：自动分类 / 需要审核 / 不确定
+_STATUS_OUTCOMES = (
+    ("auto_classified", False, None),
+    ("needs_review", True, "置信度不足，需要人工审核"),
+    ("uncertain", True, "置信度过低，无法确定分类"),
+)
+_SENSITIVE_OUTCOME = ("needs_review", True, "包含敏感标签，需要人工审核")
+
+# 分类提示词模板，taxonomy_block 为初始化时生成的固定前缀
+_PROMPT_TEMPLATE = """{taxonomy_block}- 文件名: {filename}
+- 内容摘要: {snippet}...
+- 文件大小: {file_size}
+{similar_docs_info}
+
+请分析文档内容并给出:
+1. 主要标签列表（最多5个）
+2. 每个标签的置信度（0.0-1.0）
+3. 分类理由
+
+请以JSON格式返回，格式如下:
+{{
+    "tags": ["标签1", "标签2"],
+    "confidence_scores": [0.9, 0.7],
+    "reasoning": "分类理由",
+    "primary_tag": "主要标签"
+}}
+
+只返回JSON，不要其他内容。"""
 
 
 class EnhancedClassifier:
@@ -22,11 +70,10 @@ class EnhancedClassifier:
         self.config = config
         self.logger = logging.getLogger(__name__)
 
-        # 初始化组件
-        self.base_classifier = DocumentClassifier(config)
-        self.llm_classifier = LLMClassifier(config)
-        self.retrieval_agent = RetrievalAgent(config)
+        # 规则引擎每个文档都要用，立即创建；其余组件可能加载模型或打开
+        # 向量库，首次使用时才创建，被预规则全部排除的批次不会加载它们
         self.rule_engine = EnhancedRuleEngine(config)
+        self._component_lock = threading.Lock()
 
         # 获取配置
         self.confidence_thresholds = config.get("classification", {}).get(
@@ -34,6 +81,29 @@ class EnhancedClassifier:
         )
         self.taxonomies = config.get("classification", {}).get("taxonomies", {})
         self.tag_rules = config.get("classification", {}).get("tag_rules", {})
+        # 标签体系在运行期不变：预先展开为集合和提示词行，避免每次调用重建
+        self._valid_tags = frozenset(
+            tag for tags in self.taxonomies.values() for tag in tags
+        )
+        self._taxonomy_lines = tuple(
+            f"{taxonomy_name}: {', '.join(tags)}"
+            for taxonomy_name, tags in self.taxonomies.items()
+        )
+        self._prompt_prefix = self._format_taxonomy_block()
+        # 批量分类时每段提交给LLM的文档数，<=0 表示全部一次提交
+        self.pipeline_batch_size = config.get("classification", {}).get(
+            "pipeline_batch_size", 32
+        )
+        # 为 True 时结果中保留相似文档的完整检索记录（调试用）
+        self.keep_full_similar_docs = config.get("classification", {}).get(
+            "keep_full_similar_docs", False
+        )
+        # 提示词中内容摘要的字符数；调用方可直接传入截断好的 text_snippet
+        self._content_snippet_len = 500
+        # 命中任一敏感标签的文档一律转人工审核
+        self._sensitive_tags = frozenset(
+            config.get("classification", {}).get("sensitive_tags", ["机密", "内部"])
+        )
 
         self.logger.info("增强分类器初始化完成")
 
@@ -47,73 +117,330 @@ class EnhancedClassifier:
         Returns:
             Dict[str, Any]: 分类结果，包含标签、置信度、审核状态等
         """
+        if not isinstance(document_data, dict):
+            return self._create_error_result(TypeError("文档数据必须是字典"))
+        self.logger.info("开始分类文档: %s", document_data.get("file_path", ""))
+
+        # 步骤1: 应用预分类规则（规则引擎内部已捕获规则异常）
+        pre_result = self._apply_pre_rules(document_data)
+        if pre_result.get("excluded"):
+            return self._create_excluded_result(pre_result)
+
+        # 步骤2: 基础分类（向量相似度 + LLM）及后续规则，只在调用外部组件处捕获异常
         try:
-            self.logger.info(f"开始分类文档: {document_data.get('file_path', '')}")
+            base_classification = self._perform_base_classification(document_data)
+            return self._finalize_classification(
+                document_data, pre_result, base_classification
+            )
+        except Exception as e:
+            self.logger.error(f"文档分类失败: {e}")
+            return self._create_error_result(e)
 
-            # 步骤1: 应用预分类规则
+    def _apply_pre_rules(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
+        """执行预分类规则，规则引擎返回非字典或抛出异常时视为未命中任何规则"""
+        try:
             pre_result = self.rule_engine.apply_pre_classification_rules(document_data)
+        except Exception as e:
+            self.logger.error(f"预分类规则执行失败: {e}")
+            return {"error": str(e), "pre_tags": [], "excluded": False}
+        if not isinstance(pre_result, dict):
+            self.logger.error(f"预分类规则返回的不是字典: {pre_result}")
+            return {"pre_tags": [], "excluded": False}
+        return pre_result
+
+    def classify_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        批量分类文档，按 pipeline_batch_size 分段流水线执行
 
-            if pre_result.get("excluded"):
-                return {
-                    "status": "excluded",
-                    "reason": "文件被规则排除",
-                    "rule_applied": pre_result.get("applied_rules", []),
-                    "needs_review": False,
-                }
+        规则和结果处理与 classify_document 相同；每段文档的相似文档通过
+        RetrievalAgent.search_batch 一次检索，LLM 调用通过
+        LLMClassifier.classify_batch 批量完成（vLLM 时为一次 generate）。
+        某一段等待LLM期间，后台线程同时为下一段执行预分类规则和检索，
+        并为上一段执行后分类规则。单个文档失败只影响自身结果。
 
-            # 步骤2: 基础分类（向量相似度 + LLM）
-            base_classification = self._perform_base_classification(document_data)
-
-            # 验证基础分类结果
-            if not isinstance(base_classification, dict):
-                self.logger.error(f"基础分类返回的不是字典: {base_classification}")
-                return {
-                    "tags": [],
-                    "confidence_score": 0.0,
-                    "reasoning": "基础分类失败",
-                    "primary_tag": "",
-                    "status": "error",
-                    "needs_review": True,
-                    "review_reason": "基础分类结果格式错误",
-                }
+        Args:
+            documents: 文档数据列表
 
-            # 步骤3: 应用后分类规则
-            final_result = self.rule_engine.apply_post_classification_rules(
-                base_classification, document_data, pre_result
+        Returns:
+            List[Dict[str, Any]]: 与输入顺序一致的分类结果
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+        if not documents:
+            return results
+
+        size = self.pipeline_batch_size
+        if size <= 0:
+            size = len(documents)
+        segments = [
+            range(start, min(start + size, len(documents)))
+            for start in range(0, len(documents), size)
+        ]
+
+        # 两个工作线程：一个准备下一段，一个收尾上一段，主线程只等LLM
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            prepared = executor.submit(
+                self._prepare_segment, documents, segments[0], results
             )
+            finishing = []
+            for position in range(len(segments)):
+                pre_results, pending = prepared.result()
+                if position + 1 < len(segments):
+                    prepared = executor.submit(
+                        self._prepare_segment,
+                        documents,
+                        segments[position + 1],
+                        results,
+                    )
 
-            # 验证后分类结果
-            if not isinstance(final_result, dict):
-                self.logger.error(f"后分类规则返回的不是字典: {final_result}")
-                final_result = base_classification.copy()  # 使用基础分类结果
+                responses = self._classify_prompts(
+                    [prompt for _, _, prompt in pending]
+                )
+                finishing.append(
+                    executor.submit(
+                        self._finish_segment,
+                        documents,
+                        pending,
+                        responses,
+                        pre_results,
+                        results,
+                    )
+                )
+            for future in finishing:
+                future.result()
+
+        return results
+
+    def _classify_prompts(self, prompts: List[str]) -> List[Any]:
+        """批量调用LLM，完全相同的提示只提交一次，响应按原顺序展开"""
+        unique_prompts = list(dict.fromkeys(prompts))
+        if len(unique_prompts) == len(prompts):
+            return self.llm_classifier.classify_batch(prompts)
+
+        self.logger.debug("批量提示去重: %d -> %d", len(prompts), len(unique_prompts))
+        responses = self.llm_classifier.classify_batch(unique_prompts)
+        by_prompt = dict(zip(unique_prompts, responses))
+        return [by_prompt[prompt] for prompt in prompts]
+
+    def _prepare_segment(
+        self,
+        documents: List[Dict[str, Any]],
+        indices: range,
+        results: List[Optional[Dict[str, Any]]],
+    ) -> Tuple[Dict[int, Dict[str, Any]], List[Tuple[int, List[Dict[str, Any]], str]]]:
+        """执行预分类规则、批量检索相似文档并构建提示
+
+        已能确定结果的文档（被排除、无嵌入向量、出错）直接写入 results，
+        返回其余文档的预分类结果和 (下标, 相似文档, 提示) 列表。
+        """
+        pre_results: Dict[int, Dict[str, Any]] = {}
+        to_search: List[int] = []
+
+        for index in indices:
+            document_data = documents[index]
+            try:
+                pre_result = self._apply_pre_rules(document_data)
+                if pre_result.get("excluded"):
+                    results[index] = self._create_excluded_result(pre_result)
+                    continue
+                pre_results[index] = pre_result
+
+                embedding = document_data.get("embedding")
+                if not embedding:
+                    self.logger.warning("文档缺少嵌入向量，使用基础分类器")
+                    results[index] = self._finalize_classification(
+                        document_data,
+                        pre_result,
+                        self.base_classifier.classify_document(document_data),
+                    )
+                    continue
+                to_search.append(index)
+
+            except Exception as e:
+                self.logger.error(f"文档分类失败: {e}")
+                results[index] = self._create_error_result(e)
+
+        # 整段文档的相似文档在一次矩阵查询中检索，再逐个构建提示
+        pending: List[Tuple[int, List[Dict[str, Any]], str]] = []
+        if to_search:
+            neighbours = self.retrieval_agent.search_batch(
+                [documents[index]["embedding"] for index in to_search], top_k=5
+            )
+            for index, similar_docs in zip(to_search, neighbours):
+                try:
+                    prompt = self._build_classification_prompt(
+                        documents[index], similar_docs
+                    )
+                    pending.append((index, similar_docs, prompt))
+                except Exception as e:
+                    self.logger.error(f"文档分类失败: {e}")
+                    results[index] = self._create_error_result(e)
+
+        return pre_results, pending
+
+    def _finish_segment(
+        self,
+        documents: List[Dict[str, Any]],
+        pending: List[Tuple[int, List[Dict[str, Any]], str]],
+        responses: List[Any],
+        pre_results: Dict[int, Dict[str, Any]],
+        results: List[Optional[Dict[str, Any]]],
+    ) -> None:
+        """解析LLM响应并应用后分类规则，结果写入 results
+
+        后分类规则逐个执行，整段结果的审核状态一次向量化确定。
+        """
+        staged = []  # (下标, 基础分类结果, 后分类结果)
+        for (index, similar_docs, _), response in zip(pending, responses):
+            document_data = documents[index]
+            try:
+                if isinstance(response, Exception):
+                    self.logger.error(f"LLM分类失败: {response}")
+                    llm_result = {
+                        "tags": [],
+                        "confidence_score": 0.0,
+                        "reasoning": f"LLM分类失败: {response}",
+                    }
+                else:
+                    llm_result = self._parse_llm_response(response)
 
-            # 步骤4: 确定分类状态和审核需求
-            classification_status = self._determine_classification_status(final_result)
-            final_result.update(classification_status)
+                base_classification = self._merge_base_result(llm_result, similar_docs)
+                final_result = self._apply_post_rules(
+                    document_data, pre_results[index], base_classification
+                )
+                if final_result is None:
+                    results[index] = self._create_invalid_base_result()
+                else:
+                    staged.append((index, base_classification, final_result))
 
-            # 步骤5: 记录分类过程
-            final_result["classification_process"] = {
-                "pre_classification": pre_result,
-                "base_classification": base_classification,
-                "rule_engine": "enhanced",
-            }
+            except Exception as e:
+                self.logger.error(f"文档分类失败: {e}")
+                results[index] = self._create_error_result(e)
 
-            self.logger.info(
-                f"文档分类完成: {final_result.get('primary_tag', '未知')} "
-                f"(置信度: {final_result.get('confidence_score', 0):.2f})"
+        if not staged:
+            return
+        try:
+            statuses = self._determine_statuses_batch(
+                [final.get("confidence_score", 0.0) for _, _, final in staged],
+                [final.get("tags", []) for _, _, final in staged],
             )
+        except (TypeError, ValueError):
+            # 置信度不是数值时逐个判断，由单文档逻辑给出错误状态
+            statuses = [
+                self._determine_classification_status(final) for _, _, final in staged
+            ]
+
+        for (index, base_classification, final_result), status in zip(
+            staged, statuses
+        ):
+            try:
+                final_result.update(status)
+                results[index] = self._record_classification(
+                    final_result, pre_results[index], base_classification
+                )
+            except Exception as e:
+                self.logger.error(f"文档分类失败: {e}")
+                results[index] = self._create_error_result(e)
+
+    def _finalize_classification(
+        self,
+        document_data: Dict[str, Any],
+        pre_result: Dict[str, Any],
+        base_classification: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """应用后分类规则并确定审核状态"""
+        final_result = self._apply_post_rules(
+            document_data, pre_result, base_classification
+        )
+        if final_result is None:
+            return self._create_invalid_base_result()
 
-            return final_result
+        # 步骤4: 确定分类状态和审核需求
+        classification_status = self._determine_classification_status(final_result)
+        final_result.update(classification_status)
 
-        except Exception as e:
-            self.logger.error(f"文档分类失败: {e}")
-            return {
-                "status": "error",
-                "error": str(e),
-                "needs_review": True,
-                "tags": [],
-                "primary_tag": "分类失败",
-            }
+        return self._record_classification(
+            final_result, pre_result, base_classification
+        )
+
+    def _apply_post_rules(
+        self,
+        document_data: Dict[str, Any],
+        pre_result: Dict[str, Any],
+        base_classification: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """应用后分类规则，基础分类结果不是字典时返回 None"""
+        # 验证基础分类结果
+        if not isinstance(base_classification, dict):
+            self.logger.error(f"基础分类返回的不是字典: {base_classification}")
+            return None
+
+        # 步骤3: 应用后分类规则
+        final_result = self.rule_engine.apply_post_classification_rules(
+            base_classification, document_data, pre_result
+        )
+
+        # 验证后分类结果
+        if not isinstance(final_result, dict):
+            self.logger.error(f"后分类规则返回的不是字典: {final_result}")
+            # 使用基础分类结果；必须复制，否则 classification_process 中记录的
+            # base_classification 会指向最终结果自身，形成循环引用
+            final_result = base_classification.copy()
+        return final_result
+
+    def _record_classification(
+        self,
+        final_result: Dict[str, Any],
+        pre_result: Dict[str, Any],
+        base_classification: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """记录分类过程"""
+        # 步骤5: 记录分类过程
+        final_result["classification_process"] = {
+            "pre_classification": pre_result,
+            "base_classification": base_classification,
+            "rule_engine": "enhanced",
+        }
+
+        self.logger.info(
+            "文档分类完成: %s (置信度: %.2f)",
+            final_result.get("primary_tag", "未知"),
+            final_result.get("confidence_score", 0),
+        )
+
+        return final_result
+
+    def _create_invalid_base_result(self) -> Dict[str, Any]:
+        """基础分类返回非字典时的结果"""
+        return {
+            "tags": [],
+            "confidence_score": 0.0,
+            "reasoning": "基础分类失败",
+            "primary_tag": "",
+            "status": "error",
+            "needs_review": True,
+            "review_reason": "基础分类结果格式错误",
+        }
+
+    def _create_excluded_result(self, pre_result: Dict[str, Any]) -> Dict[str, Any]:
+        """被预分类规则排除的文件"""
+        return {
+            "status": "excluded",
+            "reason": "文件被规则排除",
+            "rule_applied": pre_result.get("applied_rules", []),
+            "needs_review": False,
+        }
+
+    def _create_error_result(self, error: Exception) -> Dict[str, Any]:
+        """分类过程出现异常时的结果"""
+        return {
+            "status": "error",
+            "error": str(error),
+            "needs_review": True,
+            "tags": [],
+            "primary_tag": "分类失败",
+        }
 
     def _perform_base_classification(
         self, document_data: Dict[str, Any]
@@ -135,21 +462,128 @@ class EnhancedClassifier:
             llm_result = self._classify_with_llm(document_data, similar_docs)
 
             # 合并结果
-            result = {
-                "tags": llm_result.get("tags", []),
-                "confidence_score": llm_result.get("confidence_score", 0.0),
-                "reasoning": llm_result.get("reasoning", ""),
-                "similar_documents": similar_docs,
-                "embedding_used": True,
-            }
-
-            return result
+            return self._merge_base_result(llm_result, similar_docs)
 
         except Exception as e:
             self.logger.error(f"基础分类失败: {e}")
             # 回退到基础分类器
             return self.base_classifier.classify_document(document_data)
 
+    async def aclassify_document(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        异步分类文档，LLM 请求等待期间不占用线程
+
+        流程与 classify_document 相同，规则引擎和检索仍同步执行（开销很小）。
+
+        Args:
+            document_data: 文档数据
+
+        Returns:
+            Dict[str, Any]: 分类结果
+        """
+        if not isinstance(document_data, dict):
+            return self._create_error_result(TypeError("文档数据必须是字典"))
+        self.logger.info("开始分类文档: %s", document_data.get("file_path", ""))
+
+        pre_result = self._apply_pre_rules(document_data)
+        if pre_result.get("excluded"):
+            return self._create_excluded_result(pre_result)
+
+        try:
+            embedding = document_data.get("embedding")
+            if not embedding:
+                self.logger.warning("文档缺少嵌入向量，使用基础分类器")
+                base_classification = self.base_classifier.classify_document(
+                    document_data
+                )
+            else:
+                try:
+                    similar_docs = self.retrieval_agent.search_similar_documents(
+                        embedding, top_k=5
+                    )
+                    llm_result = await self._aclassify_with_llm(
+                        document_data, similar_docs
+                    )
+                    base_classification = self._merge_base_result(
+                        llm_result, similar_docs
+                    )
+                except Exception as e:
+                    self.logger.error(f"基础分类失败: {e}")
+                    base_classification = self.base_classifier.classify_document(
+                        document_data
+                    )
+
+            return self._finalize_classification(
+                document_data, pre_result, base_classification
+            )
+
+        except Exception as e:
+            self.logger.error(f"文档分类失败: {e}")
+            return self._create_error_result(e)
+
+    async def aclassify_many(
+        self, documents: List[Dict[str, Any]], concurrency: int = 32
+    ) -> List[Dict[str, Any]]:
+        """
+        并发分类多个文档，最多 concurrency 个 LLM 请求同时进行
+
+        Returns:
+            List[Dict[str, Any]]: 与输入顺序一致的分类结果
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def classify(document_data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aclassify_document(document_data)
+
+        return list(await asyncio.gather(*(classify(d) for d in documents)))
+
+    async def _aclassify_with_llm(
+        self, document_data: Dict[str, Any], similar_docs: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """使用LLM进行分类（异步）"""
+        try:
+            prompt = self._build_classification_prompt(document_data, similar_docs)
+            llm_response = await self.llm_classifier.aclassify_with_prompt(prompt)
+            return self._parse_llm_response(llm_response)
+
+        except Exception as e:
+            self.logger.error(f"LLM分类失败: {e}")
+            return {
+                "tags": [],
+                "confidence_score": 0.0,
+                "reasoning": f"LLM分类失败: {e}",
+            }
+
+    def _merge_base_result(
+        self, llm_result: Dict[str, Any], similar_docs: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """合并LLM结果与相似文档，得到基础分类结果
+
+        结果会随 classification_process 一起保存，默认只保留相似文档的
+        ID、路径、类别和相似度，不携带元数据和文本片段。
+        """
+        if not self.keep_full_similar_docs:
+            similar_docs = [self._summarize_similar_doc(doc) for doc in similar_docs]
+        return {
+            "tags": llm_result.get("tags", []),
+            "confidence_score": llm_result.get("confidence_score", 0.0),
+            "reasoning": llm_result.get("reasoning", ""),
+            "similar_documents": similar_docs,
+            "embedding_used": True,
+        }
+
+    @staticmethod
+    def _summarize_similar_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """相似文档的精简记录"""
+        metadata = doc.get("metadata") or {}
+        return {
+            "doc_id": doc.get("doc_id"),
+            "file_path": metadata.get("file_path"),
+            "category": metadata.get("category"),
+            "similarity_score": doc.get("similarity_score"),
+        }
+
     def _classify_with_llm(
         self, document_data: Dict[str, Any], similar_docs: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
@@ -174,62 +608,59 @@ class EnhancedClassifier:
                 "reasoning": f"LLM分类失败: {e}",
             }
 
+    def _format_taxonomy_block(self) -> str:
+        """提示词中不随文档变化的前缀：角色说明和可用标签体系"""
+        return (
+            "你是一个专业的文档分类助手。请根据文档内容将其分类到合适的标签中。\n"
+            "\n"
+            "可用标签体系:\n"
+            f"{chr(10).join(self._taxonomy_lines)}\n"
+            "\n"
+            "文档信息:\n"
+        )
+
+    def _content_snippet(self, document_data: Dict[str, Any]) -> str:
+        """提示词使用的内容片段，优先取调用方预先截断的 text_snippet"""
+        snippet = document_data.get("text_snippet")
+        if snippet is None:
+            snippet = document_data.get("text_content", "")
+        return snippet[: self._content_snippet_len]
+
     def _build_classification_prompt(
         self, document_data: Dict[str, Any], similar_docs: List[Dict[str, Any]]
     ) -> str:
-        """构建分类提示词"""
-        # 获取所有可用的标签
-        all_tags = []
-        for taxonomy_name, tags in self.taxonomies.items():
-            all_tags.extend([f"{taxonomy_name}: {', '.join(tags)}"])
+        """构建分类提示词
 
-        # 构建相似文档信息
+        前缀在初始化时生成，所有文档的提示以完全相同的字节开头，
+        便于 vLLM 等推理服务复用前缀的 KV 缓存。
+        """
         similar_docs_info = ""
         if similar_docs:
-            similar_docs_info = "\n\n相似文档示例:\n"
-            for i, doc in enumerate(similar_docs[:3], 1):
-                similar_docs_info += (
-                    f"{i}. {doc.get('filename', '未知')} -> {doc.get('tags', [])}\n"
-                )
-
-        prompt = f"""你是一个专业的文档分类助手。请根据文档内容将其分类到合适的标签中。
-
-可用标签体系:
-{chr(10).join(all_tags)}
-
-文档信息:
-- 文件名: {Path(document_data.get('file_path', '')).name}
-- 内容摘要: {document_data.get('text_content', '')[:500]}...
-- 文件大小: {document_data.get('file_size', '未知')}
-{similar_docs_info}
-
-请分析文档内容并给出:
-1. 主要标签列表（最多5个）
-2. 每个标签的置信度（0.0-1.0）
-3. 分类理由
-
-请以JSON格式返回，格式如下:
-{{
-    "tags": ["标签1", "标签2"],
-    "confidence_scores": [0.9, 0.7],
-    "reasoning": "分类理由",
-    "primary_tag": "主要标签"
-}}
-
-只返回JSON，不要其他内容。"""
+            similar_docs_info = "\n\n相似文档示例:\n" + "".join(
+                f"{i}. {doc.get('filename', '未知')} -> {doc.get('tags', [])}\n"
+                for i, doc in enumerate(similar_docs[:3], 1)
+            )
 
-        return prompt
+        return _PROMPT_TEMPLATE.format_map(
+            {
+                "taxonomy_block": self._prompt_prefix,
+                "filename": Path(document_data.get("file_path", "")).name,
+                "snippet": self._content_snippet(document_data),
+                "file_size": document_data.get("file_size", "未知"),
+                "similar_docs_info": similar_docs_info,
+            }
+        )
 
     def _parse_llm_response(self, llm_response: str) -> Dict[str, Any]:
         """解析LLM响应"""
         try:
-            # 尝试提取JSON
-            if "{" in llm_response and "}" in llm_response:
-                start = llm_response.find("{")
-                end = llm_response.rfind("}") + 1
-                json_str = llm_response[start:end]
-
-                parsed = json.loads(json_str)
+            # 尝试提取JSON：第一个括号配平的对象，忽略其后的说明文字
+            json_str = extract_json_object(llm_response)
+            if json_str is not None:
+                # orjson 直接解码 str，比标准库快数倍
+                parsed = (
+                    orjson.loads(json_str) if ORJSON_AVAILABLE else json.loads(json_str)
+                )
 
                 # 验证和标准化结果
                 result = {
@@ -280,24 +711,17 @@ class EnhancedClassifier:
 
             # 确定状态
             if confidence >= auto_threshold:
-                status = "auto_classified"
-                needs_review = False
-                review_reason = None
+                outcome = _STATUS_OUTCOMES[0]
             elif confidence >= review_threshold:
-                status = "needs_review"
-                needs_review = True
-                review_reason = "置信度不足，需要人工审核"
+                outcome = _STATUS_OUTCOMES[1]
             else:
-                status = "uncertain"
-                needs_review = True
-                review_reason = "置信度过低，无法确定分类"
+                outcome = _STATUS_OUTCOMES[2]
 
             # 检查是否有特殊标签需要审核
             tags = classification_result.get("tags", [])
-            if "机密" in tags or "内部" in tags:
-                needs_review = True
-                review_reason = "包含敏感标签，需要人工审核"
-                status = "needs_review"
+            if not self._sensitive_tags.isdisjoint(tags):
+                outcome = _SENSITIVE_OUTCOME
+            status, needs_review, review_reason = outcome
 
             return {
                 "status": status,
@@ -315,18 +739,62 @@ class EnhancedClassifier:
                 "confidence_level": "unknown",
             }
 
+    def _determine_statuses_batch(
+        self, confidences: List[float], tags_list: List[List[str]]
+    ) -> List[Dict[str, Any]]:
+        """一次确定整批结果的分类状态，规则与 _determine_classification_status 相同"""
+        scores = np.asarray(confidences, dtype=np.float64)
+        auto_threshold = self.confidence_thresholds.get("auto", 0.85)
+        review_threshold = self.confidence_thresholds.get("review", 0.6)
+
+        outcomes = np.where(
+            scores >= auto_threshold, 0, np.where(scores >= review_threshold, 1, 2)
+        ).tolist()
+        levels = np.searchsorted(_CONF_THRESHOLDS, scores, side="right").tolist()
+
+        # 循环内的属性查找提前绑定为局部变量
+        no_sensitive_tags = self._sensitive_tags.isdisjoint
+        statuses = []
+        append = statuses.append
+        for outcome, level, tags in zip(outcomes, levels, tags_list):
+            if not no_sensitive_tags(tags):
+                status, needs_review, review_reason = _SENSITIVE_OUTCOME
+            else:
+                status, needs_review, review_reason = _STATUS_OUTCOMES[outcome]
+            append(
+                {
+                    "status": status,
+                    "needs_review": needs_review,
+                    "review_reason": review_reason,
+                    "confidence_level": _CONF_LABELS[level],
+                }
+            )
+        return statuses
+
     def _get_confidence_level(self, confidence: float) -> str:
         """获取置信度等级"""
-        if confidence >= 0.9:
-            return "very_high"
-        elif confidence >= 0.8:
-            return "high"
-        elif confidence >= 0.7:
-            return "medium"
-        elif confidence >= 0.6:
-            return "low"
-        else:
-            return "very_low"
+        return _CONF_LABELS[bisect.bisect_right(_CONF_THRESHOLDS, confidence)]
+
+    @cached_property
+    def base_classifier(self) -> DocumentClassifier:
+        return self._create_component("base_classifier", DocumentClassifier)
+
+    @cached_property
+    def llm_classifier(self) -> LLMClassifier:
+        return self._create_component("llm_classifier", LLMClassifier)
+
+    @cached_property
+    def retrieval_agent(self) -> RetrievalAgent:
+        return self._create_component("retrieval_agent", RetrievalAgent)
+
+    def _create_component(self, name: str, factory):
+        """创建延迟组件；批量分类的流水线线程可能同时首次访问，加锁保证只创建一次"""
+        with self._component_lock:
+            component = self.__dict__.get(name)
+            if component is None:
+                component = factory(self.config)
+                self.__dict__[name] = component
+            return component
 
     def get_classification_summary(self) -> Dict[str, Any]:
         """获取分类摘要"""
@@ -360,12 +828,12 @@ class EnhancedClassifier:
                 validation["is_valid"] = False
                 validation["errors"].append("标签必须是列表")
             else:
-                # 检查标签是否在预定义体系中
-                all_valid_tags = []
-                for taxonomy_tags in self.taxonomies.values():
-                    all_valid_tags.extend(taxonomy_tags)
-
-                invalid_tags = [tag for tag in tags if tag not in all_valid_tags]
+                # 检查标签是否在预定义体系中（非字符串标签不可哈希时也视为无效）
+                invalid_tags = [
+                    tag
+                    for tag in tags
+                    if not isinstance(tag, str) or tag not in self._valid_tags
+                ]
                 if invalid_tags:
                     validation["warnings"].append(f"发现未定义的标签: {invalid_tags}")
 
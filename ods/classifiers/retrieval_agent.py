@@ -4,6 +4,8 @@
 """
 
 import logging
+import os
+import threading
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
@@ -12,8 +14,27 @@ from chromadb.config import Settings
 import json
 import time
 
+try:
+    import faiss
+
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 from ..embeddings.embedder import Embedder
 
+# 同一路径下的同名集合在进程内共享，向量库客户端不保证线程安全，
+# 所有访问该集合的 RetrievalAgent 共用一把锁
+_COLLECTION_LOCKS: Dict[Tuple[str, str], threading.RLock] = {}
+_COLLECTION_LOCKS_GUARD = threading.Lock()
+
+
+def _collection_lock(path: str, name: str) -> threading.RLock:
+    """返回 (路径, 集合名) 对应的共享锁"""
+    key = (os.path.abspath(str(path)), name)
+    with _COLLECTION_LOCKS_GUARD:
+        return _COLLECTION_LOCKS.setdefault(key, threading.RLock())
+
 
 class RetrievalAgent:
     """检索代理 - 负责向量检索和相似文档查找"""
@@ -42,6 +63,27 @@ class RetrievalAgent:
             or 0.7
         )
 
+        # 检索后端：chroma；faiss_flat（精确内积检索）；faiss_ivfpq（倒排 + 乘积
+        # 量化，向量压缩为 PQ 编码，大语料下每次查询读取的内存少得多）。
+        # 使用 faiss 时 Chroma 只负责元数据
+        self.backend = vector_store_cfg.get("backend", "chroma")
+        self.use_faiss = (
+            self.backend in ("faiss_flat", "faiss_ivfpq") and FAISS_AVAILABLE
+        )
+        if self.backend.startswith("faiss") and not FAISS_AVAILABLE:
+            self.logger.warning("未安装 faiss，检索回退到 ChromaDB")
+        self.faiss_index_factory = vector_store_cfg.get(
+            "faiss_index_factory", "IVF4096,PQ32"
+        )
+        self.faiss_nprobe = vector_store_cfg.get("faiss_nprobe", 16)
+        self.faiss_train_size = vector_store_cfg.get("faiss_train_size", 100000)
+        # 量化索引的落盘路径，启动时以 mmap 方式加载，省去重新训练
+        self.faiss_index_path = vector_store_cfg.get("faiss_index_path")
+        self._faiss_index = None  # 首次检索时从集合构建
+        self._faiss_ids: List[str] = []  # faiss 行号 -> 文档ID
+        # 保护集合读写和 faiss 索引状态，批量分类的工作线程会并发检索
+        self._lock = _collection_lock(self.vector_db_path, self.collection_name)
+
         # 初始化ChromaDB
         self.client = None
         self.collection = None
@@ -90,23 +132,64 @@ class RetrievalAgent:
         text_chunk: str = "",
     ) -> bool:
         """添加文档到向量数据库"""
+        return self.add_documents([(doc_id, embedding, metadata, text_chunk)])
+
+    def add_documents(
+        self, documents: List[Tuple[str, np.ndarray, Dict[str, Any], str]]
+    ) -> bool:
+        """批量添加文档，一次 collection.add 写入全部记录
+
+        Args:
+            documents: (doc_id, embedding, metadata, text_chunk) 元组列表，
+                同一批次中重复的 doc_id 只保留第一条
+        """
+        if not documents:
+            return True
+
         try:
-            # 准备元数据
-            doc_metadata = {
-                "doc_id": doc_id,
-                "timestamp": time.time(),
-                "text_chunk": text_chunk[:1000],  # 限制长度
-                **self._sanitize_metadata(metadata),
-            }
+            timestamp = time.time()
+            ids, embeddings, metadatas = [], [], []
+            seen = set()
+            for doc_id, embedding, metadata, text_chunk in documents:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                ids.append(doc_id)
+                embeddings.append(
+                    embedding.tolist()
+                    if hasattr(embedding, "tolist")
+                    else list(embedding)
+                )
+                metadatas.append(
+                    {
+                        "doc_id": doc_id,
+                        "timestamp": timestamp,
+                        "text_chunk": text_chunk[:1000],  # 限制长度
+                        **self._sanitize_metadata(metadata),
+                    }
+                )
 
-            emb = embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
-            self.collection.add(
-                embeddings=[emb],
-                metadatas=[doc_metadata],
-                ids=[doc_id]
-            )
+            with self._lock:
+                self.collection.add(
+                    embeddings=embeddings, metadatas=metadatas, ids=ids
+                )
 
-            self.logger.info(f"文档 {doc_id} 已添加到向量数据库")
+                if self._faiss_index is not None:
+                    if seen.intersection(self._faiss_ids):
+                        # 覆盖已有文档，下次检索时重建索引
+                        self._faiss_index = None
+                    else:
+                        try:
+                            self._faiss_index.add(self._unit_rows(embeddings))
+                            self._faiss_ids.extend(ids)
+                        except RuntimeError:
+                            # mmap 加载的索引只读，下次检索时重建
+                            self._faiss_index = None
+
+            if len(ids) == 1:
+                self.logger.info(f"文档 {ids[0]} 已添加到向量数据库")
+            else:
+                self.logger.info(f"{len(ids)} 个文档已批量添加到向量数据库")
             return True
 
         except Exception as e:
@@ -130,6 +213,155 @@ class RetrievalAgent:
                 sanitized[key] = str(value)
         return sanitized
 
+    @staticmethod
+    def _unit_rows(embeddings) -> np.ndarray:
+        """转换为按行归一化的连续 float32 矩阵，内积即余弦相似度"""
+        rows = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        return np.divide(rows, norms, out=np.zeros_like(rows), where=norms > 0)
+
+    def _build_faiss_index(self) -> None:
+        """从集合中的全部向量构建 faiss 索引
+
+        faiss_flat 为 IndexFlatIP；faiss_ivfpq 按 faiss_index_factory 训练量化
+        索引，样本不足以训练时退回 IndexFlatIP。配置了 faiss_index_path 时
+        优先加载与集合内容一致的已落盘索引。
+        """
+        quantized = self.backend == "faiss_ivfpq"
+        if quantized and self.faiss_index_path and self._load_faiss_index():
+            return
+
+        results = self.collection.get(include=["embeddings"])
+        ids = list(results.get("ids") or [])
+        embeddings = results.get("embeddings")
+        if not ids or embeddings is None or len(embeddings) == 0:
+            self._faiss_index, self._faiss_ids = None, []
+            return
+
+        rows = self._unit_rows(embeddings)
+        index = self._train_quantized_index(rows) if quantized else None
+        if index is None:
+            index = faiss.IndexFlatIP(rows.shape[1])
+        index.add(rows)
+        self._faiss_index, self._faiss_ids = index, ids
+
+        if quantized and self.faiss_index_path:
+            self._save_faiss_index()
+
+    def _train_quantized_index(self, rows: np.ndarray):
+        """按 faiss_index_factory 创建并训练内积量化索引，失败时返回 None"""
+        sample = rows
+        if len(rows) > self.faiss_train_size:
+            picked = np.random.default_rng(0).choice(
+                len(rows), self.faiss_train_size, replace=False
+            )
+            sample = rows[picked]
+
+        try:
+            index = faiss.index_factory(
+                rows.shape[1], self.faiss_index_factory, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(sample)
+        except RuntimeError as e:
+            # 聚类中心数多于样本数、维度不能被 PQ 分段整除等
+            self.logger.warning(
+                f"量化索引训练失败（{len(sample)} 条样本），改用精确检索: {e}"
+            )
+            return None
+
+        self._set_nprobe(index)
+        return index
+
+    def _set_nprobe(self, index) -> None:
+        """设置倒排索引每次查询探查的聚类数"""
+        try:
+            faiss.ParameterSpace().set_index_parameter(
+                index, "nprobe", self.faiss_nprobe
+            )
+        except RuntimeError:
+            pass  # 非倒排索引没有 nprobe
+
+    def _faiss_ids_path(self) -> Path:
+        return Path(f"{self.faiss_index_path}.ids.json")
+
+    def _save_faiss_index(self) -> None:
+        """把索引和行号对应的文档ID写入磁盘"""
+        try:
+            Path(self.faiss_index_path).parent.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(self._faiss_index, str(self.faiss_index_path))
+            self._faiss_ids_path().write_text(
+                json.dumps(self._faiss_ids, ensure_ascii=False), encoding="utf-8"
+            )
+        except (OSError, RuntimeError) as e:
+            self.logger.warning(f"faiss 索引保存失败: {e}")
+
+    def _load_faiss_index(self) -> bool:
+        """以 mmap 方式加载落盘索引，文档ID与集合不一致时返回 False"""
+        try:
+            stored_ids = json.loads(self._faiss_ids_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        current_ids = self.collection.get(include=[]).get("ids") or []
+        if stored_ids != list(current_ids):
+            return False
+
+        try:
+            index = faiss.read_index(str(self.faiss_index_path), faiss.IO_FLAG_MMAP)
+        except RuntimeError as e:
+            self.logger.warning(f"faiss 索引加载失败: {e}")
+            return False
+
+        self._set_nprobe(index)
+        self._faiss_index, self._faiss_ids = index, stored_ids
+        return True
+
+    def _faiss_index_stale(self) -> bool:
+        """索引行数与集合文档数不一致时返回 True
+
+        同一集合可能被其他 RetrievalAgent 实例写入（分类器写入、LLM 分类器
+        检索），本实例的增量更新看不到这些写入，检索前按文档数校验一次。
+        """
+        return self.collection.count() != len(self._faiss_ids)
+
+    def _search_faiss(self, query_embeddings, top_k: int) -> Dict[str, Any]:
+        """在 faiss 索引中检索，返回与 collection.query 相同结构的结果
+
+        query_embeddings 为 (N, d) 矩阵，N 个查询在一次 index.search 中完成，
+        命中文档的元数据也只取一次。
+        """
+        n_queries = len(query_embeddings)
+        if self._faiss_index is None or self._faiss_index_stale():
+            self._build_faiss_index()
+        if self._faiss_index is None:
+            return {
+                "ids": [[] for _ in range(n_queries)],
+                "metadatas": [[] for _ in range(n_queries)],
+                "distances": [[] for _ in range(n_queries)],
+            }
+
+        scores, rows = self._faiss_index.search(
+            self._unit_rows(query_embeddings), top_k
+        )
+        hits = [
+            [(int(r), float(sc)) for r, sc in zip(row, score) if r >= 0]
+            for row, score in zip(rows, scores)
+        ]
+        ids = [[self._faiss_ids[r] for r, _ in row] for row in hits]
+        unique_ids = list(dict.fromkeys(doc_id for row in ids for doc_id in row))
+        stored = (
+            self.collection.get(ids=unique_ids)
+            if unique_ids
+            else {"ids": [], "metadatas": []}
+        )
+        metadata_by_id = dict(zip(stored["ids"], stored["metadatas"]))
+        return {
+            "ids": ids,
+            "metadatas": [
+                [metadata_by_id.get(doc_id, {}) for doc_id in row] for row in ids
+            ],
+            "distances": [[1.0 - score for _, score in row] for row in hits],
+        }
+
     def search_similar_documents(
         self,
         query_embedding: np.ndarray,
@@ -138,10 +370,6 @@ class RetrievalAgent:
     ) -> List[Dict[str, Any]]:
         """搜索相似文档"""
         try:
-            if top_k is None:
-                top_k = self.top_k
-
-            # 执行向量搜索
             # 确保query_embedding是列表格式
             if isinstance(query_embedding, list):
                 query_embedding_list = query_embedding
@@ -150,39 +378,9 @@ class RetrievalAgent:
             else:
                 query_embedding_list = list(query_embedding)
 
-            results = self.collection.query(
-                query_embeddings=[query_embedding_list],
-                n_results=top_k,
-                where=filter_metadata,
-                include=["metadatas", "distances", "documents"],
-            )
-
-            # 处理结果
-            similar_docs = []
-            ids = results.get('ids', [])
-            metadatas = results.get('metadatas', [])
-            distances = results.get('distances', [])
-            if ids and ids[0]:
-                metadata_container = metadatas[0] if metadatas else []
-                for i in range(len(ids[0])):
-                    # 兼容Chroma不同版本返回的结构：可能是列表也可能是字典
-                    if isinstance(metadata_container, dict):
-                        metadata = metadata_container.get(ids[0][i], {})
-                    else:
-                        metadata = metadata_container[i]
-                    distance = distances[0][i] if distances and distances[0] else 0
-                    doc_info = {
-                        'doc_id': ids[0][i],
-                        'metadata': metadata,
-                        'distance': distance,
-                        'similarity_score': 1 - distance,
-                        'text_chunk': metadata.get('text_chunk', '')
-                    }
-
-                    # 过滤低相似度结果
-                    if doc_info["similarity_score"] >= self.similarity_threshold:
-                        similar_docs.append(doc_info)
-
+            similar_docs = self._search(
+                [query_embedding_list], top_k, filter_metadata
+            )[0]
             self.logger.info(f"找到 {len(similar_docs)} 个相似文档")
             return similar_docs
 
@@ -190,6 +388,101 @@ class RetrievalAgent:
             self.logger.error(f"搜索相似文档失败: {e}")
             return []
 
+    def search_batch(
+        self,
+        query_embeddings,
+        top_k: Optional[int] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """批量搜索相似文档
+
+        query_embeddings 为 (N, d) 矩阵或向量列表，所有查询在一次
+        faiss index.search（或一次 collection.query）中完成。
+
+        Returns:
+            List[List[Dict[str, Any]]]: 每个查询对应的相似文档列表
+        """
+        if len(query_embeddings) == 0:
+            return []
+
+        try:
+            if self.use_faiss and not filter_metadata:
+                queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+            else:
+                queries = [
+                    q.tolist() if hasattr(q, "tolist") else list(q)
+                    for q in query_embeddings
+                ]
+            results = self._search(queries, top_k, filter_metadata)
+            self.logger.info(
+                f"批量检索 {len(results)} 个查询，"
+                f"共找到 {sum(len(r) for r in results)} 个相似文档"
+            )
+            return results
+
+        except Exception as e:
+            self.logger.error(f"批量搜索相似文档失败: {e}")
+            return [[] for _ in range(len(query_embeddings))]
+
+    def _search(
+        self,
+        queries,
+        top_k: Optional[int],
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> List[List[Dict[str, Any]]]:
+        """执行向量搜索并把每个查询的结果整理为文档列表"""
+        if top_k is None:
+            top_k = self.top_k
+
+        with self._lock:
+            if self.use_faiss and not filter_metadata:
+                # faiss 不支持元数据过滤，带过滤条件的检索仍走 ChromaDB
+                results = self._search_faiss(queries, top_k)
+            else:
+                results = self.collection.query(
+                    query_embeddings=queries,
+                    n_results=top_k,
+                    where=filter_metadata,
+                    include=["metadatas", "distances", "documents"],
+                )
+
+        ids = results.get('ids', [])
+        metadatas = results.get('metadatas', [])
+        distances = results.get('distances', [])
+        return [
+            self._collect_similar_docs(
+                ids[row] if row < len(ids) else [],
+                metadatas[row] if row < len(metadatas) else [],
+                distances[row] if row < len(distances) else [],
+            )
+            for row in range(len(queries))
+        ]
+
+    def _collect_similar_docs(
+        self, ids: List[str], metadata_container, distances: List[float]
+    ) -> List[Dict[str, Any]]:
+        """整理单个查询的检索结果，过滤低相似度文档"""
+        similar_docs = []
+        for i in range(len(ids or [])):
+            # 兼容Chroma不同版本返回的结构：可能是列表也可能是字典
+            if isinstance(metadata_container, dict):
+                metadata = metadata_container.get(ids[i], {})
+            else:
+                metadata = metadata_container[i]
+            distance = distances[i] if distances else 0
+            doc_info = {
+                'doc_id': ids[i],
+                'metadata': metadata,
+                'distance': distance,
+                'similarity_score': 1 - distance,
+                'text_chunk': metadata.get('text_chunk', '')
+            }
+
+            # 过滤低相似度结果
+            if doc_info["similarity_score"] >= self.similarity_threshold:
+                similar_docs.append(doc_info)
+        return similar_docs
+
     def get_category_examples(
         self, category: str, top_k: int = 3
     ) -> List[Dict[str, Any]]:
@@ -199,7 +492,8 @@ class RetrievalAgent:
             filter_metadata = {"category": category}
 
             # 获取该类别的所有文档
-            results = self.collection.get(where=filter_metadata, limit=top_k)
+            with self._lock:
+                results = self.collection.get(where=filter_metadata, limit=top_k)
 
             examples = []
             if results["ids"]:
@@ -218,6 +512,29 @@ class RetrievalAgent:
             self.logger.error(f"获取类别示例失败: {e}")
             return []
 
+    def get_category_centroids(
+        self, categories: List[str]
+    ) -> Tuple[List[str], Optional[np.ndarray]]:
+        """计算各类别已入库文档向量的归一化中心，跳过没有向量的类别"""
+        names, centroids = [], []
+        for category in categories:
+            with self._lock:
+                results = self.collection.get(
+                    where={"category": category}, include=["embeddings"]
+                )
+            embeddings = results.get("embeddings")
+            if embeddings is None or len(embeddings) == 0:
+                continue
+            centroid = np.asarray(embeddings, dtype=np.float32).mean(axis=0)
+            norm = np.linalg.norm(centroid)
+            if norm > 0:
+                names.append(category)
+                centroids.append(centroid / norm)
+
+        if not names:
+            return [], None
+        return names, np.ascontiguousarray(centroids, dtype=np.float32)
+
     def get_all_categories(self) -> List[str]:
         """获取所有已存在的类别"""
         try:
@@ -239,25 +556,27 @@ class RetrievalAgent:
     def update_document(self, doc_id: str, new_metadata: Dict[str, Any]) -> bool:
         """更新文档元数据"""
         try:
-            # 获取现有文档
-            results = self.collection.get(ids=[doc_id])
-            if not results["ids"]:
-                self.logger.warning(f"文档 {doc_id} 不存在")
-                return False
-
-            # 更新元数据
-            updated_metadata = {**results["metadatas"][0], **new_metadata}
-
-            # 删除旧文档
-            self.collection.delete(ids=[doc_id])
-
-            # 重新添加（保持相同的embedding）
-            self.collection.add(
-                embeddings=results["embeddings"],
-                metadatas=[updated_metadata],
-                ids=[doc_id],
-            )
+            with self._lock:
+                # 获取现有文档
+                results = self.collection.get(ids=[doc_id])
+                if not results["ids"]:
+                    self.logger.warning(f"文档 {doc_id} 不存在")
+                    return False
+
+                # 更新元数据
+                updated_metadata = {**results["metadatas"][0], **new_metadata}
+
+                # 删除旧文档
+                self.collection.delete(ids=[doc_id])
+
+                # 重新添加（保持相同的embedding）
+                self.collection.add(
+                    embeddings=results["embeddings"],
+                    metadatas=[updated_metadata],
+                    ids=[doc_id],
+                )
 
+                self._faiss_index = None
             self.logger.info(f"文档 {doc_id} 元数据已更新")
             return True
 
@@ -268,7 +587,9 @@ class RetrievalAgent:
     def delete_document(self, doc_id: str) -> bool:
         """删除文档"""
         try:
-            self.collection.delete(ids=[doc_id])
+            with self._lock:
+                self.collection.delete(ids=[doc_id])
+                self._faiss_index = None
             self.logger.info(f"文档 {doc_id} 已删除")
             return True
 
@@ -304,6 +625,7 @@ class RetrievalAgent:
                 name=self.collection_name,
                 metadata={"description": "文档分类向量数据库"},
             )
+            self._faiss_index = None
             self.logger.info(f"集合 {self.collection_name} 已重置")
             return True
 
@@ -0,0 +1,149 @@
+"""
+语义缓存模块
+按文档向量缓存分类结果，近似重复的文档直接复用已有结果
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """语义缓存 - 余弦相似度不低于阈值时返回缓存的分类结果
+
+    向量归一化后存放在预分配的矩阵中，查询即一次矩阵向量乘；
+    条目数达到 max_entries 后按写入顺序覆盖最早的条目。
+    指定 db_path 时同时写入 SQLite（以向量字节的 SHA-256 为键），
+    新进程启动时读回最近的 max_entries 条。
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        threshold: float = 0.97,
+        db_path: Optional[str] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, d)
+        self._results: List[Dict[str, Any]] = []
+        self._next = 0  # 下一个写入位置
+
+        self._conn = None
+        if db_path:
+            self._open_db(db_path)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def lookup(self, embedding) -> Optional[Dict[str, Any]]:
+        """查找最相似的缓存结果，未命中时返回 None；返回的是副本"""
+        query = self._unit(embedding)
+        if query is None:
+            return None
+
+        with self._lock:
+            count = len(self._results)
+            if count == 0 or self._vectors.shape[1] != query.shape[0]:
+                return None
+            similarities = self._vectors[:count] @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return copy.deepcopy(self._results[best])
+
+    def add(self, embedding, result: Dict[str, Any]) -> None:
+        """缓存一条分类结果"""
+        vector = self._unit(embedding)
+        if vector is None:
+            return
+
+        with self._lock:
+            self._store(vector, copy.deepcopy(result))
+
+        if self._conn is not None:
+            self._persist(vector, result)
+
+    def clear(self) -> None:
+        """清空缓存（包括 SQLite 中的记录）"""
+        with self._lock:
+            self._vectors, self._results, self._next = None, [], 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM semantic_cache")
+
+    def _store(self, vector: np.ndarray, result: Dict[str, Any]) -> None:
+        # 向量维度变化说明换了嵌入模型，旧条目不再可比，直接丢弃
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+            self._vectors = np.empty(
+                (self.max_entries, vector.shape[0]), dtype=np.float32
+            )
+            self._results, self._next = [], 0
+
+        self._vectors[self._next] = vector
+        if self._next < len(self._results):
+            self._results[self._next] = result
+        else:
+            self._results.append(result)
+        self._next = (self._next + 1) % self.max_entries
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if vector.size == 0 or norm == 0.0:
+            return None
+        return vector / norm
+
+    def _open_db(self, db_path: str) -> None:
+        try:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                db_path, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache ("
+                "key TEXT PRIMARY KEY, embedding BLOB NOT NULL, result TEXT NOT NULL)"
+            )
+            rows = self._conn.execute(
+                "SELECT embedding, result FROM semantic_cache "
+                "ORDER BY rowid DESC LIMIT ?",
+                (self.max_entries,),
+            ).fetchall()
+        except sqlite3.Error as e:
+            self.logger.warning(f"语义缓存数据库不可用，仅使用内存缓存: {e}")
+            self._conn = None
+            return
+
+        for blob, result in reversed(rows):
+            self._store(np.frombuffer(blob, dtype=np.float32), json.loads(result))
+        if rows:
+            self.logger.info("从 %s 载入 %d 条语义缓存", db_path, len(rows))
+
+    def _persist(self, vector: np.ndarray, result: Dict[str, Any]) -> None:
+        blob = vector.tobytes()
+        try:
+            payload = json.dumps(result, ensure_ascii=False)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO semantic_cache VALUES (?, ?, ?)",
+                    (hashlib.sha256(blob).hexdigest(), blob, payload),
+                )
+                # 只保留最近的 max_entries 条
+                self._conn.execute(
+                    "DELETE FROM semantic_cache WHERE rowid <= "
+                    "(SELECT MAX(rowid) FROM semantic_cache) - ?",
+                    (self.max_entries,),
+                )
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            self.logger.warning(f"语义缓存写入数据库失败: {e}")
@@ -1039,7 +1039,7 @@ def watch(
                                 processed_files.add(file_path)
 
                             if not quiet:
-                                file_name = Path(file_path).name
+                                file_name = os.path.basename(file_path)
                                 if result.get("status") == "completed":
                                     click.echo(f"✅ 处理完成: {file_name}")
                                 elif result.get("status") == "skipped":
@@ -1050,7 +1050,7 @@ def watch(
 
                         except Exception as e:
                             if not quiet:
-                                click.echo(f"❌ 任务异常: {Path(file_path).name} - {e}")
+                                click.echo(f"❌ 任务异常: {os.path.basename(file_path)} - {e}")
 
                     # 显示状态
                     with processing_lock:
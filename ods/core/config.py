@@ -11,6 +11,8 @@ from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, field
 import logging
 
+from ..utils.file_utils import load_yaml_cached
+
 
 @dataclass
 class LLMConfig:
@@ -138,8 +140,8 @@ class Config:
     def load_config(self) -> None:
         """加载配置文件"""
         try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                config_data = yaml.safe_load(f)
+            # 源文件未变化时直接读取旁边的 JSON 缓存，跳过 YAML 解析
+            config_data = load_yaml_cached(self.config_path)
 
             if not config_data:
                 self.logger.warning("配置文件为空，使用默认配置")
@@ -14,6 +14,12 @@ from dataclasses import dataclass
 from typing import List, Iterable
 import re
 
+# Compiled once: every document goes through these on the embedding path.
+_WHITESPACE_RE = re.compile(r"\s+")
+# a sentence is a run ending in terminal punctuation, or a trailing remainder
+_SENTENCE_RE = re.compile(r"[^。！？!?]*[。！？!?]|[^。！？!?]+")
+_NON_WORD_RE = re.compile(r"\W+")
+
 
 @dataclass
 class TextProcessor:
@@ -36,7 +42,7 @@ class TextProcessor:
         """Normalise whitespace and strip surrounding blanks."""
 
         # collapse consecutive whitespace characters into a single space
-        cleaned = re.sub(r"\s+", " ", text).strip()
+        cleaned = _WHITESPACE_RE.sub(" ", text).strip()
         return cleaned
 
     # ------------------------------------------------------------------
@@ -55,22 +61,25 @@ class TextProcessor:
         if overlap_size is None:
             overlap_size = self.overlap_size
 
-        # 先按句子分割，确保短文本也能得到多个片段
-        sentences = [s for s in re.split(r"(?<=[。！？!?])", text) if s]
+        # 先按句子分割，确保短文本也能得到多个片段；句子在一次正则扫描中切出，
+        # 片段用列表累积后一次性拼接，避免逐句的字符串拼接
         chunks: List[str] = []
-        current = ""
-        for sent in sentences:
-            if len(current) + len(sent) >= chunk_size and current:
-                chunks.append(current.strip())
-                current = sent
+        parts: List[str] = []
+        length = 0
+        for sent in _SENTENCE_RE.findall(text):
+            if parts and length + len(sent) >= chunk_size:
+                chunks.append("".join(parts).strip())
+                parts, length = [sent], len(sent)
             else:
-                current += sent
+                parts.append(sent)
+                length += len(sent)
 
+        current = "".join(parts)
         if current.strip():
             chunks.append(current.strip())
 
         # 如果仅得到一个片段且其长度仍然超过限制，则退回到滑动窗口策略
-        if len(chunks) <= 1 and len(chunks[0]) > chunk_size:
+        if len(chunks) == 1 and len(chunks[0]) > chunk_size:
             chunks = []
             start = 0
             text_length = len(text)
@@ -103,7 +112,7 @@ class TextProcessor:
         """
 
         # Basic tokenisation on non-word characters
-        tokens = [t for t in re.split(r"\W+", text) if t]
+        tokens = [t for t in _NON_WORD_RE.split(text) if t]
         frequency: dict[str, int] = {}
         for token in tokens:
             frequency[token] = frequency.get(token, 0) + 1
@@ -1,12 +1,17 @@
 import logging
+import os
 import re
 import json
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
+from bisect import bisect_right
+from itertools import accumulate
 import yaml
 from jinja2 import Template, Environment, BaseLoader
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 class Renamer:
     """命名生成器 - 根据文档内容和元数据生成有意义的文件名"""
@@ -21,6 +26,8 @@ class Renamer:
             "default_template", "{{category}}-{{title}}-{{date}}.{{ext}}"
         )
         self.max_filename_length = self.naming_config.get("max_filename_length", 200)
+        # 大多数文件系统（ext4、NTFS 等）按字节限制文件名长度
+        self.max_filename_bytes = self.naming_config.get("max_filename_bytes", 255)
         self.enable_llm_title = self.naming_config.get("enable_llm_title", True)
         self.title_max_length = self.naming_config.get("title_max_length", 50)
         self.conflict_resolution = self.naming_config.get(
@@ -30,15 +37,24 @@ class Renamer:
         # 特殊字符处理
         self.invalid_chars = self.naming_config.get("invalid_chars", r'[<>:"/\\|?*]')
         self.replacement_char = self.naming_config.get("replacement_char", "_")
+        self._invalid_re = re.compile(self.invalid_chars)
+        # 简单字符类用 str.translate 替换，比正则快；其他正则保留 re.sub
+        self._clean_table = self._build_clean_table(
+            self.invalid_chars, self.replacement_char
+        )
 
         # 加载命名模板
         self.templates = self._load_naming_templates()
+        # (category, ext) -> 选中的模板，模板增删时清空
+        self._template_lookup: Dict[Tuple[str, str], str] = {}
 
         # 初始化Jinja2环境
         self.jinja_env = Environment(loader=BaseLoader())
         self.jinja_env.filters['strftime'] = self._strftime_filter
         self.jinja_env.filters['truncate'] = self._truncate_filter
         self.jinja_env.filters['clean_filename'] = self._clean_filename_filter
+        # from_string 每次都会重新解析模板，按模板文本缓存编译结果
+        self._template_cache: Dict[str, Template] = {}
 
         # 测试环境需要的目录
         base = Path('test_output')
@@ -187,17 +203,24 @@ class Renamer:
         self, category: str, document_info: Dict[str, Any]
     ) -> str:
         """选择命名模板"""
+        file_ext = document_info.get("ext", "")
+        key = (category, file_ext)
+        template = self._template_lookup.get(key)
+        if template is not None:
+            return template
+
         # 检查是否有类别特定的模板
         if category in self.templates:
-            return self.templates[category]
-
+            template = self.templates[category]
         # 检查文件类型特定的模板
-        file_ext = document_info.get("ext", "")
-        if file_ext in self.templates:
-            return self.templates[file_ext]
-
+        elif file_ext in self.templates:
+            template = self.templates[file_ext]
         # 使用默认模板
-        return self.default_template
+        else:
+            template = self.default_template
+
+        self._template_lookup[key] = template
+        return template
 
     def _apply_naming_template(
         self, template: str, document_info: Dict[str, Any]
@@ -205,11 +228,11 @@ class Renamer:
         """应用命名模板"""
         try:
             # 使用Jinja2渲染模板
-            jinja_template = self.jinja_env.from_string(template)
+            jinja_template = self._get_template(template)
             filename = jinja_template.render(**document_info)
 
             # 清理多余的空白字符
-            filename = re.sub(r"\s+", " ", filename).strip()
+            filename = _WHITESPACE_RE.sub(" ", filename).strip()
 
             return filename
 
@@ -218,6 +241,14 @@ class Renamer:
             # 回退到简单替换
             return self._simple_template_replace(template, document_info)
 
+    def _get_template(self, template: str) -> Template:
+        """获取编译后的模板，未编译过的模板编译后缓存"""
+        jinja_template = self._template_cache.get(template)
+        if jinja_template is None:
+            jinja_template = self.jinja_env.from_string(template)
+            self._template_cache[template] = jinja_template
+        return jinja_template
+
     def _simple_template_replace(
         self, template: str, document_info: Dict[str, Any]
     ) -> str:
@@ -235,7 +266,10 @@ class Renamer:
             return "未命名文件"
 
         # 替换无效字符
-        clean_name = re.sub(self.invalid_chars, self.replacement_char, filename)
+        if self._clean_table is not None:
+            clean_name = filename.translate(self._clean_table)
+        else:
+            clean_name = self._invalid_re.sub(self.replacement_char, filename)
 
         # 移除首尾的点和空格
         clean_name = clean_name.strip(". ")
@@ -246,9 +280,45 @@ class Renamer:
 
         return clean_name
 
+    @staticmethod
+    def _build_clean_table(
+        pattern: str, replacement: str
+    ) -> Optional[Dict[int, str]]:
+        """把形如 [<>:"/\\|?*] 的字符类转换为 str.translate 的映射表
+
+        含范围、取反或 \\d 等类别转义时返回 None，由调用方回退到正则。
+        """
+        if len(pattern) < 3 or pattern[0] != "[" or pattern[-1] != "]":
+            return None
+
+        body = pattern[1:-1]
+        if body.startswith("^"):
+            return None
+
+        chars = set()
+        i = 0
+        while i < len(body):
+            char = body[i]
+            if char == "\\":
+                if i + 1 >= len(body) or body[i + 1].isalnum():
+                    return None
+                char = body[i + 1]
+                i += 1
+            elif char in "[]" or (char == "-" and 0 < i < len(body) - 1):
+                return None
+            chars.add(char)
+            i += 1
+
+        if not chars:
+            return None
+        return str.maketrans({char: replacement for char in chars})
+
     def _truncate_filename(self, filename: str) -> str:
-        """截断过长的文件名"""
-        if len(filename) <= self.max_filename_length:
+        """截断过长的文件名，同时满足字符数和 UTF-8 字节数限制"""
+        if (
+            len(filename) <= self.max_filename_length
+            and self._utf8_length(filename) <= self.max_filename_bytes
+        ):
             return filename
 
         # 保留扩展名
@@ -256,11 +326,32 @@ class Renamer:
         if len(name_parts) > 1:
             stem, ext = name_parts
             max_stem_length = self.max_filename_length - len(ext) - 3
-            if max_stem_length > 10:
-                return f"{stem[:max_stem_length]}...{ext}"
+            max_stem_bytes = self.max_filename_bytes - self._utf8_length(ext) - 3
+            if max_stem_length > 10 and max_stem_bytes > 10:
+                stem = self._utf8_prefix(stem, max_stem_length, max_stem_bytes)
+                return f"{stem}...{ext}"
 
         # 没有扩展名或扩展名太长
-        return filename[: self.max_filename_length - 3] + "..."
+        return (
+            self._utf8_prefix(
+                filename, self.max_filename_length - 3, self.max_filename_bytes - 3
+            )
+            + "..."
+        )
+
+    @staticmethod
+    def _utf8_length(text: str) -> int:
+        return len(text.encode("utf-8", "surrogatepass"))
+
+    @staticmethod
+    def _utf8_prefix(text: str, max_chars: int, max_bytes: int) -> str:
+        """最长的前缀，字符数不超过 max_chars 且 UTF-8 字节数不超过 max_bytes"""
+        text = text[:max_chars]
+        # 逐字符累计字节数，二分查找截断位置，不会截断在多字节字符中间
+        cumulative = list(
+            accumulate(len(char.encode("utf-8", "surrogatepass")) for char in text)
+        )
+        return text[: bisect_right(cumulative, max_bytes)]
 
     def _build_new_path(self, primary_path: str, new_filename: str) -> str:
         """构建新路径"""
@@ -299,30 +390,46 @@ class Renamer:
 
         return conflict_info
 
+    @staticmethod
+    def _existing_names(directory: Path) -> set:
+        """一次 scandir 取得目录下已有的文件名，代替逐个候选名 stat"""
+        try:
+            with os.scandir(directory) as entries:
+                return {os.path.normcase(entry.name) for entry in entries}
+        except OSError:
+            return set()
+
     def _resolve_filename_conflict_with_suffix(self, path: str) -> str:
         """通过添加后缀解决文件名冲突"""
         path_obj = Path(path)
-        counter = 1
+        stem = path_obj.stem
+        suffix = path_obj.suffix
+        # 每次调用重新扫描，保证看到其他进程新写入的文件
+        existing = self._existing_names(path_obj.parent)
 
-        if not path_obj.exists():
-            return str(path_obj.parent / f"{path_obj.stem}_{counter}{path_obj.suffix}")
+        counter = 1
+        if os.path.normcase(path_obj.name) not in existing:
+            return str(path_obj.parent / f"{stem}_{counter}{suffix}")
 
-        while path_obj.exists():
-            stem = path_obj.stem
-            suffix = path_obj.suffix
-            new_name = f"{stem}_{counter}{suffix}"
-            path_obj = path_obj.parent / new_name
+        while os.path.normcase(f"{stem}_{counter}{suffix}") in existing:
             counter += 1
 
-        return str(path_obj)
+        return str(path_obj.parent / f"{stem}_{counter}{suffix}")
 
     def _resolve_filename_conflict_with_timestamp(self, path: str) -> str:
         """通过添加时间戳解决文件名冲突"""
         path_obj = Path(path)
         timestamp = datetime.now().strftime("%H%M%S")
-        stem = path_obj.stem
+        stem = f"{path_obj.stem}_{timestamp}"
         suffix = path_obj.suffix
-        new_name = f"{stem}_{timestamp}{suffix}"
+        new_name = f"{stem}{suffix}"
+
+        # 同一秒内的重复冲突再追加序号
+        existing = self._existing_names(path_obj.parent)
+        counter = 1
+        while os.path.normcase(new_name) in existing:
+            new_name = f"{stem}_{counter}{suffix}"
+            counter += 1
 
         return str(path_obj.parent / new_name)
 
@@ -389,6 +496,12 @@ class Renamer:
         """添加命名模板"""
         try:
             self.templates[category] = template
+            self._template_lookup.clear()
+            # 预先编译，首次使用时无需解析
+            try:
+                self._get_template(template)
+            except Exception as e:
+                self.logger.warning(f"命名模板编译失败，将使用简单替换: {e}")
             self._save_naming_templates()
             self.logger.info(f"添加命名模板成功: {category}")
             return True
@@ -401,6 +514,7 @@ class Renamer:
         try:
             if category in self.templates:
                 del self.templates[category]
+                self._template_lookup.clear()
                 self._save_naming_templates()
                 self.logger.info(f"移除命名模板成功: {category}")
                 return True
@@ -452,7 +566,7 @@ class Renamer:
             )
 
         # 检查文件名是否包含无效字符
-        if re.search(self.invalid_chars, new_filename):
+        if self._invalid_re.search(new_filename):
             validation_result["errors"].append("文件名包含无效字符")
 
         # 检查路径格式
@@ -4,9 +4,13 @@
 统一的文档解析入口，根据文件类型自动选择合适的解析器
 """
 
-from typing import Dict, Any, List, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional
 from pathlib import Path
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import logging
+import multiprocessing
+import os
 
 from .base_parser import ParseResult
 from .pdf_parser import PDFParser
@@ -14,6 +18,25 @@ from .office_parser import OfficeParser
 from .text_parser import TextParser
 from .ocr_parser import OCRParser
 
+# CPU 密集的格式，配置了 parser.process_workers 时交给进程池解析
+CPU_BOUND_EXTENSIONS = frozenset(
+    [".pdf", ".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif", ".gif"]
+)
+
+# 进程池中每个工作进程各自持有的解析器，由 _init_worker 创建
+_worker_parser: Optional["DocumentParser"] = None
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    """进程池初始化：配置只在进程启动时传递一次"""
+    global _worker_parser
+    _worker_parser = DocumentParser(config)
+
+
+def _parse_in_worker(file_path: str) -> ParseResult:
+    """在进程池工作进程中解析单个文件"""
+    return _worker_parser.parse(file_path)
+
 
 class DocumentParser:
     """
@@ -44,9 +67,17 @@ class DocumentParser:
         # 是否启用OCR作为后备方案
         self.ocr_fallback = config.get("parser", {}).get("ocr_fallback", True)
 
+        # 批量解析并发度：线程池处理 I/O 密集文件，
+        # 进程池（默认关闭）处理 CPU 密集文件
+        self.max_workers = config.get("parser", {}).get("max_workers", 4)
+        self.process_workers = config.get("parser", {}).get("process_workers", 0)
+
         # 支持的文件扩展名
         self.supported_extensions = self._get_supported_extensions()
 
+        # 解析器在初始化后不再变化，信息只构建一次
+        self._parser_info = self._build_parser_info()
+
         self.logger.info(
             f"文档解析器初始化完成，支持的文件类型: {self.supported_extensions}"
         )
@@ -314,51 +345,81 @@ class DocumentParser:
         extension = file_path.suffix.lower()
         return extension in self.supported_extensions
 
-    def get_parser_info(self) -> Dict[str, Any]:
+    def get_parser_info(self) -> Mapping[str, Any]:
         """
         获取解析器信息
 
+        信息在初始化时构建一次，每次调用返回同一个只读视图，列表类信息为元组。
+
         Returns:
-            Dict[str, Any]: 解析器信息
+            Mapping[str, Any]: 解析器信息
         """
+        return self._parser_info
+
+    def _build_parser_info(self) -> Mapping[str, Any]:
+        """构建只读的解析器信息"""
         info = {
-            "available_parsers": list(self.parsers.keys()),
-            "supported_extensions": self.supported_extensions,
-            "parser_priority": self.parser_priority,
+            "available_parsers": tuple(self.parsers.keys()),
+            "supported_extensions": tuple(self.supported_extensions),
+            "parser_priority": tuple(self.parser_priority),
             "ocr_fallback": self.ocr_fallback,
         }
 
         # 各解析器支持的扩展名
-        parser_extensions = {}
-        for name, parser in self.parsers.items():
-            parser_extensions[name] = parser.supported_extensions
-        info["parser_extensions"] = parser_extensions
+        info["parser_extensions"] = MappingProxyType(
+            {
+                name: tuple(parser.supported_extensions)
+                for name, parser in self.parsers.items()
+            }
+        )
 
-        return info
+        return MappingProxyType(info)
 
     def parse_batch(self, file_paths: List[str | Path]) -> List[ParseResult]:
         """
         批量解析文件
 
+        文件在线程池中并发解析，使磁盘读取与解析计算重叠；
+        配置了 parser.process_workers 时，PDF 和图片等 CPU 密集文件
+        改由进程池解析。返回结果的顺序与输入一致。
+
         Args:
             file_paths: 文件路径列表
 
         Returns:
             List[ParseResult]: 解析结果列表
         """
-        results = []
-
-        for file_path in file_paths:
-            try:
-                result = self.parse(file_path)
-                results.append(result)
-            except Exception as e:
-                error_result = ParseResult(
-                    success=False,
-                    error=f"批量解析异常: {str(e)}",
-                    file_path=str(file_path),
+        results: List[Optional[ParseResult]] = [None] * len(file_paths)
+
+        cpu_bound = []
+        io_bound = []
+        for index, file_path in enumerate(file_paths):
+            # os.path 在循环中比逐个构造 Path 对象更轻
+            extension = os.path.splitext(file_path)[1].lower()
+            if self.process_workers and extension in CPU_BOUND_EXTENSIONS:
+                cpu_bound.append(index)
+            else:
+                io_bound.append(index)
+
+        if len(io_bound) <= 1 or self.max_workers <= 1:
+            for index in io_bound:
+                results[index] = self._parse_safely(self.parse, file_paths[index])
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                self._collect(executor, self.parse, file_paths, io_bound, results)
+
+        if cpu_bound:
+            # spawn 而非 fork：宿主进程中可能已有线程（线程池、numba/BLAS
+            # 工作线程），fork 后子进程可能因继承的锁而挂起；与 Windows 行为一致
+            with ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.config,),
+            ) as executor:
+                self._collect(
+                    executor, _parse_in_worker, file_paths, cpu_bound, results
                 )
-                results.append(error_result)
 
         # 记录批量解析统计
         success_count = sum(1 for r in results if r.success)
@@ -368,6 +429,34 @@ class DocumentParser:
 
         return results
 
+    def _collect(
+        self,
+        executor: Executor,
+        parse_fn,
+        file_paths: List[str | Path],
+        indices: List[int],
+        results: List[Optional[ParseResult]],
+    ) -> None:
+        """在 executor 中解析 indices 对应的文件，按原始位置写回 results"""
+        futures = {
+            index: executor.submit(self._parse_safely, parse_fn, str(file_paths[index]))
+            for index in indices
+        }
+        for index, future in futures.items():
+            results[index] = future.result()
+
+    @staticmethod
+    def _parse_safely(parse_fn, file_path: str | Path) -> ParseResult:
+        """调用解析函数，把异常转换为失败的解析结果"""
+        try:
+            return parse_fn(file_path)
+        except Exception as e:
+            return ParseResult(
+                success=False,
+                error=f"批量解析异常: {str(e)}",
+                file_path=str(file_path),
+            )
+
     def _get_detailed_unsupported_error(self, extension: str) -> str:
         """
         获取不支持文件格式的详细错误信息
@@ -6,9 +6,17 @@
 
 from typing import Dict, Any, Optional, Union
 from pathlib import Path
+import json
 import logging
 import chardet
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from .base_parser import BaseParser, ParsedContent, ParseResult
 
 
@@ -285,9 +293,8 @@ class TextParser(BaseParser):
         """
         metadata = {}
         try:
-            import json
-
-            data = json.loads(text)
+            # orjson 直接解码 str，比标准库快数倍
+            data = orjson.loads(text) if ORJSON_AVAILABLE else json.loads(text)
 
             if isinstance(data, dict):
                 metadata["json_keys"] = list(data.keys())[:10]  # 最多10个键
@@ -296,7 +303,7 @@ class TextParser(BaseParser):
                 metadata["json_length"] = len(data)
                 metadata["json_structure"] = "array"
 
-        except json.JSONDecodeError:
+        except ValueError:  # json.JSONDecodeError 与 orjson.JSONDecodeError
             metadata["json_valid"] = False
 
         return metadata
@@ -1,11 +1,31 @@
+import functools
 import logging
 import re
+import time
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import yaml
 from datetime import datetime
 import os
 
+from ..utils.file_utils import YAML_SAFE_LOADER
+
+# 路径模板中的 {变量} 占位符
+_PLACEHOLDER_RE = re.compile(r"\{([^{}]*)\}")
+
+
+@functools.lru_cache(maxsize=16)
+def _date_variables(epoch_second: int) -> Dict[str, str]:
+    """按秒缓存的日期模板变量，同一秒内规划的文件共用一份"""
+    now = datetime.fromtimestamp(epoch_second)
+    return {
+        "year": str(now.year),
+        "month": f"{now.month:02d}",
+        "day": f"{now.day:02d}",
+        "date": now.strftime("%Y%m%d"),
+        "timestamp": now.strftime("%Y%m%d_%H%M%S"),
+    }
+
 
 class PathPlanner:
     """路径规划器 - 根据分类结果决定文件存储路径"""
@@ -26,6 +46,9 @@ class PathPlanner:
         self.path_template = self.path_config.get(
             "path_template", "{category}/{year}/{month}"
         )
+        # 模板预先拆分为字面量和变量名，每个文件只需一次拼接
+        self._compiled_templates: Dict[str, List[str]] = {}
+        self._compile_path_template(self.path_template)
         self.conflict_resolution = self.path_config.get("conflict_resolution", "suffix")
         self.max_path_length = self.path_config.get(
             "max_path_length", 260
@@ -154,16 +177,7 @@ class PathPlanner:
         self, category: str, metadata: Dict[str, Any]
     ) -> Dict[str, Any]:
         """获取路径模板变量"""
-        now = datetime.now()
-
-        variables = {
-            "category": category,
-            "year": str(now.year),
-            "month": f"{now.month:02d}",
-            "day": f"{now.day:02d}",
-            "date": now.strftime("%Y%m%d"),
-            "timestamp": now.strftime("%Y%m%d_%H%M%S"),
-        }
+        variables = {"category": category, **_date_variables(int(time.time()))}
 
         # 添加元数据中的变量
         if metadata:
@@ -174,17 +188,25 @@ class PathPlanner:
     def _apply_path_template(self, template: str, variables: Dict[str, Any]) -> str:
         """应用路径模板"""
         try:
-            # 简单的模板替换，可以扩展为Jinja2
-            result = template
-            for key, value in variables.items():
-                placeholder = f"{{{key}}}"
-                if placeholder in result:
-                    result = result.replace(placeholder, str(value))
-            return result
+            # 简单的模板替换，可以扩展为Jinja2；未知变量原样保留
+            parts = self._compile_path_template(template)
+            pieces = parts[:]
+            for i in range(1, len(parts), 2):
+                name = parts[i]
+                pieces[i] = str(variables[name]) if name in variables else f"{{{name}}}"
+            return "".join(pieces)
         except Exception as e:
             self.logger.warning(f"模板应用失败: {e}")
             return ""
 
+    def _compile_path_template(self, template: str) -> List[str]:
+        """拆分模板，奇数位置为变量名，偶数位置为字面量"""
+        parts = self._compiled_templates.get(template)
+        if parts is None:
+            parts = _PLACEHOLDER_RE.split(template)
+            self._compiled_templates[template] = parts
+        return parts
+
     def _plan_link_paths(
         self, tags: List[str], primary_category: str, primary_path: str
     ) -> List[Dict[str, Any]]:
@@ -246,23 +268,32 @@ class PathPlanner:
 
         return conflict_info
 
+    @staticmethod
+    def _existing_names(directory: Path) -> set:
+        """一次 scandir 取得目录下已有的文件名，代替逐个候选名 stat"""
+        try:
+            with os.scandir(directory) as entries:
+                return {os.path.normcase(entry.name) for entry in entries}
+        except OSError:
+            return set()
+
     def _resolve_conflict_with_suffix(self, path: str) -> str:
         """通过添加后缀解决冲突"""
         path_obj = Path(path)
-        counter = 1
+        stem = path_obj.stem
+        suffix = path_obj.suffix
+        # 每次调用重新扫描，保证看到其他进程新写入的文件
+        existing = self._existing_names(path_obj.parent)
 
         # 如果原始文件不存在，仍然为其添加后缀以演示冲突解决策略
-        if not path_obj.exists():
-            return str(path_obj.parent / f"{path_obj.stem}_{counter}{path_obj.suffix}")
+        counter = 1
+        if os.path.normcase(path_obj.name) not in existing:
+            return str(path_obj.parent / f"{stem}_{counter}{suffix}")
 
-        while path_obj.exists():
-            stem = path_obj.stem
-            suffix = path_obj.suffix
-            new_name = f"{stem}_{counter}{suffix}"
-            path_obj = path_obj.parent / new_name
+        while os.path.normcase(f"{stem}_{counter}{suffix}") in existing:
             counter += 1
 
-        return str(path_obj)
+        return str(path_obj.parent / f"{stem}_{counter}{suffix}")
 
     def _resolve_conflict_with_timestamp(self, path: str) -> str:
         """通过添加时间戳解决冲突"""
@@ -361,8 +392,9 @@ class PathPlanner:
 
         try:
             if Path(mapping_file).exists():
-                with open(mapping_file, "r", encoding="utf-8") as f:
-                    return yaml.safe_load(f) or {}
+                # 以二进制读取，由 libyaml 直接解码 UTF-8
+                with open(mapping_file, "rb") as f:
+                    return yaml.load(f, Loader=YAML_SAFE_LOADER) or {}
         except Exception as e:
             self.logger.warning(f"加载类别映射失败: {e}")
 
@@ -371,14 +403,18 @@ class PathPlanner:
     def create_directory_structure(self, path_plan: Dict[str, Any]) -> bool:
         """创建目录结构"""
         try:
-            # 创建主路径目录
             primary_path = Path(path_plan["primary_path"])
-            primary_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # 创建链接路径目录
+            # 主路径和链接路径的目录去重，已是其他目录祖先的不必单独创建
+            directories = {primary_path.parent}
             for link_info in path_plan.get("link_paths", []):
-                link_path = Path(link_info["link_path"])
-                link_path.parent.mkdir(parents=True, exist_ok=True)
+                directories.add(Path(link_info["link_path"]).parent)
+            ancestors = {parent for d in directories for parent in d.parents}
+
+            for directory in sorted(
+                directories - ancestors, key=lambda d: (len(d.parts), str(d))
+            ):
+                directory.mkdir(parents=True, exist_ok=True)
 
             self.logger.info(f"目录结构创建成功: {primary_path.parent}")
             return True
@@ -124,7 +124,7 @@ class EnhancedRuleEngine:
             Dict[str, Any]: 处理后的文档数据，包含预分类标签
         """
         try:
-            self.logger.debug(f"应用预分类规则: {document_data.get('file_path', '')}")
+            self.logger.debug("应用预分类规则: %s", document_data.get("file_path", ""))
 
             # 初始化结果
             result = {
@@ -163,9 +163,7 @@ class EnhancedRuleEngine:
                     if rule["action"] == "require_review":
                         result["requires_review"] = True
 
-            self.logger.info(
-                f"预分类规则应用完成: {len(result['applied_rules'])}条规则"
-            )
+            self.logger.info("预分类规则应用完成: %d条规则", len(result["applied_rules"]))
             return result
 
         except Exception as e:
@@ -190,7 +188,7 @@ class EnhancedRuleEngine:
             Dict[str, Any]: 处理后的分类结果
         """
         try:
-            self.logger.debug(f"应用后分类规则: {document_data.get('file_path', '')}")
+            self.logger.debug("应用后分类规则: %s", document_data.get("file_path", ""))
 
             # 合并预分类结果
             result = classification_result.copy()
@@ -221,7 +219,7 @@ class EnhancedRuleEngine:
             # 应用标签规则
             result = self._apply_tag_rules(result)
 
-            self.logger.info(f"后分类规则应用完成: {len(applied_rules)}条规则")
+            self.logger.info("后分类规则应用完成: %d条规则", len(applied_rules))
             return result
 
         except Exception as e:
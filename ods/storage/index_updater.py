@@ -5,19 +5,146 @@
 """
 
 import logging
+import os
+import queue
 import sqlite3
-from typing import Dict, Any, List, Optional, Tuple
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
+from urllib.request import pathname2url
 from datetime import datetime
 import json
 import uuid
 
+import numpy as np
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 import chromadb
 from llama_index.core import Document, VectorStoreIndex
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
+# WAL 让读不阻塞写，synchronous=NORMAL 在 WAL 下只在检查点时 fsync
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# 每写入这么多条审计记录刷新一次审计表的统计信息
+ANALYZE_INTERVAL = 1000
+
+
+def _dumps_json(value: Any) -> str:
+    """序列化标签等 JSON 列，orjson 可用时直接输出 UTF-8，不转义中文
+
+    两条分支都输出紧凑格式（无空格分隔符），列内容不随是否安装 orjson 变化。
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class _ConnectionPool:
+    """SQLite 连接池：一个写连接 + 最多 N 个只读连接
+
+    写连接由 _wlock 串行化；只读连接按需打开、用完放回队列，
+    WAL 模式下读者之间、读者与写者之间互不阻塞。
+    内存数据库（":memory:"）无法被其他连接打开，读写共用写连接。
+    """
+
+    def __init__(self, db_path: str, max_readers: Optional[int] = None):
+        self.db_path = db_path
+        self.in_memory = db_path == ":memory:"
+        self.max_readers = max_readers or min(8, os.cpu_count() or 1)
+
+        self.write_conn = sqlite3.connect(
+            db_path, isolation_level=None, check_same_thread=False
+        )
+        for pragma in SQLITE_PRAGMAS:
+            self.write_conn.execute(pragma)
+        self._wlock = threading.RLock()
+
+        self.read_conns: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self):
+        """在写连接上执行一个写事务"""
+        with self._wlock:
+            self.write_conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.write_conn
+            except Exception:
+                self.write_conn.execute("ROLLBACK")
+                raise
+            self.write_conn.execute("COMMIT")
+
+    @contextmanager
+    def reader(self):
+        """借用一个只读连接"""
+        if self.in_memory:
+            with self._wlock:
+                yield self.write_conn
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self.read_conns.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self.read_conns.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if len(self._readers) < self.max_readers:
+                conn = self._open_reader()
+                self._readers.append(conn)
+                return conn
+
+        return self.read_conns.get()
+
+    def _open_reader(self) -> sqlite3.Connection:
+        uri = "file:" + pathname2url(str(Path(self.db_path).resolve())) + "?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, isolation_level=None, check_same_thread=False
+        )
+        # journal_mode 和 synchronous 是写端设置，只读连接只需缓存相关的 pragma
+        for pragma in SQLITE_PRAGMAS[2:]:
+            conn.execute(pragma)
+        return conn
+
+    def analyze(self, table: str):
+        """刷新表的统计信息，供查询规划器选择索引"""
+        with self._wlock:
+            self.write_conn.execute(f"ANALYZE {table}")
+
+    def close(self):
+        with self._wlock:
+            # 关闭前让 SQLite 按需更新统计信息
+            self.write_conn.execute("PRAGMA optimize")
+            self.write_conn.close()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+
 
 class IndexUpdater:
     """索引更新器 - 更新向量库、知识库、审计日志和状态标记
@@ -39,11 +166,63 @@ class IndexUpdater:
         self.db_path = db_config.get("sqlite_path", "data/audit.db")
         self.audit_table = db_config.get("audit_table", "file_operations")
         self.status_table = db_config.get("status_table", "file_status")
+        self._audit_write_count = 0
+        self._audit_insert_sql = f"""
+            INSERT INTO {self.audit_table} (
+                id, file_path, old_path, new_path, old_filename, new_filename,
+                category, tags, confidence_score, rules_applied, processing_time,
+                operator, status, error_message
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        # 审计查询语句按过滤条件预先生成，(file_path, category) 是否给出 -> SQL；
+        # 语句文本固定，sqlite3 的语句缓存可以复用编译结果
+        audit_select = f"SELECT * FROM {self.audit_table}"
+        audit_order = "ORDER BY created_at DESC LIMIT ?"
+        self._audit_query_sql = {
+            (False, False): f"{audit_select} {audit_order}",
+            (True, False): f"{audit_select} WHERE file_path = ? {audit_order}",
+            (False, True): f"{audit_select} WHERE category = ? {audit_order}",
+            (True, True): (
+                f"{audit_select} WHERE file_path = ? AND category = ? {audit_order}"
+            ),
+        }
+        # 已存在的文件只更新分类字段，保留 created_at
+        self._status_upsert_sql = f"""
+            INSERT INTO {self.status_table} (
+                file_path, file_hash, last_modified, last_classified,
+                category, tags, status, needs_review, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(file_path) DO UPDATE SET
+                file_hash = excluded.file_hash,
+                last_modified = excluded.last_modified,
+                last_classified = excluded.last_classified,
+                category = excluded.category,
+                tags = excluded.tags,
+                status = excluded.status,
+                needs_review = excluded.needs_review,
+                updated_at = excluded.updated_at
+        """
 
         # 向量库配置
         vector_config = config.get("vector_store", {})
         self.chroma_path = vector_config.get("chroma_path", "data/chroma_db")
         self.collection_name = vector_config.get("collection_name", "documents")
+        # ephemeral 时使用不落盘的内存客户端，适合演示和测试
+        self.chroma_ephemeral = vector_config.get("ephemeral", False)
+        # 向量记录攒够 flush_size 条才写入一次，默认 1 即每次立即写入
+        self.flush_size = max(1, vector_config.get("flush_size", 1))
+        # 写入前把向量归一化为单位长度，L2 距离与余弦相似度排序一致
+        self.normalize_embeddings = vector_config.get("normalize_embeddings", True)
+        self._vector_buffer: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        # async_writes 时向量写入交给后台线程，与 SQLite 提交重叠；
+        # 单个工作线程保证写入顺序，也避免并发写同一个 collection
+        self._vector_executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-writer")
+            if vector_config.get("async_writes", False)
+            else None
+        )
+        self._pending_vector_writes: List[Future] = []
 
         # LlamaIndex配置
         llama_config = config.get("llama_index", {})
@@ -66,6 +245,38 @@ class IndexUpdater:
 
         self.logger.info("索引更新器初始化完成")
 
+    def close(self):
+        """写入缓冲的向量记录并关闭数据库连接"""
+        self.flush_vector_buffer()
+        if self._vector_executor is not None:
+            self.wait_vector_writes()
+            self._vector_executor.shutdown()
+            self._vector_executor = None
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def reset(self):
+        """清空审计日志、文件状态和向量库集合，比重新创建实例开销小得多"""
+        with self._buffer_lock:
+            self._vector_buffer = []
+        if self._vector_executor is not None:
+            self.wait_vector_writes()
+
+        with self._pool.transaction() as conn:
+            conn.execute(f"DELETE FROM {self.audit_table}")
+            conn.execute(f"DELETE FROM {self.status_table}")
+
+        chroma_client = getattr(self, "chroma_client", None)
+        if chroma_client is not None:
+            chroma_client.delete_collection(self.collection_name)
+            self.collection = chroma_client.create_collection(
+                name=self.collection_name,
+                metadata={"description": "文档分类向量库"},
+            )
+
+        self.logger.info("索引已清空")
+
     def set_collection(self, collection):
         """设置向量库集合（用于测试）"""
         self.collection = collection
@@ -73,10 +284,14 @@ class IndexUpdater:
     def _init_database(self):
         """初始化SQLite数据库"""
         try:
-            db_dir = Path(self.db_path).parent
-            db_dir.mkdir(parents=True, exist_ok=True)
+            if self.db_path != ":memory:":
+                db_dir = Path(self.db_path).parent
+                db_dir.mkdir(parents=True, exist_ok=True)
 
-            with sqlite3.connect(self.db_path) as conn:
+            # 连接在实例生命周期内保持打开，避免每次操作重新打开数据库文件
+            self._pool = _ConnectionPool(self.db_path)
+
+            with self._pool.transaction() as conn:
                 cursor = conn.cursor()
 
                 # 创建审计日志表
@@ -121,11 +336,15 @@ class IndexUpdater:
                 )
 
                 # 创建索引
+                # 按文件路径/类别过滤并按时间倒序的查询直接走索引，无需排序
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_audit_path_created ON {self.audit_table}(file_path, created_at DESC)"
+                )
                 cursor.execute(
-                    f"CREATE INDEX IF NOT EXISTS idx_audit_file_path ON {self.audit_table}(file_path)"
+                    f"CREATE INDEX IF NOT EXISTS idx_audit_category_created ON {self.audit_table}(category, created_at DESC)"
                 )
                 cursor.execute(
-                    f"CREATE INDEX IF NOT EXISTS idx_audit_category ON {self.audit_table}(category)"
+                    f"CREATE INDEX IF NOT EXISTS idx_audit_created ON {self.audit_table}(created_at DESC)"
                 )
                 cursor.execute(
                     f"CREATE INDEX IF NOT EXISTS idx_audit_status ON {self.audit_table}(status)"
@@ -137,8 +356,6 @@ class IndexUpdater:
                     f"CREATE INDEX IF NOT EXISTS idx_status_needs_review ON {self.status_table}(needs_review)"
                 )
 
-                conn.commit()
-
         except Exception as e:
             self.logger.error(f"数据库初始化失败: {e}")
             raise
@@ -148,10 +365,13 @@ class IndexUpdater:
         try:
             import chromadb
 
-            chroma_dir = Path(self.chroma_path)
-            chroma_dir.mkdir(parents=True, exist_ok=True)
+            if self.chroma_ephemeral:
+                self.chroma_client = chromadb.EphemeralClient()
+            else:
+                chroma_dir = Path(self.chroma_path)
+                chroma_dir.mkdir(parents=True, exist_ok=True)
 
-            self.chroma_client = chromadb.PersistentClient(path=str(chroma_dir))
+                self.chroma_client = chromadb.PersistentClient(path=str(chroma_dir))
 
             # 获取或创建集合
             try:
@@ -232,26 +452,7 @@ class IndexUpdater:
                 'status_update': self._update_file_status(move_result, classification_result)
             }
 
-            # 检查整体结果（忽略禁用的操作）
-            success = all(
-                result.get("success", False) or result.get("reason") == "disabled"
-                for result in results.values()
-                if isinstance(result, dict)
-            )
-
-            update_result = {
-                "operation_id": operation_id,
-                "success": success,
-                "results": results,
-                "timestamp": datetime.now().isoformat(),
-            }
-
-            if success:
-                self.logger.info(f"索引更新成功: {operation_id}")
-            else:
-                self.logger.warning(f"索引更新部分失败: {operation_id}")
-
-            return update_result
+            return self._build_update_result(operation_id, results)
 
         except Exception as e:
             self.logger.error(f"索引更新失败: {e}")
@@ -264,64 +465,294 @@ class IndexUpdater:
                 "timestamp": datetime.now().isoformat(),
             }
 
-    def _update_vector_store(
+    def update_indexes_batch(
+        self, items: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """批量更新索引和日志
+
+        每个元素包含 update_indexes 的参数：move_result、document_data、
+        classification_result 和 processing_time。所有审计记录和文件状态
+        在同一个事务中用 executemany 写入，只提交（fsync）一次；
+        向量库记录合并为一次 collection.add 调用。
+
+        Returns:
+            List[Dict[str, Any]]: 与 items 一一对应的更新结果
+        """
+        if not items:
+            return []
+
+        self.logger.info(f"开始批量更新索引: {len(items)} 个文件")
+        operation_ids = [str(uuid.uuid4()) for _ in items]
+        # 整批共用一个时间戳，避免每行多次 datetime.now()
+        now = datetime.now().isoformat()
+
+        audit_rows = []
+        status_rows = []
+        status_results = []
+        for operation_id, item in zip(operation_ids, items):
+            move_result = item.get("move_result", {})
+            classification_result = item.get("classification_result", {})
+            audit_rows.append(
+                self._audit_row(
+                    operation_id,
+                    move_result,
+                    classification_result,
+                    item.get("processing_time", 0.0),
+                )
+            )
+            status_row = self._status_row(move_result, classification_result, now)
+            if status_row is None:
+                status_results.append({"success": False, "reason": "no_file_path"})
+            else:
+                status_rows.append(status_row)
+                status_results.append(None)  # 事务提交后填入
+
+        try:
+            with self._pool.transaction() as conn:
+                conn.executemany(self._audit_insert_sql, audit_rows)
+                conn.executemany(self._status_upsert_sql, status_rows)
+            db_result = {"success": True}
+            self._count_audit_writes(len(audit_rows))
+        except Exception as e:
+            self.logger.error(f"批量写入审计日志和文件状态失败: {e}")
+            db_result = {"success": False, "error": str(e)}
+
+        vector_results = self._update_vector_store_batch(items, now)
+
+        update_results = []
+        for operation_id, item, status_result, vector_result in zip(
+            operation_ids, items, status_results, vector_results
+        ):
+            move_result = item.get("move_result", {})
+            document_data = item.get("document_data", {})
+            classification_result = item.get("classification_result", {})
+            results = {
+                "operation_id": operation_id,
+                "vector_update": vector_result,
+                "llama_update": (
+                    self._update_llama_index(
+                        move_result, document_data, classification_result
+                    )
+                    if self.enable_llama_index
+                    else {"success": True, "reason": "disabled"}
+                ),
+                "audit_log": (
+                    {**db_result, "operation_id": operation_id}
+                    if db_result["success"]
+                    else db_result
+                ),
+                "status_update": status_result or db_result,
+            }
+            update_results.append(
+                self._build_update_result(operation_id, results, now)
+            )
+
+        return update_results
+
+    def _build_update_result(
+        self,
+        operation_id: str,
+        results: Dict[str, Any],
+        timestamp: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """汇总各项子操作的结果"""
+        # 检查整体结果（忽略禁用的操作）
+        success = all(
+            result.get("success", False) or result.get("reason") == "disabled"
+            for result in results.values()
+            if isinstance(result, dict)
+        )
+
+        if success:
+            self.logger.info(f"索引更新成功: {operation_id}")
+        else:
+            self.logger.warning(f"索引更新部分失败: {operation_id}")
+
+        return {
+            "operation_id": operation_id,
+            "success": success,
+            "results": results,
+            "timestamp": timestamp or datetime.now().isoformat(),
+        }
+
+    def _vector_entry(
         self,
         move_result: Dict[str, Any],
         document_data: Dict[str, Any],
         classification_result: Dict[str, Any],
+        now: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """更新ChromaDB向量库"""
+        """准备一条向量库记录，不满足写入条件时返回带 reason 的失败结果"""
+        if not move_result.get("moved", False):
+            return {"success": False, "reason": "file_not_moved"}
+
+        # 获取文档向量
+        embedding = document_data.get("embedding")
+        # 兼容 NumPy 数组，不能直接用真值判断
+        if embedding is None or len(embedding) == 0:
+            return {"success": False, "reason": "no_embedding"}
+
+        # 检查collection是否可用
+        if not hasattr(self, "collection") or self.collection is None:
+            return {"success": False, "reason": "collection_not_available"}
+
+        # 准备元数据
+        metadata = {
+            "file_path": move_result.get("primary_target_path", ""),
+            "original_path": move_result.get("original_path", ""),
+            "category": classification_result.get("primary_category", ""),
+            "tags": ",".join(classification_result.get("tags", [])),
+            "confidence_score": classification_result.get("confidence_score", 0.0),
+            "file_type": document_data.get("metadata", {}).get("file_type", ""),
+            "file_size": document_data.get("metadata", {}).get("file_size", 0),
+            "processing_time": now or datetime.now().isoformat(),
+        }
+
+        # 准备文档内容
+        text_content = document_data.get("text_content", "")
+        if not text_content:
+            text_content = document_data.get("summary", "")
+
+        return {
+            "success": True,
+            "id": str(uuid.uuid4()),
+            "embedding": embedding,
+            "document": text_content,
+            "metadata": metadata,
+        }
+
+    def _add_vector_entries(self, entries: List[Dict[str, Any]]):
+        """用一次 collection.add 写入多条向量记录"""
+        # 优先复用已初始化的 collection
+        collection = getattr(self, "collection", None)
+        if collection is None:
+            client = chromadb.PersistentClient(path=self.chroma_path)
+            try:
+                collection = client.get_collection(self.collection_name)
+            except Exception:
+                collection = client.create_collection(self.collection_name)
+        embeddings = [entry["embedding"] for entry in entries]
+        if self.normalize_embeddings:
+            embeddings = self._normalize_embeddings(embeddings)
+        collection.add(
+            embeddings=embeddings,
+            documents=[entry["document"] for entry in entries],
+            metadatas=[entry["metadata"] for entry in entries],
+            ids=[entry["id"] for entry in entries],
+        )
+
+    def _buffer_vector_entries(
+        self, entries: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """缓冲向量记录，达到 flush_size 时写入向量库"""
+        with self._buffer_lock:
+            self._vector_buffer.extend(entries)
+            full = len(self._vector_buffer) >= self.flush_size
+
+        if full:
+            return self.flush_vector_buffer()
+        return {"success": True, "buffered": True}
+
+    def flush_vector_buffer(self) -> Dict[str, Any]:
+        """把缓冲的向量记录用一次 collection.add 写入向量库"""
+        with self._buffer_lock:
+            entries, self._vector_buffer = self._vector_buffer, []
+
+        if not entries:
+            return {"success": True, "flushed": 0}
+
+        if self._vector_executor is not None:
+            future = self._vector_executor.submit(self._add_vector_entries, entries)
+            future.add_done_callback(self._log_vector_write_error)
+            with self._buffer_lock:
+                self._pending_vector_writes = [
+                    f for f in self._pending_vector_writes if not f.done()
+                ]
+                self._pending_vector_writes.append(future)
+            return {"success": True, "pending": True, "flushed": len(entries)}
+
         try:
-            if not move_result.get("moved", False):
-                return {"success": False, "reason": "file_not_moved"}
+            self._add_vector_entries(entries)
+            return {"success": True, "flushed": len(entries)}
+        except Exception as e:
+            self.logger.error(f"向量库写入失败: {e}")
+            return {"success": False, "error": str(e)}
 
-            # 获取文档向量
-            embedding = document_data.get("embedding")
-            if not embedding:
-                return {"success": False, "reason": "no_embedding"}
-
-            # 检查collection是否可用
-            if not hasattr(self, "collection") or self.collection is None:
-                return {"success": False, "reason": "collection_not_available"}
-
-            # 准备元数据
-            metadata = {
-                "file_path": move_result.get("primary_target_path", ""),
-                "original_path": move_result.get("original_path", ""),
-                "category": classification_result.get("primary_category", ""),
-                "tags": ",".join(classification_result.get("tags", [])),
-                "confidence_score": classification_result.get("confidence_score", 0.0),
-                "file_type": document_data.get("metadata", {}).get("file_type", ""),
-                "file_size": document_data.get("metadata", {}).get("file_size", 0),
-                "processing_time": datetime.now().isoformat(),
-            }
+    def wait_vector_writes(self) -> Dict[str, Any]:
+        """等待后台的向量写入全部完成"""
+        with self._buffer_lock:
+            pending, self._pending_vector_writes = self._pending_vector_writes, []
 
-            # 准备文档内容
-            text_content = document_data.get("text_content", "")
-            if not text_content:
-                text_content = document_data.get("summary", "")
+        done, _ = wait(pending)
+        failed = sum(1 for future in done if future.exception() is not None)
+        return {"success": failed == 0, "completed": len(done), "failed": failed}
+
+    def _log_vector_write_error(self, future: Future):
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"后台向量库写入失败: {error}")
+
+    @staticmethod
+    def _normalize_embeddings(embeddings: List[List[float]]):
+        """整批向量一次归一化为 float32 单位向量矩阵"""
+        try:
+            matrix = np.array(embeddings, dtype=np.float32)
+        except ValueError:
+            # 维度不一致时原样交给向量库，由它报告错误
+            return embeddings
+        if matrix.ndim != 2:
+            return embeddings
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+        return matrix
 
-            # 添加到向量库（优先复用已初始化的 collection）
-            collection = getattr(self, "collection", None)
-            if collection is None:
-                client = chromadb.PersistentClient(path=self.chroma_path)
-                try:
-                    collection = client.get_collection(self.collection_name)
-                except Exception:
-                    collection = client.create_collection(self.collection_name)
-            collection.add(
-                embeddings=[embedding],
-                documents=[text_content],
-                metadatas=[metadata],
-                ids=[str(uuid.uuid4())],
+    def _update_vector_store(
+        self,
+        move_result: Dict[str, Any],
+        document_data: Dict[str, Any],
+        classification_result: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """更新ChromaDB向量库"""
+        try:
+            entry = self._vector_entry(
+                move_result, document_data, classification_result
             )
+            if not entry["success"]:
+                return entry
 
-            return {'success': True}
+            return self._buffer_vector_entries([entry])
 
         except Exception as e:
             self.logger.error(f"向量库更新失败: {e}")
             return {"success": False, "error": str(e)}
 
+    def _update_vector_store_batch(
+        self, items: List[Dict[str, Any]], now: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """批量更新ChromaDB向量库，所有可写入的记录合并为一次调用"""
+        results = []
+        entries = []
+        for item in items:
+            try:
+                entry = self._vector_entry(
+                    item.get("move_result", {}),
+                    item.get("document_data", {}),
+                    item.get("classification_result", {}),
+                    now,
+                )
+            except Exception as e:
+                entry = {"success": False, "error": str(e)}
+            if entry["success"]:
+                entries.append(entry)
+                results.append(None)  # 写入后填入
+            else:
+                results.append(entry)
+
+        batch_result = self._buffer_vector_entries(entries) if entries else None
+
+        return [result or batch_result for result in results]
+
     def _update_llama_index(
         self,
         move_result: Dict[str, Any],
@@ -369,6 +800,35 @@ class IndexUpdater:
             self.logger.error(f"LlamaIndex更新失败: {e}")
             return {"success": False, "error": str(e)}
 
+    def _audit_row(
+        self,
+        operation_id: str,
+        move_result: Dict[str, Any],
+        classification_result: Dict[str, Any],
+        processing_time: float,
+    ) -> Tuple[Any, ...]:
+        """构建一条审计记录的参数"""
+        return (
+            operation_id,
+            move_result.get("original_path", ""),
+            move_result.get("original_path", ""),
+            move_result.get("primary_target_path", ""),
+            Path(move_result.get("original_path", "")).name,
+            (
+                Path(move_result.get("primary_target_path", "")).name
+                if move_result.get("primary_target_path")
+                else ""
+            ),
+            classification_result.get("primary_category", ""),
+            _dumps_json(classification_result.get("tags", [])),
+            classification_result.get("confidence_score", 0.0),
+            _dumps_json(classification_result.get("rules_applied", [])),
+            processing_time,
+            "auto",
+            "success" if move_result.get("moved", False) else "failed",
+            move_result.get("error_message", ""),
+        )
+
     def _log_audit_record(
         self,
         operation_id: str,
@@ -379,45 +839,17 @@ class IndexUpdater:
     ) -> Dict[str, Any]:
         """记录审计日志"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    f"""
-                    INSERT INTO {self.audit_table} (
-                        id, file_path, old_path, new_path, old_filename, new_filename,
-                        category, tags, confidence_score, rules_applied, processing_time,
-                        operator, status, error_message
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
+            with self._pool.transaction() as conn:
+                conn.execute(
+                    self._audit_insert_sql,
+                    self._audit_row(
                         operation_id,
-                        move_result.get("original_path", ""),
-                        move_result.get("original_path", ""),
-                        move_result.get("primary_target_path", ""),
-                        Path(move_result.get("original_path", "")).name,
-                        (
-                            Path(move_result.get("primary_target_path", "")).name
-                            if move_result.get("primary_target_path")
-                            else ""
-                        ),
-                        classification_result.get("primary_category", ""),
-                        json.dumps(
-                            classification_result.get("tags", []), ensure_ascii=False
-                        ),
-                        classification_result.get("confidence_score", 0.0),
-                        json.dumps(
-                            classification_result.get("rules_applied", []),
-                            ensure_ascii=False,
-                        ),
+                        move_result,
+                        classification_result,
                         processing_time,
-                        "auto",
-                        "success" if move_result.get("moved", False) else "failed",
-                        move_result.get("error_message", ""),
                     ),
                 )
-
-                conn.commit()
+            self._count_audit_writes(1)
 
             return {"success": True, "operation_id": operation_id}
 
@@ -425,46 +857,65 @@ class IndexUpdater:
             self.logger.error(f"审计日志记录失败: {e}")
             return {"success": False, "error": str(e)}
 
+    def _count_audit_writes(self, count: int):
+        """累计审计写入数，每 ANALYZE_INTERVAL 条刷新一次统计信息"""
+        before = self._audit_write_count
+        self._audit_write_count += count
+        if before // ANALYZE_INTERVAL != self._audit_write_count // ANALYZE_INTERVAL:
+            try:
+                self._pool.analyze(self.audit_table)
+            except sqlite3.Error as e:
+                self.logger.warning(f"更新审计表统计信息失败: {e}")
+
+    def _status_row(
+        self,
+        move_result: Dict[str, Any],
+        classification_result: Dict[str, Any],
+        now: Optional[str] = None,
+    ) -> Optional[Tuple[Any, ...]]:
+        """构建一条文件状态的参数，没有文件路径时返回 None"""
+        file_path = move_result.get(
+            "primary_target_path", move_result.get("original_path", "")
+        )
+        if not file_path:
+            return None
+
+        now = now or datetime.now().isoformat()
+        # 一次 stat 同时判断存在并取得修改时间
+        try:
+            mtime = os.stat(file_path).st_mtime
+            file_hash = str(mtime)
+            last_modified = datetime.fromtimestamp(mtime).isoformat()
+        except OSError:
+            file_hash = ""
+            last_modified = now
+
+        review_threshold = self.config.get("classification", {}).get(
+            "review_threshold", 0.6
+        )
+        return (
+            file_path,
+            file_hash,
+            last_modified,
+            now,
+            classification_result.get("primary_category", ""),
+            _dumps_json(classification_result.get("tags", [])),
+            "classified",
+            classification_result.get("confidence_score", 0.0) < review_threshold,
+            now,
+        )
+
     def _update_file_status(
         self, move_result: Dict[str, Any], classification_result: Dict[str, Any]
     ) -> Dict[str, Any]:
         """更新文件状态"""
         try:
-            file_path = move_result.get(
-                "primary_target_path", move_result.get("original_path", "")
-            )
-            if not file_path:
+            status_row = self._status_row(move_result, classification_result)
+            if status_row is None:
                 return {"success": False, "reason": "no_file_path"}
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                file_path_obj = Path(file_path)
-                if file_path_obj.exists():
-                    file_hash = str(file_path_obj.stat().st_mtime)
-                    last_modified = datetime.fromtimestamp(file_path_obj.stat().st_mtime).isoformat()
-                else:
-                    file_hash = ""
-                    last_modified = datetime.now().isoformat()
-
-                cursor.execute(f"""
-                    INSERT OR REPLACE INTO {self.status_table} (
-                        file_path, file_hash, last_modified, last_classified,
-                        category, tags, status, needs_review, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    file_path,
-                    file_hash,
-                    last_modified,
-                    datetime.now().isoformat(),
-                    classification_result.get('primary_category', ''),
-                    json.dumps(classification_result.get('tags', []), ensure_ascii=False),
-                    'classified',
-                    classification_result.get('confidence_score', 0.0) < self.config.get('classification', {}).get('review_threshold', 0.6),
-                    datetime.now().isoformat()
-                ))
-
-                conn.commit()
+            with self._pool.transaction() as conn:
+                conn.execute(self._status_upsert_sql, status_row)
 
             return {"success": True}
 
@@ -480,42 +931,47 @@ class IndexUpdater:
     ) -> List[Dict[str, Any]]:
         """查询审计记录"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                query = f"SELECT * FROM {self.audit_table}"
-                params = []
-
-                conditions = []
-                if file_path:
-                    conditions.append("file_path = ?")
-                    params.append(file_path)
-                if category:
-                    conditions.append("category = ?")
-                    params.append(category)
-
-                if conditions:
-                    query += " WHERE " + " AND ".join(conditions)
-
-                query += " ORDER BY created_at DESC LIMIT ?"
-                params.append(limit)
-
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-
-                return [dict(row) for row in rows]
+            return list(self.iter_audit_records(file_path, category, limit))
 
         except Exception as e:
             self.logger.error(f"查询审计记录失败: {e}")
             return []
 
+    def iter_audit_records(
+        self,
+        file_path: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """按时间倒序逐条返回审计记录，不一次性读入全部结果
+
+        迭代期间占用一个只读连接，迭代结束或生成器关闭时归还。
+        """
+        query = self._audit_query_sql[(bool(file_path), bool(category))]
+        params = [value for value in (file_path, category) if value]
+        # LIMIT -1 表示不限制条数
+        params.append(-1 if limit is None else limit)
+
+        with self._pool.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(query, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(256)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield dict(row)
+            finally:
+                cursor.close()
+
     def get_file_status(self, file_path: str) -> Optional[Dict[str, Any]]:
         """获取文件状态"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._pool.reader() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
 
                 cursor.execute(
                     f"SELECT * FROM {self.status_table} WHERE file_path = ?",
@@ -532,9 +988,9 @@ class IndexUpdater:
     def get_files_needing_review(self) -> List[Dict[str, Any]]:
         """获取需要审核的文件列表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._pool.reader() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
 
                 cursor.execute(
                     f"""
@@ -554,13 +1010,14 @@ class IndexUpdater:
     def rollback_operation(self, operation_id: str) -> Dict[str, Any]:
         """回滚操作"""
         try:
-            # 获取操作记录
-            audit_records = self.get_audit_records()
-            operation_record = None
-            for record in audit_records:
-                if record["id"] == operation_id:
-                    operation_record = record
-                    break
+            # 获取操作记录（回滚后续需要写入，使用写连接）
+            with self._pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                cursor.execute(
+                    f"SELECT * FROM {self.audit_table} WHERE id = ?", (operation_id,)
+                )
+                operation_record = cursor.fetchone()
 
             if not operation_record:
                 return {"success": False, "reason": "operation_not_found"}
@@ -580,8 +1037,11 @@ class IndexUpdater:
 
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
+        if self._vector_executor is not None:
+            self.wait_vector_writes()
+
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._pool.reader() as conn:
                 cursor = conn.cursor()
 
                 # 审计记录统计
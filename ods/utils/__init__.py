@@ -15,6 +15,7 @@ from .file_utils import (
     is_binary_file,
     copy_file_safe,
     move_file_safe,
+    load_yaml_cached,
 )
 
 from .text_utils import (
@@ -29,6 +30,8 @@ from .text_utils import (
     get_text_statistics,
     find_text_patterns,
     replace_text_patterns,
+    scan_json_object,
+    extract_json_object,
 )
 
 __all__ = [
@@ -43,6 +46,7 @@ __all__ = [
     "is_binary_file",
     "copy_file_safe",
     "move_file_safe",
+    "load_yaml_cached",
     # 文本工具
     "clean_text",
     "extract_keywords",
@@ -55,4 +59,6 @@ __all__ = [
     "get_text_statistics",
     "find_text_patterns",
     "replace_text_patterns",
+    "scan_json_object",
+    "extract_json_object",
 ]
@@ -5,9 +5,26 @@
 """
 
 import os
+import copy
+import json
 import hashlib
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+
+import yaml
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# libyaml 的 C 实现比纯 Python 解析器快一个数量级，不可用时退回 SafeLoader
+YAML_SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# 进程内缓存：绝对路径 -> (缓存键, JSON 字节或 None, 解析结果)
+_yaml_memory_cache: Dict[str, Tuple[List[int], Optional[bytes], Any]] = {}
 
 
 def ensure_directory(directory_path: str) -> bool:
@@ -175,3 +192,91 @@ def move_file_safe(source: str, destination: str, overwrite: bool = False) -> bo
         return True
     except Exception:
         return False
+
+
+def yaml_cache_path(yaml_path: str | Path) -> Path:
+    """YAML 文件对应的 JSON 缓存路径，例如 rules.yaml -> rules.yaml.cache.json"""
+    yaml_path = Path(yaml_path)
+    return yaml_path.with_name(yaml_path.name + ".cache.json")
+
+
+def load_yaml_cached(yaml_path: str | Path) -> Any:
+    """读取 YAML 文件，并把解析结果缓存为旁边的 JSON 文件
+
+    缓存以源文件的 mtime 和大小为键，命中时直接用 JSON（优先 orjson）
+    读取，跳过 YAML 解析；未命中时用 libyaml 解析并重写缓存。
+    无法无损转换为 JSON 的内容（如日期、非字符串键）不会被缓存。
+    同一进程内重复读取时只 stat 一次源文件，每次返回新的对象，
+    调用方可以放心修改。
+    """
+    yaml_path = Path(yaml_path)
+    stat = yaml_path.stat()
+    key = [stat.st_mtime_ns, stat.st_size]
+    memory_key = os.path.abspath(yaml_path)
+
+    cached = _yaml_memory_cache.get(memory_key)
+    if cached is not None and cached[0] == key:
+        return _copy_cached(cached[1], cached[2])
+
+    cache_path = yaml_cache_path(yaml_path)
+    try:
+        payload = cache_path.read_bytes()
+        cached = _json_loads(payload)
+        if cached.get("key") == key:
+            _yaml_memory_cache[memory_key] = (key, payload, None)
+            return cached["data"]
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    # 以二进制读取，由 libyaml 直接解码 UTF-8，省去 Python 层的文本解码
+    with open(yaml_path, "rb") as f:
+        data = yaml.load(f, Loader=YAML_SAFE_LOADER)
+
+    payload = None
+    try:
+        encoded = _json_dumps({"key": key, "data": data})
+        # json 会把非字符串键悄悄转成字符串，只缓存能原样读回的数据
+        if _json_loads(encoded)["data"] == data:
+            payload = encoded
+            _write_bytes_atomic(cache_path, payload)
+    except (OSError, TypeError, ValueError):
+        pass
+
+    _yaml_memory_cache[memory_key] = (key, payload, copy.deepcopy(data))
+    return data
+
+
+def _write_bytes_atomic(path: Path, data: bytes) -> None:
+    """先写临时文件再 os.replace，并发读取的进程不会读到写了一半的缓存"""
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_cached(payload: Optional[bytes], data: Any) -> Any:
+    # 解码 JSON 比 deepcopy 快得多，无法用 JSON 表示的数据才 deepcopy
+    if payload is not None:
+        return _json_loads(payload)["data"]
+    return copy.deepcopy(data)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
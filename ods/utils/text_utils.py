@@ -5,7 +5,7 @@
 """
 
 import re
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from collections import Counter
 
 
@@ -280,3 +280,48 @@ def replace_text_patterns(text: str, replacements: Dict[str, str]) -> str:
         result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
 
     return result
+
+
+def scan_json_object(
+    state: Tuple[int, bool, bool], text: str
+) -> Tuple[Tuple[int, bool, bool], int]:
+    """增量扫描文本（可分段传入，如流式输出），找到第一个 JSON 对象闭合的位置
+
+    state 为 (括号深度, 是否在字符串内, 上一个字符是否为转义符)，
+    字符串内的括号不计入深度。返回新的状态和对象闭合处在 text 中的
+    下标，尚未闭合时为 -1。
+    """
+    depth, in_string, escaped = state
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            # 对象外的引号属于说明文字，不进入字符串状态
+            in_string = depth > 0
+        elif ch == "{":
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return (depth, in_string, escaped), i
+    return (depth, in_string, escaped), -1
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """提取文本中第一个括号配平的 JSON 对象，没有时返回 None
+
+    单遍线性扫描，字符串内的括号不影响配平，对象之后的说明文字
+    即使含有括号也不会被截入。
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    _, end = scan_json_object((0, False, False), text)
+    if end < 0:
+        return None
+    return text[start : end + 1]
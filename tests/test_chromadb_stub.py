@@ -0,0 +1,321 @@
+"""
+chromadb 测试桩的向量检索测试
+"""
+
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+import chromadb
+
+
+class TestDummyCollection:
+    """内存向量集合测试"""
+
+    def setup_method(self):
+        """测试前准备"""
+        rng = np.random.default_rng(0)
+        self.embeddings = rng.random((50, 16)).astype(np.float32)
+        self.collection = chromadb.PersistentClient().create_collection("test")
+        self.collection.add(
+            embeddings=self.embeddings.tolist(),
+            metadatas=[{"category": "工作" if i % 2 else "个人"} for i in range(50)],
+            ids=[f"doc{i}" for i in range(50)],
+        )
+
+    def _brute_force(self, query, rows=None):
+        """参考实现：逐行计算余弦相似度"""
+        rows = range(len(self.embeddings)) if rows is None else rows
+        sims = []
+        for i in rows:
+            e = self.embeddings[i]
+            sims.append(float(e @ query / np.linalg.norm(e) / np.linalg.norm(query)))
+        order = sorted(zip(rows, sims), key=lambda x: -x[1])
+        return [f"doc{i}" for i, _ in order]
+
+    def test_query_returns_nearest(self):
+        """测试查询返回最相似的文档"""
+        query = self.embeddings[7]
+        results = self.collection.query(query_embeddings=[query.tolist()], n_results=5)
+
+        assert results["ids"][0] == self._brute_force(query)[:5]
+        assert results["ids"][0][0] == "doc7"
+        assert abs(results["distances"][0][0]) < 1e-5
+        assert results["distances"][0] == sorted(results["distances"][0])
+
+    def test_query_with_filter(self):
+        """测试带元数据过滤的查询"""
+        query = self.embeddings[3]
+        results = self.collection.query(
+            query_embeddings=[query.tolist()], n_results=3, where={"category": "个人"}
+        )
+
+        expected = self._brute_force(query, rows=range(0, 50, 2))[:3]
+        assert results["ids"][0] == expected
+        assert all(m["category"] == "个人" for m in results["metadatas"][0])
+
+    def test_delete_and_count(self):
+        """测试删除文档"""
+        self.collection.delete(ids=["doc7"])
+        results = self.collection.query(
+            query_embeddings=[self.embeddings[7].tolist()], n_results=50
+        )
+
+        assert self.collection.count() == 49
+        assert "doc7" not in results["ids"][0]
+        assert len(results["ids"][0]) == 49
+
+    def test_empty_collection(self):
+        """测试空集合查询"""
+        collection = chromadb.PersistentClient().create_collection("empty")
+        results = collection.query(query_embeddings=[[1.0, 0.0]], n_results=3)
+
+        assert results["ids"] == [[]]
+
+    def test_get_returns_original_embeddings(self):
+        """测试获取文档时返回原始向量"""
+        results = self.collection.get(ids=["doc3"])
+
+        np.testing.assert_allclose(results["embeddings"][0], self.embeddings[3])
+        assert self.collection.embeddings.ctypes.data % 64 == 0
+
+    def test_tiled_scan_matches_brute_force(self):
+        """测试分块扫描（块小于 k 和集合大小）时结果与逐行计算一致"""
+        self.collection.TOPK_BLOCK = 3
+        queries = self.embeddings[[4, 9]] + 0.05
+        results = self.collection.query(query_embeddings=queries, n_results=7)
+        filtered = self.collection.query(
+            query_embeddings=queries, n_results=7, where={"category": "工作"}
+        )
+
+        for col, query in enumerate(queries):
+            assert results["ids"][col] == self._brute_force(query)[:7]
+            assert filtered["ids"][col] == self._brute_force(query, range(1, 50, 2))[:7]
+        assert results["distances"][0] == sorted(results["distances"][0])
+
+    def test_single_query_kernel_matches_tiled_scan(self, monkeypatch):
+        """测试单条查询的融合内核与分块扫描结果一致"""
+        query = [(self.embeddings[12] + 0.2).tolist()]
+        fused = self.collection.query(
+            query_embeddings=query, n_results=6, where={"category": "个人"}
+        )
+        monkeypatch.setattr(chromadb, "NUMBA_AVAILABLE", False)
+        tiled = self.collection.query(
+            query_embeddings=query, n_results=6, where={"category": "个人"}
+        )
+
+        assert fused["ids"] == tiled["ids"]
+        np.testing.assert_allclose(fused["distances"], tiled["distances"], atol=1e-6)
+
+    def test_sq8_query_matches_float32(self):
+        """测试 int8 量化模式与 float32 检索结果一致"""
+        collection = chromadb.PersistentClient().create_collection(
+            "sq8", metadata={"quantization": "sq8"}
+        )
+        collection.add(
+            embeddings=self.embeddings.tolist(),
+            metadatas=[{} for _ in range(50)],
+            ids=[f"doc{i}" for i in range(50)],
+        )
+        query = self.embeddings[11]
+        results = collection.query(query_embeddings=[query.tolist()], n_results=5)
+
+        assert collection.codes.dtype == np.int8
+        assert results["ids"][0] == self._brute_force(query)[:5]
+
+    def test_add_existing_id_overwrites(self):
+        """测试重复添加同一 ID 时覆盖原有记录"""
+        self.collection.add(
+            embeddings=[self.embeddings[0].tolist()],
+            metadatas=[{"category": "财务"}],
+            ids=["doc9"],
+        )
+        results = self.collection.query(
+            query_embeddings=[self.embeddings[0].tolist()], n_results=2
+        )
+
+        assert self.collection.count() == 50
+        assert sorted(results["ids"][0]) == ["doc0", "doc9"]
+        assert self.collection.get(ids=["doc9"])["metadatas"] == [{"category": "财务"}]
+
+    def test_add_metadata_only(self):
+        """测试仅更新元数据的添加"""
+        self.collection.add(metadatas=[{"category": "其他"}], ids=["doc1"])
+        self.collection.add(metadatas=[{"category": "其他"}], ids=["new"])
+
+        assert self.collection.count() == 51
+        assert self.collection.get(ids=["doc1"])["metadatas"] == [{"category": "其他"}]
+        np.testing.assert_allclose(
+            self.collection.get(ids=["doc1"])["embeddings"][0], self.embeddings[1]
+        )
+
+    def test_add_validates_shapes(self):
+        """测试向量数量和维度校验"""
+        with pytest.raises(ValueError, match="one per id"):
+            self.collection.add(embeddings=[[0.0] * 16], ids=["a", "b"])
+        with pytest.raises(ValueError, match="dimension"):
+            self.collection.add(embeddings=[[0.0] * 8], ids=["a"])
+
+        assert self.collection.count() == 50
+
+    def test_single_row_adds_grow_by_doubling(self):
+        """测试逐条添加时缓冲区按倍数扩容"""
+        collection = chromadb.PersistentClient().create_collection("grow")
+        buffers = set()
+        for i in range(1000):
+            collection.add(embeddings=[[float(i), 1.0]], ids=[f"doc{i}"])
+            buffers.add(id(collection._embeddings))
+
+        assert collection.count() == 1000
+        assert len(buffers) <= 8
+        assert collection._embeddings.shape[0] < 2000
+        assert collection._embeddings.ctypes.data % 64 == 0
+        np.testing.assert_allclose(collection.norms[3], np.hypot(3.0, 1.0), rtol=1e-6)
+
+    def test_sq8_recall_on_clustered_data(self):
+        """测试聚类数据上 int8 量化检索的召回率（重排候选数较紧）"""
+        rng = np.random.default_rng(1)
+        centers = rng.standard_normal((20, 256)).astype(np.float32)
+        labels = rng.integers(0, 20, size=5000)
+        data = centers[labels] + 0.3 * rng.standard_normal((5000, 256)).astype(
+            np.float32
+        )
+        collection = chromadb.PersistentClient().create_collection(
+            "sq8_clustered", metadata={"quantization": "sq8"}
+        )
+        collection.add(embeddings=data, ids=[str(i) for i in range(5000)])
+
+        queries = data[:20] + 0.1 * rng.standard_normal((20, 256)).astype(np.float32)
+        results = collection.query(query_embeddings=queries, n_results=10)
+
+        unit = data / np.linalg.norm(data, axis=1, keepdims=True)
+        hits = 0
+        for q, found in zip(queries, results["ids"]):
+            exact = np.argsort(-(unit @ (q / np.linalg.norm(q))))[:10]
+            hits += len({str(i) for i in exact} & set(found))
+        # 40 re-ranked candidates out of 5000 rows per query
+        assert hits / 200 >= 0.95
+
+    def test_panorama_query_matches_exact(self):
+        """测试 Panorama 分层剪枝检索与精确检索结果一致"""
+        collection = chromadb.PersistentClient().create_collection(
+            "panorama", metadata={"scan": "panorama"}
+        )
+        collection.add(
+            embeddings=self.embeddings.tolist(),
+            metadatas=[{"category": "工作" if i % 2 else "个人"} for i in range(50)],
+            ids=[f"doc{i}" for i in range(50)],
+        )
+        query = self.embeddings[5] + 0.1
+        results = collection.query(query_embeddings=[query.tolist()], n_results=5)
+        filtered = collection.query(
+            query_embeddings=[query.tolist()], n_results=3, where={"category": "工作"}
+        )
+
+        assert results["ids"][0] == self._brute_force(query)[:5]
+        assert filtered["ids"][0] == self._brute_force(query, range(1, 50, 2))[:3]
+
+    def test_panorama_prunes_decaying_energy(self):
+        """测试能量衰减的向量逐条添加后 Panorama 确实剪枝且结果精确"""
+        rng = np.random.default_rng(2)
+        dim, n = 128, 600
+        basis, _ = np.linalg.qr(rng.standard_normal((dim, dim)))
+        decay = np.exp(-np.arange(dim) / 8.0)
+        data = ((rng.standard_normal((n, dim)) * decay) @ basis.T).astype(np.float32)
+        collection = chromadb.PersistentClient().create_collection(
+            "panorama_decay", metadata={"scan": "panorama"}
+        )
+        # one vector per call, like RetrievalAgent.add_document
+        for i, row in enumerate(data):
+            collection.add(embeddings=[row.tolist()], ids=[str(i)])
+
+        query = data[42] + 0.05 * rng.standard_normal(dim).astype(np.float32)
+        results = collection.query(query_embeddings=[query], n_results=5)
+
+        unit = data / np.linalg.norm(data, axis=1, keepdims=True)
+        exact = [str(i) for i in np.argsort(-(unit @ query))]
+        assert results["ids"][0] == exact[:5]
+        computed, exhaustive = collection.last_scan
+        assert computed < 0.5 * exhaustive
+
+        collection.delete(ids=["42"])
+        results = collection.query(query_embeddings=[query], n_results=5)
+        assert results["ids"][0] == [i for i in exact if i != "42"][:5]
+
+    def test_hnsw_falls_back_without_usearch(self, monkeypatch):
+        """测试未安装 usearch 时 HNSW 集合退回精确检索"""
+        monkeypatch.setattr(chromadb, "USEARCH_AVAILABLE", False)
+        collection = chromadb.PersistentClient().create_collection(
+            "hnsw_fallback", metadata={"index": "hnsw"}
+        )
+        collection.add(embeddings=self.embeddings, ids=[f"doc{i}" for i in range(50)])
+        query = self.embeddings[8]
+        results = collection.query(query_embeddings=[query], n_results=5)
+
+        assert not collection.hnsw
+        assert results["ids"][0] == self._brute_force(query)[:5]
+
+    def test_hnsw_maps_graph_keys_to_rows(self, monkeypatch):
+        """测试 HNSW 图的键与集合行号之间的映射"""
+
+        class FakeIndex:
+            """以暴力检索模拟 usearch.index.Index 的接口"""
+
+            def __init__(self, ndim, **_):
+                self.keys = np.empty(0, dtype=np.uint64)
+                self.vectors = np.empty((0, ndim), dtype=np.float32)
+
+            def add(self, keys, vectors):
+                self.keys = np.concatenate([self.keys, keys])
+                self.vectors = np.vstack([self.vectors, vectors])
+
+            def search(self, queries, count):
+                unit = self.vectors / np.linalg.norm(self.vectors, axis=1)[:, None]
+                q = queries / np.linalg.norm(queries, axis=1)[:, None]
+                sims = q @ unit.T
+                order = np.argsort(-sims, axis=1)[:, :count]
+                keys = self.keys[order]
+                distances = 1.0 - np.take_along_axis(sims, order, axis=1)
+                if len(queries) == 1:
+                    # 与 usearch 一致：单条查询返回一维的 Matches
+                    return SimpleNamespace(keys=keys[0], distances=distances[0])
+                return SimpleNamespace(
+                    keys=keys,
+                    distances=distances,
+                    counts=np.full(len(queries), order.shape[1]),
+                )
+
+        monkeypatch.setattr(chromadb, "USEARCH_AVAILABLE", True)
+        monkeypatch.setattr(chromadb, "_HNSWIndex", FakeIndex, raising=False)
+        monkeypatch.setattr(chromadb, "_MetricKind", Mock(), raising=False)
+        collection = chromadb.PersistentClient().create_collection(
+            "hnsw", metadata={"index": "hnsw"}
+        )
+        collection.add(embeddings=self.embeddings, ids=[f"doc{i}" for i in range(50)])
+        query = self.embeddings[8]
+
+        first = collection.query(query_embeddings=[query], n_results=5)
+        batch = collection.query(
+            query_embeddings=[query, self.embeddings[3]], n_results=5
+        )
+        collection.delete(ids=["doc8"])
+        second = collection.query(query_embeddings=[query], n_results=5)
+
+        assert first["ids"][0] == self._brute_force(query)[:5]
+        assert second["ids"][0] == self._brute_force(query)[1:6]
+        assert batch["ids"][0] == first["ids"][0]
+        assert batch["ids"][1] == self._brute_force(self.embeddings[3])[:5]
+        assert len(collection._hnsw_index.keys) == 49
+
+    def test_persistent_client_shared_per_path(self, tmp_path):
+        """测试同一路径的客户端共享集合"""
+        first = chromadb.PersistentClient(path=str(tmp_path))
+        second = chromadb.PersistentClient(path=tmp_path / "." / "")
+        first.create_collection("shared").add(embeddings=[[1.0, 0.0]], ids=["a"])
+
+        assert second is first
+        assert second.get_collection("shared").count() == 1
+        assert chromadb.PersistentClient(path=str(tmp_path / "other")) is not first
+        assert chromadb.PersistentClient() is not chromadb.PersistentClient()
@@ -10,8 +10,8 @@ import tempfile
 import shutil
 
 from ods.classifiers.classifier import DocumentClassifier
-from ods.classifiers.retrieval_agent import RetrievalAgent
-from ods.classifiers.llm_classifier import LLMClassifier
+from ods.classifiers.retrieval_agent import FAISS_AVAILABLE, RetrievalAgent
+from ods.classifiers.llm_classifier import HTTPX_AVAILABLE, LLMClassifier
 from ods.classifiers.rule_checker import RuleChecker
 
 
@@ -58,6 +58,22 @@ class TestRetrievalAgent:
         assert result is True
         self.mock_collection.add.assert_called_once()
 
+    def test_add_documents_bulk(self):
+        """测试批量添加文档只调用一次 collection.add，重复 ID 只保留第一条"""
+        documents = [
+            ("doc_1", np.random.rand(8), {"category": "工作"}, "文档1"),
+            ("doc_2", np.random.rand(8), {"category": "个人"}, "文档2"),
+            ("doc_1", np.random.rand(8), {"category": "财务"}, "重复"),
+        ]
+
+        assert self.retrieval_agent.add_documents(documents) is True
+
+        self.mock_collection.add.assert_called_once()
+        kwargs = self.mock_collection.add.call_args.kwargs
+        assert kwargs["ids"] == ["doc_1", "doc_2"]
+        assert len(kwargs["embeddings"]) == 2
+        assert kwargs["metadatas"][0]["category"] == "工作"
+
     def test_search_similar_documents(self):
         """测试搜索相似文档"""
         # 模拟搜索结果
@@ -78,6 +94,24 @@ class TestRetrievalAgent:
         assert results[0]["doc_id"] == "doc1"
         assert results[0]["similarity_score"] == 0.9  # 1 - 0.1
 
+    def test_search_batch(self):
+        """测试批量检索一次查询全部向量，并按查询拆分结果"""
+        self.mock_collection.query.return_value = {
+            "ids": [["doc1", "doc2"], ["doc3"]],
+            "metadatas": [
+                [{"category": "工作"}, {"category": "个人"}],
+                [{"category": "财务"}],
+            ],
+            "distances": [[0.1, 0.5], [0.2]],
+        }
+
+        results = self.retrieval_agent.search_batch(np.random.rand(2, 8), top_k=2)
+
+        self.mock_collection.query.assert_called_once()
+        assert len(self.mock_collection.query.call_args.kwargs["query_embeddings"]) == 2
+        assert [d["doc_id"] for d in results[0]] == ["doc1"]  # 0.5 低于阈值
+        assert [d["doc_id"] for d in results[1]] == ["doc3"]
+
     def test_get_category_examples(self):
         """测试获取类别示例"""
         # 模拟类别示例
@@ -94,6 +128,150 @@ class TestRetrievalAgent:
         assert examples[0]["doc_id"] == "doc1"
         assert examples[0]["metadata"]["category"] == "工作"
 
+    def test_get_category_centroids(self):
+        """测试按类别计算归一化的向量中心"""
+        stored = {"工作": [[2.0, 0.0], [0.0, 2.0]], "个人": []}
+        self.mock_collection.get.side_effect = lambda where, **_: {
+            "embeddings": stored[where["category"]]
+        }
+
+        names, centroids = self.retrieval_agent.get_category_centroids(["工作", "个人"])
+
+        assert names == ["工作"]
+        np.testing.assert_allclose(centroids, [[np.sqrt(0.5), np.sqrt(0.5)]])
+
+    @pytest.mark.skipif(not FAISS_AVAILABLE, reason="需要安装 faiss")
+    def test_faiss_backend_matches_chroma(self, tmp_path):
+        """测试 faiss_flat 后端与 ChromaDB 检索结果一致"""
+        rng = np.random.default_rng(0)
+        embeddings = rng.random((30, 16)).astype(np.float32)
+        agents = {}
+        for backend in ("chroma", "faiss_flat"):
+            config = {
+                "vector_store": {
+                    "chroma_path": str(tmp_path / backend),
+                    "backend": backend,
+                    "similarity_threshold": -1.0,
+                }
+            }
+            agent = RetrievalAgent(config)
+            for i, embedding in enumerate(embeddings):
+                agent.add_document(f"doc{i}", embedding, {"category": "工作"})
+            agents[backend] = agent
+
+        query = embeddings[3] + 0.05
+        expected = agents["chroma"].search_similar_documents(query, top_k=5)
+        found = agents["faiss_flat"].search_similar_documents(query, top_k=5)
+
+        assert [d["doc_id"] for d in found] == [d["doc_id"] for d in expected]
+        assert found[0]["metadata"]["category"] == "工作"
+        assert found[0]["similarity_score"] == pytest.approx(
+            expected[0]["similarity_score"], abs=1e-5
+        )
+
+        # 索引建立后的增删都会反映到检索结果中
+        agents["faiss_flat"].add_document("new", query, {"category": "个人"})
+        assert agents["faiss_flat"].search_similar_documents(query)[0]["doc_id"] == "new"
+        agents["faiss_flat"].delete_document("new")
+        found = agents["faiss_flat"].search_similar_documents(query, top_k=5)
+        assert [d["doc_id"] for d in found] == [d["doc_id"] for d in expected]
+
+    @pytest.mark.skipif(not FAISS_AVAILABLE, reason="需要安装 faiss")
+    def test_faiss_ivfpq_persists_and_reloads(self, tmp_path):
+        """测试量化索引落盘后由新的检索代理直接加载"""
+        rng = np.random.default_rng(0)
+        embeddings = rng.random((300, 16)).astype(np.float32)
+        config = {
+            "vector_store": {
+                "chroma_path": str(tmp_path / "chroma"),
+                "backend": "faiss_ivfpq",
+                "faiss_index_factory": "IVF4,PQ4",
+                "faiss_nprobe": 4,
+                "faiss_index_path": str(tmp_path / "index.faiss"),
+                "similarity_threshold": -1.0,
+            }
+        }
+        agent = RetrievalAgent(config)
+        agent.add_documents(
+            [
+                (f"doc{i}", embedding, {"category": "工作"}, "")
+                for i, embedding in enumerate(embeddings)
+            ]
+        )
+
+        found = agent.search_similar_documents(embeddings[7], top_k=3)
+        assert found[0]["doc_id"] == "doc7"
+        assert (tmp_path / "index.faiss").exists()
+
+        reloaded = RetrievalAgent(config)
+        with patch.object(reloaded, "_train_quantized_index") as mock_train:
+            found = reloaded.search_similar_documents(embeddings[7], top_k=3)
+        mock_train.assert_not_called()
+        assert found[0]["doc_id"] == "doc7"
+
+    def test_faiss_ivfpq_falls_back_to_flat(self, tmp_path):
+        """测试样本不足以训练量化索引时退回精确索引"""
+        config = {
+            "vector_store": {
+                "chroma_path": str(tmp_path / "chroma"),
+                "backend": "faiss_ivfpq",
+            }
+        }
+        agent = RetrievalAgent(config)
+        agent.backend = "faiss_ivfpq"
+        agent.collection = Mock()
+        agent.collection.get.return_value = {
+            "ids": ["a", "b"],
+            "embeddings": [[1.0, 0.0], [0.0, 1.0]],
+        }
+
+        mock_faiss = Mock()
+        mock_faiss.index_factory.return_value.train.side_effect = RuntimeError(
+            "too few points"
+        )
+        with patch("ods.classifiers.retrieval_agent.faiss", mock_faiss, create=True):
+            agent._build_faiss_index()
+
+        mock_faiss.IndexFlatIP.assert_called_once_with(2)
+        assert agent._faiss_index is mock_faiss.IndexFlatIP.return_value
+        assert agent._faiss_ids == ["a", "b"]
+
+    def test_agents_share_collection_lock(self):
+        """测试访问同一集合的检索代理共用一把锁"""
+        from ods.classifiers.retrieval_agent import _collection_lock
+
+        lock = _collection_lock(".ods/test_vector_db", "test_documents")
+        assert self.retrieval_agent._lock is lock
+        assert _collection_lock("./.ods/test_vector_db/", "test_documents") is lock
+        assert _collection_lock(".ods/test_vector_db", "other") is not lock
+
+    def test_faiss_index_rebuilt_after_external_writes(self):
+        """测试集合被其他实例写入后，检索前重建 faiss 索引"""
+        self.retrieval_agent._faiss_index = Mock()
+        self.retrieval_agent._faiss_ids = ["a"]
+        self.mock_collection.count.return_value = 2
+
+        def rebuild():
+            self.retrieval_agent._faiss_index = None
+
+        with patch.object(
+            self.retrieval_agent, "_build_faiss_index", side_effect=rebuild
+        ) as mock_build:
+            self.retrieval_agent._search_faiss(np.ones((1, 4)), top_k=3)
+        mock_build.assert_called_once()
+
+        self.retrieval_agent._faiss_index = Mock()
+        self.retrieval_agent._faiss_index.search.return_value = (
+            np.array([[1.0]]),
+            np.array([[0]]),
+        )
+        self.mock_collection.count.return_value = 1
+        self.mock_collection.get.return_value = {"ids": ["a"], "metadatas": [{}]}
+        with patch.object(self.retrieval_agent, "_build_faiss_index") as mock_build:
+            found = self.retrieval_agent._search_faiss(np.ones((1, 4)), top_k=1)
+        mock_build.assert_not_called()
+        assert found["ids"] == [["a"]]
+
 
 class TestLLMClassifier:
     """LLM分类器测试"""
@@ -135,6 +313,21 @@ class TestLLMClassifier:
             classifier = LLMClassifier(config)
             assert classifier.llm_client is not None
 
+    @pytest.mark.skipif(not HTTPX_AVAILABLE, reason="需要安装 httpx")
+    @patch("ods.classifiers.llm_classifier.OpenAI")
+    def test_shared_http_client(self, mock_openai):
+        """测试多个分类器实例共用同一个 httpx 连接池，可通过配置关闭"""
+        with patch("ods.classifiers.llm_classifier.RetrievalAgent"):
+            LLMClassifier(self.config)
+            LLMClassifier(self.config)
+        first, second = mock_openai.call_args_list
+        assert first.kwargs["http_client"] is second.kwargs["http_client"]
+
+        llm_config = {**self.config["llm"], "shared_http_client": False}
+        with patch("ods.classifiers.llm_classifier.RetrievalAgent"):
+            LLMClassifier({**self.config, "llm": llm_config})
+        assert "http_client" not in mock_openai.call_args.kwargs
+
     def test_parse_llm_response(self):
         """测试LLM响应解析"""
         # 测试JSON响应
@@ -151,6 +344,362 @@ class TestLLMClassifier:
         assert result["primary_category"] == "工作"
         assert result["confidence_score"] == 0.8
 
+    def test_parse_llm_response_ignores_trailing_braces(self):
+        """测试只解析第一个配平的JSON对象，后面带括号的说明文字不影响结果"""
+        response = (
+            '结果如下：{"primary_category": "财务", "confidence_score": 0.9,'
+            ' "reasoning": "含{括号"}\n备注 {非JSON}'
+        )
+        result = self.llm_classifier._parse_llm_response(response)
+
+        assert result["primary_category"] == "财务"
+        assert result["reasoning"] == "含{括号"
+
+    def test_call_llm_dispatch(self):
+        """测试按提供商分派调用：没有 chat.completions 的 Ollama 客户端改用 generate"""
+        client = Mock(spec=["generate"])
+        client.generate.return_value = Mock(response="回复")
+        self.llm_classifier.llm_client = client
+        self.llm_classifier.provider = "ollama"
+
+        assert self.llm_classifier._call_llm("问") == "回复"
+        assert client.generate.call_args.kwargs["prompt"] == "问"
+
+        self.llm_classifier.provider = "unknown"
+        with pytest.raises(ValueError):
+            self.llm_classifier._call_llm("问")
+
+    def test_truncate_example_by_tokens(self):
+        """测试类别示例按 token 数截断，没有编码器时按字符数截断"""
+        encoding = Mock()
+        encoding.encode.side_effect = lambda text: list(text)
+        encoding.decode.side_effect = lambda tokens: "".join(tokens) + "\ufffd"
+        self.llm_classifier._token_encoding = encoding
+        self.llm_classifier.example_max_tokens = 3
+
+        assert self.llm_classifier._truncate_example("季度报告") == "季度报"
+        assert self.llm_classifier._truncate_example("周报") == "周报"
+
+        self.llm_classifier._token_encoding = None
+        assert self.llm_classifier._truncate_example("长" * 300) == "长" * 200
+
+    def test_find_most_similar_category(self):
+        """测试按共同字符找到最相似的预定义类别，完全不相似时取第一个类别"""
+        assert self.llm_classifier._find_most_similar_category("财务报表") == "财务"
+        assert self.llm_classifier._find_most_similar_category("个人生活") == "个人"
+        assert self.llm_classifier._find_most_similar_category("未知") == "工作"
+
+    def test_prompt_static_prefix_cached(self):
+        """测试分类提示以静态前缀开头，文档摘要在末尾，前缀作为缓存前缀传入"""
+        self.llm_classifier.llm_client = Mock()
+        self.llm_classifier.retrieval_agent.get_category_examples.return_value = [
+            {"doc_id": "d1", "text_chunk": "季度报告"}
+        ]
+        calls = []
+
+        def call(prompt, cache_prefix=None):
+            calls.append((prompt, cache_prefix))
+            return '{"primary_category": "工作", "confidence_score": 0.9}'
+
+        with patch.object(self.llm_classifier, "_call_llm", side_effect=call):
+            self.llm_classifier.classify_document({"summary": "第一份"})
+            self.llm_classifier.classify_document({"summary": "第二份"})
+
+        (first, first_prefix), (second, second_prefix) = calls
+        assert first_prefix is second_prefix
+        assert "季度报告" in first_prefix
+        assert first == first_prefix + "新文档摘要: 第一份"
+        assert second == second_prefix + "新文档摘要: 第二份"
+        # 类别示例在缓存期内只查询一次
+        examples = self.llm_classifier.retrieval_agent.get_category_examples
+        assert examples.call_count == len(self.llm_classifier.categories)
+
+        # 示例变化并使缓存失效后生成新的前缀
+        examples.return_value = []
+        self.llm_classifier.invalidate_category_cache()
+        assert "季度报告" not in self.llm_classifier._get_static_prompt()
+
+    def test_call_llm_marks_cache_prefix(self):
+        """测试调用LLM时为提供商标记可缓存的前缀"""
+        client = Mock()
+        client.messages.create.return_value = Mock(content=[Mock(text="回复")])
+        client.chat.completions.create.return_value = Mock(
+            choices=[Mock(message=Mock(content="回复"))]
+        )
+        self.llm_classifier.llm_client = client
+        self.llm_classifier.stream_early_stop = False
+        self.llm_classifier.provider = "anthropic"
+
+        assert self.llm_classifier._call_llm("前缀摘要", cache_prefix="前缀") == "回复"
+        content = client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert content[0] == {
+            "type": "text",
+            "text": "前缀",
+            "cache_control": {"type": "ephemeral"},
+        }
+        assert content[1] == {"type": "text", "text": "摘要"}
+
+        self.llm_classifier.provider = "openai"
+        self.llm_classifier._call_llm("前缀摘要", cache_prefix="前缀")
+        kwargs = client.chat.completions.create.call_args.kwargs
+        assert kwargs["extra_body"]["prompt_cache_key"]
+        assert kwargs["response_format"] == {"type": "json_object"}
+        assert kwargs["messages"][0]["content"] == "前缀摘要"
+
+        # 不带前缀的普通提示（如连接测试）不使用 JSON 输出模式
+        self.llm_classifier._call_llm("请回复")
+        assert "response_format" not in client.chat.completions.create.call_args.kwargs
+
+    def test_classify_documents_packs_summaries(self):
+        """测试批量分类把多份摘要合并为一个请求，响应条数不符时该组逐个分类"""
+        self.llm_classifier.llm_client = Mock()
+        self.llm_classifier.retrieval_agent.get_category_examples.return_value = []
+        prompts = []
+
+        def call(prompt, cache_prefix=None):
+            prompts.append(prompt)
+            if "新文档摘要" in prompt:
+                return '{"primary_category": "个人", "confidence_score": 0.9}'
+            if "[1] 丙" in prompt:
+                return '[{"primary_category": "工作", "confidence_score": 0.9}]'
+            return (
+                '结果: [{"primary_category": "工作", "confidence_score": 0.95},'
+                ' {"primary_category": "财务", "confidence_score": 0.9}]'
+            )
+
+        documents = [
+            {"file_path": "a.txt", "summary": "甲"},
+            {"file_path": "b.txt", "summary": ""},
+            {"file_path": "c.txt", "summary": "乙"},
+            {"file_path": "d.txt", "summary": "丙"},
+            {"file_path": "e.txt", "summary": "丁"},
+        ]
+        with patch.object(self.llm_classifier, "_call_llm", side_effect=call):
+            results = self.llm_classifier.classify_documents(documents, batch_size=2)
+
+        assert [r["primary_category"] for r in results] == [
+            "工作",
+            "Uncategorized",
+            "财务",
+            "个人",
+            "个人",
+        ]
+        assert "[1] 甲\n[2] 乙" in prompts[0]
+        # 第二组返回的数组条数不符，两份文档各自单独分类
+        assert len(prompts) == 4
+
+    def test_semantic_cache(self, tmp_path):
+        """测试近似重复的文档命中语义缓存，不再调用LLM，重启后仍可命中"""
+        llm_config = {
+            **self.config["llm"],
+            "semantic_cache_size": 4,
+            "semantic_cache_path": str(tmp_path / "cache.db"),
+        }
+        config = {**self.config, "llm": llm_config}
+        with patch("ods.classifiers.llm_classifier.RetrievalAgent"):
+            classifier = LLMClassifier(config)
+        classifier.llm_client = Mock()
+        classifier.retrieval_agent.search_similar_documents.return_value = []
+        classifier.retrieval_agent.get_category_examples.return_value = []
+
+        embedding = np.array([1.0, 0.0, 0.0])
+        response = '{"primary_category": "工作", "confidence_score": 0.9}'
+        with patch.object(classifier, "_call_llm", return_value=response) as mock_call:
+            first = classifier.classify_document(
+                {"summary": "周报", "embedding": embedding}
+            )
+            second = classifier.classify_document(
+                {"summary": "周报副本", "embedding": embedding + [0.0, 0.01, 0.0]}
+            )
+            classifier.classify_document(
+                {"summary": "发票", "embedding": np.array([0.0, 1.0, 0.0])}
+            )
+
+        assert mock_call.call_count == 2
+        assert "cache_hit" not in first
+        assert second["cache_hit"] is True
+        assert second["primary_category"] == "工作"
+
+        with patch("ods.classifiers.llm_classifier.RetrievalAgent"):
+            reloaded = LLMClassifier(config)
+        reloaded.llm_client = Mock()
+        with patch.object(reloaded, "_call_llm") as mock_call:
+            result = reloaded.classify_document(
+                {"summary": "周报", "embedding": embedding}
+            )
+        mock_call.assert_not_called()
+        assert result["cache_hit"] is True
+
+    def test_summary_cache(self):
+        """测试摘要相同的文档只调用一次LLM，模型变化或清空缓存后重新调用"""
+        self.llm_classifier.llm_client = Mock()
+        self.llm_classifier.retrieval_agent.get_category_examples.return_value = []
+        response = '{"primary_category": "工作", "confidence_score": 0.9}'
+
+        with patch.object(
+            self.llm_classifier, "_call_llm", return_value=response
+        ) as mock_call:
+            first = self.llm_classifier.classify_document({"summary": "周报"})
+            first["primary_category"] = "已修改"
+            second = self.llm_classifier.classify_document({"summary": "周报"})
+            assert mock_call.call_count == 1
+            assert second["primary_category"] == "工作"
+
+            self.llm_classifier.model = "gpt-4o"
+            self.llm_classifier.classify_document({"summary": "周报"})
+            assert mock_call.call_count == 2
+
+            self.llm_classifier.clear_cache()
+            self.llm_classifier.classify_document({"summary": "周报"})
+            assert mock_call.call_count == 3
+
+    def test_call_llm_stream_stops_when_json_closed(self):
+        """测试同步调用流式接收，JSON对象闭合后停止读取并关闭流"""
+        pieces = ['{"primary_category": "工', '作"}', "\n说明", "多余"]
+        consumed = []
+
+        def chunks():
+            for piece in pieces:
+                consumed.append(piece)
+                yield Mock(choices=[Mock(delta=Mock(content=piece))])
+
+        stream = MagicMock()
+        stream.__iter__.return_value = chunks()
+        client = MagicMock()
+        client.chat.completions.create.return_value = stream
+        self.llm_classifier.llm_client = client
+
+        response = self.llm_classifier._call_llm("问")
+
+        assert response == '{"primary_category": "工作"}'
+        assert consumed == pieces[:2]
+        assert client.chat.completions.create.call_args.kwargs["stream"] is True
+        stream.close.assert_called_once()
+
+        # Anthropic 通过 messages.stream 上下文读取文本流
+        self.llm_classifier.provider = "anthropic"
+        text_stream = iter(['{"a": 1}', " 之后"])
+        client.messages.stream.return_value.__enter__.return_value = Mock(
+            text_stream=text_stream
+        )
+        assert self.llm_classifier._call_llm("问") == '{"a": 1}'
+        assert next(text_stream) == " 之后"
+
+    def test_classify_batch(self):
+        """测试批量调用LLM时保持顺序，单个失败以异常对象返回"""
+        self.llm_classifier.llm_client = Mock()
+        self.llm_classifier.batch_workers = 2
+
+        def call(prompt):
+            if prompt == "坏":
+                raise RuntimeError("请求失败")
+            return f"回复:{prompt}"
+
+        with patch.object(self.llm_classifier, "_call_llm", side_effect=call):
+            responses = self.llm_classifier.classify_batch(["甲", "坏", "乙"])
+
+        assert responses[0] == "回复:甲"
+        assert isinstance(responses[1], RuntimeError)
+        assert responses[2] == "回复:乙"
+
+    def test_response_cache(self):
+        """测试开启响应缓存后相同提示只调用一次LLM，失败不缓存"""
+        llm_config = {**self.config["llm"], "response_cache_size": 8}
+        config = {**self.config, "llm": llm_config}
+        with patch("ods.classifiers.llm_classifier.RetrievalAgent"):
+            classifier = LLMClassifier(config)
+        classifier.llm_client = Mock()
+
+        with patch.object(
+            classifier, "_call_llm", side_effect=[RuntimeError("超时"), "回复"]
+        ) as mock_call:
+            with pytest.raises(RuntimeError):
+                classifier.classify_with_prompt("问")
+            assert classifier.classify_with_prompt("问") == "回复"
+            assert classifier.classify_batch(["问"]) == ["回复"]
+
+        assert mock_call.call_count == 2
+
+    def test_aclassify_with_prompt_without_async_client(self):
+        """测试没有异步客户端时在线程中同步调用LLM"""
+        import asyncio
+
+        self.llm_classifier.llm_client = Mock()
+        with patch("ods.classifiers.llm_classifier.ASYNC_OPENAI_AVAILABLE", False):
+            with patch.object(
+                self.llm_classifier, "_call_llm", return_value="回复"
+            ) as mock_call:
+                response = asyncio.run(self.llm_classifier.aclassify_with_prompt("问"))
+
+        assert response == "回复"
+        mock_call.assert_called_once_with("问")
+
+    def test_aclassify_with_prompt_stops_when_json_closed(self):
+        """测试流式调用在JSON对象闭合后停止读取并关闭流"""
+        import asyncio
+
+        pieces = ['好的：{"tags": ["工', '作"], "reasoning": "含}括号"', "}\n说明", "多余"]
+        consumed = []
+
+        class FakeStream:
+            closed = False
+
+            def __aiter__(self):
+                return self._gen()
+
+            async def _gen(self):
+                for piece in pieces:
+                    consumed.append(piece)
+                    delta = Mock(content=piece)
+                    yield Mock(choices=[Mock(delta=delta)])
+
+            async def close(self):
+                FakeStream.closed = True
+
+        async def create(**kwargs):
+            assert kwargs["stream"] is True
+            return FakeStream()
+
+        client = Mock()
+        client.chat.completions.create = create
+        self.llm_classifier._async_client = client
+
+        response = asyncio.run(self.llm_classifier.aclassify_with_prompt("问"))
+
+        assert response == '好的：{"tags": ["工作"], "reasoning": "含}括号"}'
+        assert consumed == pieces[:3]
+        assert FakeStream.closed
+
+    def test_aclassify_documents_limits_concurrency(self):
+        """测试异步批量分类并发请求，数量不超过上限且结果顺序不变"""
+        import asyncio
+
+        self.llm_classifier.llm_client = Mock()
+        self.llm_classifier.stream_early_stop = False
+        self.llm_classifier.max_concurrent_requests = 2
+        self.llm_classifier.retrieval_agent.get_category_examples.return_value = []
+        running = []
+        peak = []
+
+        async def create(**kwargs):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            category = "财务" if "发票" in kwargs["messages"][0]["content"] else "工作"
+            content = f'{{"primary_category": "{category}", "confidence_score": 0.9}}'
+            return Mock(choices=[Mock(message=Mock(content=content))])
+
+        client = Mock()
+        client.chat.completions.create = create
+        self.llm_classifier._async_client = client
+
+        documents = [{"summary": "发票"}, {"summary": "周报"}] * 3
+        results = asyncio.run(self.llm_classifier.aclassify_documents(documents))
+
+        assert [r["primary_category"] for r in results] == ["财务", "工作"] * 3
+        assert max(peak) == 2
+
     def test_fallback_classification(self):
         """测试备用分类"""
         document_data = {"file_path": "/test/document.pdf", "summary": "测试文档内容"}
@@ -316,6 +865,29 @@ class TestDocumentClassifier:
         assert result["classification_method"] == "llm_with_rules"
         assert "total_processing_time" in result
 
+    def test_add_to_vector_database_file_fields(self):
+        """测试写入向量库时从文件路径得到的类型和 ID"""
+        self.classifier.retrieval_agent.add_document.return_value = True
+        document_data = {
+            "file_path": "/test/Report.Final.PDF",
+            "embedding": np.random.rand(8),
+        }
+
+        assert self.classifier._add_to_vector_database(
+            document_data, {"primary_category": "工作"}
+        )
+
+        kwargs = self.classifier.retrieval_agent.add_document.call_args.kwargs
+        assert kwargs["metadata"]["file_type"] == ".pdf"
+        assert kwargs["metadata"]["file_path"] == "/test/Report.Final.PDF"
+        assert kwargs["doc_id"].endswith("_Report.Final")
+
+        self.classifier._add_to_vector_database(
+            document_data, {"primary_category": "工作"}
+        )
+        second = self.classifier.retrieval_agent.add_document.call_args.kwargs
+        assert second["doc_id"] != kwargs["doc_id"]
+
     def test_batch_classify(self):
         """测试批量分类"""
         documents = [
@@ -336,6 +908,158 @@ class TestDocumentClassifier:
             assert results[0]["batch_index"] == 0
             assert results[1]["batch_index"] == 1
 
+    def test_batch_classify_parallel_keeps_order(self):
+        """测试并发批量分类时结果顺序与输入一致，单个失败不影响其他文档"""
+        import threading
+        import time
+
+        self.classifier.batch_workers = 4
+        documents = [{"file_path": f"/test/doc{i}.pdf"} for i in range(6)]
+        thread_ids = set()
+
+        def classify(doc):
+            thread_ids.add(threading.get_ident())
+            index = int(doc["file_path"][-5])
+            time.sleep(0.01 * (6 - index))
+            if index == 3:
+                raise RuntimeError("LLM 超时")
+            return {"primary_category": f"类别{index}"}
+
+        with patch.object(self.classifier, "classify_document", side_effect=classify):
+            results = self.classifier.batch_classify(documents)
+
+        assert [r["batch_index"] for r in results] == list(range(6))
+        assert all(r["batch_total"] == 6 for r in results)
+        assert results[0]["primary_category"] == "类别0"
+        assert results[5]["primary_category"] == "类别5"
+        assert results[3]["primary_category"] == "Error"
+        assert len(thread_ids) > 1
+
+    def test_batch_classify_buffers_vector_adds(self):
+        """测试批量分类时向量记录在批次结束后一次性写入"""
+        self.classifier.batch_workers = 2
+        self.classifier.llm_classifier.classify_document.side_effect = (
+            lambda doc: {"primary_category": "工作", "confidence_score": 0.9}
+        )
+        self.classifier.rule_checker.apply_rules.side_effect = (
+            lambda result, doc: dict(result)
+        )
+        self.classifier.retrieval_agent.add_documents.return_value = True
+        documents = [
+            {"file_path": f"/test/doc{i}.pdf", "embedding": np.random.rand(8)}
+            for i in range(3)
+        ]
+
+        results = self.classifier.batch_classify(documents)
+
+        assert [r["primary_category"] for r in results] == ["工作"] * 3
+        self.classifier.retrieval_agent.add_document.assert_not_called()
+        self.classifier.retrieval_agent.add_documents.assert_called_once()
+        (pending,) = self.classifier.retrieval_agent.add_documents.call_args.args
+        assert sorted(entry[0].rsplit("_", 1)[1] for entry in pending) == [
+            "doc0",
+            "doc1",
+            "doc2",
+        ]
+        assert self.classifier._pending_vector_adds == []
+        timestamps = {entry[2]["classification_timestamp"] for entry in pending}
+        assert len(timestamps) == 1
+        assert self.classifier._batch_timestamp is None
+
+    def test_batch_classify_async(self):
+        """测试异步批量分类限制并发数并保持结果顺序"""
+        import asyncio
+        import threading
+        import time
+
+        lock = threading.Lock()
+        running = [0, 0]  # 当前并发数, 最大并发数
+
+        def classify(doc):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return {"primary_category": doc["file_path"]}
+
+        documents = [{"file_path": f"/test/doc{i}.pdf"} for i in range(6)]
+        with patch.object(self.classifier, "classify_document", side_effect=classify):
+            results = asyncio.run(
+                self.classifier.batch_classify_async(documents, concurrency=2)
+            )
+
+        assert [r["primary_category"] for r in results] == [
+            d["file_path"] for d in documents
+        ]
+        assert [r["batch_index"] for r in results] == list(range(6))
+        assert running[1] == 2
+        assert self.classifier._active_batches == 0
+
+    def test_batch_classify_centroid_hints(self):
+        """测试开启 centroid_hints 后批量分类按类别中心给出参考类别"""
+        centroids = np.eye(4, dtype=np.float32)[:2]
+        self.classifier.retrieval_agent.get_category_centroids.return_value = (
+            ["工作", "个人"],
+            centroids,
+        )
+        documents = [
+            {"file_path": "/test/doc1.pdf", "embedding": [0.1, 2.0, 0.0, 0.0]},
+            {"file_path": "/test/doc2.pdf"},
+            {"file_path": "/test/doc3.pdf", "embedding": [3.0, 1.0, 0.0, 0.0]},
+        ]
+
+        with patch.object(self.classifier, "classify_document") as mock_classify:
+            mock_classify.side_effect = lambda doc: {"primary_category": "其他"}
+            results = self.classifier.batch_classify(documents)
+            # 默认关闭，不查询向量库
+            self.classifier.retrieval_agent.get_category_centroids.assert_not_called()
+            assert "centroid_category" not in results[0]
+
+            self.classifier.centroid_hints = True
+            results = self.classifier.batch_classify(documents)
+
+        assert results[0]["centroid_category"] == "个人"
+        assert "centroid_category" not in results[1]
+        assert results[2]["centroid_category"] == "工作"
+        assert results[2]["centroid_similarity"] == pytest.approx(3 / np.sqrt(10))
+
+    def test_all_components_timeout(self):
+        """测试组件探测并发执行，超时的组件不阻塞其他结果"""
+        import threading
+
+        release = threading.Event()
+        self.classifier.retrieval_agent.get_collection_stats.return_value = {"n": 1}
+        self.classifier.llm_classifier.test_connection.side_effect = (
+            lambda: release.wait(5)
+        )
+        self.classifier.rule_checker.get_rules_summary.side_effect = RuntimeError(
+            "规则文件损坏"
+        )
+
+        try:
+            results = self.classifier.test_all_components(timeout=0.1)
+        finally:
+            release.set()
+
+        assert results["vector_database"] is True
+        assert results["llm_classifier"] is False
+        assert results["rule_checker"] is False
+        assert results["error"] == "规则文件损坏"
+
+    def test_create_error_result_not_shared(self):
+        """测试错误结果各自独立，修改一个不影响下一个"""
+        first = self.classifier._create_error_result("超时", {"file_path": "/a.pdf"})
+        first["suggested_tags"].append("重试")
+        second = self.classifier._create_error_result("超时", {})
+
+        assert second["suggested_tags"] == ["ERROR"]
+        assert second["secondary_categories"] == []
+        assert second["file_path"] == ""
+        assert first["reasoning"] == "分类过程中出现错误: 超时"
+        assert list(first) == list(self.classifier._ERROR_TEMPLATE)
+
     def test_get_classification_statistics(self):
         """测试获取分类统计"""
         # 模拟统计结果
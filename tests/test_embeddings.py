@@ -40,6 +40,13 @@ class TestTextProcessor:
         assert len(chunks) > 1
         assert all(len(chunk) <= 20 for chunk in chunks)
 
+    def test_split_into_chunks_groups_sentences(self):
+        """测试分块按句子聚合且保留无标点的结尾"""
+        text = "第一句。第二句！第三句？没有标点的结尾"
+        chunks = self.processor.split_into_chunks(text, chunk_size=9)
+        assert chunks == ["第一句。第二句！", "第三句？", "没有标点的结尾"]
+        assert self.processor.split_into_chunks("") == []
+
     def test_generate_summary(self):
         """测试摘要生成"""
         text = "第一句。第二句。第三句。第四句。第五句。"
@@ -113,6 +113,72 @@ class TestEnhancedClassifier:
         assert status["needs_review"]
         assert "包含敏感标签" in status["review_reason"]
 
+    def test_sensitive_tags_configurable(self, sample_config):
+        """测试敏感标签可通过配置覆盖"""
+        sample_config["classification"]["sensitive_tags"] = ["财务"]
+        with patch("ods.classifiers.enhanced_classifier.DocumentClassifier"), patch(
+            "ods.classifiers.enhanced_classifier.LLMClassifier"
+        ), patch("ods.classifiers.enhanced_classifier.RetrievalAgent"), patch(
+            "ods.classifiers.enhanced_classifier.EnhancedRuleEngine"
+        ):
+            classifier = EnhancedClassifier(sample_config)
+
+        status = classifier._determine_classification_status(
+            {"confidence_score": 0.9, "tags": ["财务"]}
+        )
+        assert status["needs_review"]
+
+        status = classifier._determine_classification_status(
+            {"confidence_score": 0.9, "tags": ["工作", "机密"]}
+        )
+        assert status["status"] == "auto_classified"
+
+    def test_components_created_lazily(self, sample_config):
+        """测试被预规则排除的文档不会创建LLM和检索组件"""
+        with patch(
+            "ods.classifiers.enhanced_classifier.DocumentClassifier"
+        ) as base_cls, patch(
+            "ods.classifiers.enhanced_classifier.LLMClassifier"
+        ) as llm_cls, patch(
+            "ods.classifiers.enhanced_classifier.RetrievalAgent"
+        ) as retrieval_cls, patch(
+            "ods.classifiers.enhanced_classifier.EnhancedRuleEngine"
+        ):
+            classifier = EnhancedClassifier(sample_config)
+            classifier.rule_engine.apply_pre_classification_rules.return_value = {
+                "pre_tags": [],
+                "excluded": True,
+                "exclusion_reason": "临时文件",
+            }
+            result = classifier.classify_document({"file_path": "a.tmp"})
+
+            assert result["status"] == "excluded"
+            base_cls.assert_not_called()
+            llm_cls.assert_not_called()
+            retrieval_cls.assert_not_called()
+
+            assert classifier.llm_classifier is classifier.llm_classifier
+            llm_cls.assert_called_once_with(sample_config)
+
+    def test_statuses_batch_matches_single(self, enhanced_classifier):
+        """测试批量确定状态与逐个确定的结果一致"""
+        results = [
+            {"confidence_score": 0.9, "tags": ["工作"]},
+            {"confidence_score": 0.85, "tags": []},
+            {"confidence_score": 0.7, "tags": ["报告"]},
+            {"confidence_score": 0.6, "tags": []},
+            {"confidence_score": 0.2, "tags": []},
+            {"confidence_score": 0.95, "tags": ["财务", "机密"]},
+        ]
+
+        batch = enhanced_classifier._determine_statuses_batch(
+            [r["confidence_score"] for r in results], [r["tags"] for r in results]
+        )
+
+        assert batch == [
+            enhanced_classifier._determine_classification_status(r) for r in results
+        ]
+
     def test_confidence_level_calculation(self, enhanced_classifier):
         """测试置信度等级计算"""
         assert enhanced_classifier._get_confidence_level(0.95) == "very_high"
@@ -121,6 +187,15 @@ class TestEnhancedClassifier:
         assert enhanced_classifier._get_confidence_level(0.65) == "low"
         assert enhanced_classifier._get_confidence_level(0.45) == "very_low"
 
+    def test_confidence_level_boundaries(self, enhanced_classifier):
+        """测试分界点归入较高等级"""
+        assert enhanced_classifier._get_confidence_level(0.9) == "very_high"
+        assert enhanced_classifier._get_confidence_level(0.8) == "high"
+        assert enhanced_classifier._get_confidence_level(0.7) == "medium"
+        assert enhanced_classifier._get_confidence_level(0.6) == "low"
+        assert enhanced_classifier._get_confidence_level(0.0) == "very_low"
+        assert enhanced_classifier._get_confidence_level(1.0) == "very_high"
+
     def test_prompt_building(self, enhanced_classifier):
         """测试提示词构建"""
         doc_data = {
@@ -146,6 +221,44 @@ class TestEnhancedClassifier:
         assert "test.pdf" in prompt
         assert "相似文档示例" in prompt
 
+    def test_prompt_shares_static_prefix(self, enhanced_classifier):
+        """测试不同文档的提示词以相同的标签体系前缀开头"""
+        prefix = enhanced_classifier._prompt_prefix
+        prompt_a = enhanced_classifier._build_classification_prompt(
+            {"file_path": "/a/合同.pdf", "text_content": "甲方乙方"}, []
+        )
+        prompt_b = enhanced_classifier._build_classification_prompt(
+            {"file_path": "/b/发票.pdf", "text_content": "金额"},
+            [{"filename": "doc1.pdf", "tags": ["财务"]}],
+        )
+
+        assert prompt_a.startswith(prefix)
+        assert prompt_b.startswith(prefix)
+        assert prefix.endswith("文档信息:\n")
+        assert "合同.pdf" not in prefix
+
+    def test_prompt_uses_text_snippet(self, enhanced_classifier):
+        """测试提示词优先使用预先截断的 text_snippet，且不超过摘要长度"""
+        prompt = enhanced_classifier._build_classification_prompt(
+            {"file_path": "/a/b.txt", "text_snippet": "片段" * 400}, []
+        )
+        assert "片段" * 250 + "..." in prompt
+        assert "片段" * 251 not in prompt
+
+        prompt = enhanced_classifier._build_classification_prompt(
+            {"file_path": "/a/b.txt", "text_content": "全文内容"}, []
+        )
+        assert "- 内容摘要: 全文内容..." in prompt
+
+    def test_prompt_keeps_braces_in_content(self, enhanced_classifier):
+        """测试文档内容中的花括号原样进入提示词"""
+        prompt = enhanced_classifier._build_classification_prompt(
+            {"file_path": "/a/{x}.txt", "text_content": '{"k": "{v}"}'}, []
+        )
+        assert "- 文件名: {x}.txt" in prompt
+        assert '- 内容摘要: {"k": "{v}"}...' in prompt
+        assert prompt.endswith("只返回JSON，不要其他内容。")
+
     def test_llm_response_parsing(self, enhanced_classifier):
         """测试LLM响应解析"""
         # 有效的JSON响应
@@ -172,6 +285,22 @@ class TestEnhancedClassifier:
         assert result["confidence_score"] == 0.0
         assert "响应解析失败" in result["reasoning"]
 
+    def test_llm_response_parsing_surrounding_text(self, enhanced_classifier):
+        """测试从带前后说明文字的响应中提取JSON"""
+        response = '分类如下：\n{"tags": ["财务"], "confidence_scores": [0.8]}\n完毕'
+        result = enhanced_classifier._parse_llm_response(response)
+        assert result["tags"] == ["财务"]
+        assert result["confidence_score"] == 0.8
+
+        # JSON之后的说明文字含有括号时不影响提取
+        response = '{"tags": ["工作"], "confidence_scores": [0.9]} 注：{无} }'
+        result = enhanced_classifier._parse_llm_response(response)
+        assert result["tags"] == ["工作"]
+
+        # 右括号出现在左括号之前时视为无JSON
+        result = enhanced_classifier._parse_llm_response("} 没有 {")
+        assert result["reasoning"] == "响应解析失败"
+
     def test_result_validation(self, enhanced_classifier):
         """测试结果验证"""
         # 有效结果
@@ -203,6 +332,19 @@ class TestEnhancedClassifier:
         assert validation["is_valid"]  # 标签无效只是警告，不是错误
         assert len(validation["warnings"]) > 0
 
+    def test_result_validation_unhashable_tag(self, enhanced_classifier):
+        """测试LLM返回嵌套列表等不可哈希标签时只给出警告"""
+        result = {
+            "tags": ["工作", ["报告"]],
+            "primary_tag": "工作",
+            "confidence_score": 0.9,
+        }
+
+        validation = enhanced_classifier.validate_classification_result(result)
+        assert validation["is_valid"]
+        assert "['报告']" in validation["warnings"][0]
+        assert "工作" in enhanced_classifier._valid_tags
+
     def test_classification_summary(self, enhanced_classifier):
         """测试分类摘要"""
         summary = enhanced_classifier.get_classification_summary()
@@ -267,6 +409,209 @@ class TestEnhancedClassifier:
         enhanced_classifier.rule_engine.apply_pre_classification_rules.assert_called_once()
         enhanced_classifier.rule_engine.apply_post_classification_rules.assert_called_once()
 
+    def test_classify_documents_batch(self, enhanced_classifier):
+        """测试批量分类只调用一次LLM，排除和失败的文档各自处理"""
+        rule_engine = enhanced_classifier.rule_engine
+        rule_engine.apply_pre_classification_rules.side_effect = lambda doc: {
+            "excluded": doc["file_path"].endswith(".tmp")
+        }
+        rule_engine.apply_post_classification_rules.side_effect = (
+            lambda base, doc, pre: dict(base)
+        )
+        enhanced_classifier.retrieval_agent.search_batch.side_effect = (
+            lambda queries, top_k: [[] for _ in queries]
+        )
+        enhanced_classifier.llm_classifier.classify_batch.return_value = [
+            '{"tags": ["工作"], "confidence_scores": [0.9], "primary_tag": "工作"}',
+            RuntimeError("请求超时"),
+        ]
+
+        documents = [
+            {"file_path": "/a/报告.pdf", "embedding": [0.1, 0.2]},
+            {"file_path": "/a/cache.tmp", "embedding": [0.1, 0.2]},
+            {"file_path": "/a/合同.pdf", "embedding": [0.3, 0.4]},
+        ]
+
+        results = enhanced_classifier.classify_documents(documents)
+
+        enhanced_classifier.retrieval_agent.search_batch.assert_called_once()
+        enhanced_classifier.llm_classifier.classify_batch.assert_called_once()
+        (prompts,) = enhanced_classifier.llm_classifier.classify_batch.call_args.args
+        assert len(prompts) == 2
+        assert results[0]["tags"] == ["工作"]
+        assert results[0]["status"] == "auto_classified"
+        assert results[1]["status"] == "excluded"
+        assert results[2]["tags"] == []
+        assert "请求超时" in results[2]["reasoning"]
+        assert results[2]["needs_review"] is True
+
+    def test_similar_documents_summarized(self, enhanced_classifier):
+        """测试结果中的相似文档默认只保留精简字段"""
+        similar_docs = [
+            {
+                "doc_id": "d1",
+                "metadata": {"file_path": "/a/x.pdf", "category": "工作"},
+                "distance": 0.1,
+                "similarity_score": 0.9,
+                "text_chunk": "很长的文本" * 100,
+            }
+        ]
+        llm_result = {"tags": ["工作"], "confidence_score": 0.9}
+
+        merged = enhanced_classifier._merge_base_result(llm_result, similar_docs)
+        assert merged["similar_documents"] == [
+            {
+                "doc_id": "d1",
+                "file_path": "/a/x.pdf",
+                "category": "工作",
+                "similarity_score": 0.9,
+            }
+        ]
+
+        enhanced_classifier.keep_full_similar_docs = True
+        merged = enhanced_classifier._merge_base_result(llm_result, similar_docs)
+        assert merged["similar_documents"] is similar_docs
+
+    def test_post_rules_failure_result_serializable(self, enhanced_classifier):
+        """测试后分类规则返回非字典时，结果不会引用自身"""
+        import json
+
+        enhanced_classifier.rule_engine.apply_post_classification_rules.return_value = (
+            None
+        )
+        base = {"tags": ["工作"], "confidence_score": 0.9}
+
+        result = enhanced_classifier._finalize_classification(
+            {"file_path": "/a/b.pdf"}, {"pre_tags": []}, base
+        )
+
+        assert result["status"] == "auto_classified"
+        assert result["classification_process"]["base_classification"] is base
+        assert "status" not in base
+        json.dumps(result, ensure_ascii=False)
+
+    def test_classify_document_guards(self, enhanced_classifier):
+        """测试非字典输入、规则引擎异常和后续组件异常的处理"""
+        result = enhanced_classifier.classify_document(None)
+        assert result["status"] == "error"
+
+        rule_engine = enhanced_classifier.rule_engine
+        rule_engine.apply_pre_classification_rules.side_effect = RuntimeError("规则错误")
+        rule_engine.apply_post_classification_rules.side_effect = (
+            lambda base, doc, pre: dict(base)
+        )
+        enhanced_classifier.base_classifier.classify_document.return_value = {
+            "tags": ["工作"],
+            "confidence_score": 0.9,
+        }
+        result = enhanced_classifier.classify_document({"file_path": "/a/b.pdf"})
+        assert result["tags"] == ["工作"]
+        assert "规则错误" in result["classification_process"]["pre_classification"][
+            "error"
+        ]
+
+        enhanced_classifier.base_classifier.classify_document.side_effect = OSError(
+            "磁盘错误"
+        )
+        result = enhanced_classifier.classify_document({"file_path": "/a/b.pdf"})
+        assert result["status"] == "error"
+        assert "磁盘错误" in result["error"]
+
+    def test_classify_documents_pipelined_segments(self, enhanced_classifier):
+        """测试按段流水线分类时每段调用一次LLM，结果保持输入顺序"""
+        enhanced_classifier.pipeline_batch_size = 2
+        rule_engine = enhanced_classifier.rule_engine
+        rule_engine.apply_pre_classification_rules.return_value = {"excluded": False}
+        rule_engine.apply_post_classification_rules.side_effect = (
+            lambda base, doc, pre: dict(base)
+        )
+        enhanced_classifier.retrieval_agent.search_batch.side_effect = (
+            lambda queries, top_k: [[] for _ in queries]
+        )
+
+        def classify_batch(prompts):
+            tags = [prompt.split("- 文件名: ")[1].split(".")[0] for prompt in prompts]
+            return [
+                f'{{"tags": ["{tag}"], "confidence_scores": [0.9]}}' for tag in tags
+            ]
+
+        enhanced_classifier.llm_classifier.classify_batch.side_effect = classify_batch
+
+        documents = [
+            {"file_path": f"/a/文档{i}.pdf", "embedding": [0.1, i]} for i in range(5)
+        ]
+        results = enhanced_classifier.classify_documents(documents)
+
+        assert enhanced_classifier.llm_classifier.classify_batch.call_count == 3
+        assert enhanced_classifier.retrieval_agent.search_batch.call_count == 3
+        assert [r["tags"] for r in results] == [[f"文档{i}"] for i in range(5)]
+
+    def test_classify_documents_dedupes_prompts(self, enhanced_classifier):
+        """测试批量中完全相同的提示只提交一次，结果分发给每个文档"""
+        rule_engine = enhanced_classifier.rule_engine
+        rule_engine.apply_pre_classification_rules.return_value = {"excluded": False}
+        rule_engine.apply_post_classification_rules.side_effect = (
+            lambda base, doc, pre: dict(base)
+        )
+        enhanced_classifier.retrieval_agent.search_batch.side_effect = (
+            lambda queries, top_k: [[] for _ in queries]
+        )
+        enhanced_classifier.llm_classifier.classify_batch.side_effect = (
+            lambda prompts: [
+                f'{{"tags": ["{"合同" if "文件名: 合同" in p else "报告"}"], '
+                '"confidence_scores": [0.9]}'
+                for p in prompts
+            ]
+        )
+
+        template = {"text_content": "同一模板", "embedding": [0.1]}
+        documents = [
+            {**template, "file_path": "/a/报告.pdf"},
+            {**template, "file_path": "/b/合同.pdf"},
+            {**template, "file_path": "/c/报告.pdf"},
+        ]
+        results = enhanced_classifier.classify_documents(documents)
+
+        (prompts,) = enhanced_classifier.llm_classifier.classify_batch.call_args.args
+        assert len(prompts) == 2
+        assert [r["tags"] for r in results] == [["报告"], ["合同"], ["报告"]]
+
+    def test_aclassify_many(self, enhanced_classifier):
+        """测试异步批量分类限制并发并保持顺序"""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        rule_engine = enhanced_classifier.rule_engine
+        rule_engine.apply_pre_classification_rules.return_value = {"excluded": False}
+        rule_engine.apply_post_classification_rules.side_effect = (
+            lambda base, doc, pre: dict(base)
+        )
+        enhanced_classifier.retrieval_agent.search_similar_documents.return_value = []
+
+        running = [0, 0]  # 当前并发数, 最大并发数
+
+        async def respond(prompt):
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            tag = "财务" if "文件名: 发票" in prompt else "工作"
+            return f'{{"tags": ["{tag}"], "confidence_scores": [0.9]}}'
+
+        enhanced_classifier.llm_classifier.aclassify_with_prompt = AsyncMock(
+            side_effect=respond
+        )
+        documents = [
+            {"file_path": f"/a/{name}.pdf", "embedding": [0.1]}
+            for name in ("发票", "报告", "发票2", "计划")
+        ]
+
+        results = asyncio.run(
+            enhanced_classifier.aclassify_many(documents, concurrency=2)
+        )
+
+        assert [r["tags"] for r in results] == [["财务"], ["工作"], ["财务"], ["工作"]]
+        assert running[1] == 2
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -37,6 +37,7 @@ class TestIndexUpdater:
 
     def teardown_method(self):
         """测试后清理"""
+        self.index_updater.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_init_database(self):
@@ -148,6 +149,90 @@ class TestIndexUpdater:
         assert results["vector_update"]["success"] is False
         assert results["vector_update"]["reason"] == "file_not_moved"
 
+    def test_update_indexes_batch(self):
+        """测试批量更新在一个事务中写入审计日志和文件状态"""
+        items = [
+            {
+                "move_result": {
+                    "moved": True,
+                    "original_path": f"/test/file{i}.pdf",
+                    "primary_target_path": f"/test/dst/file{i}.pdf",
+                },
+                "document_data": {"text_content": f"文档{i}"},
+                "classification_result": {
+                    "primary_category": "工作",
+                    "confidence_score": 0.5 + i * 0.1,
+                    "tags": ["工作"],
+                },
+                "processing_time": 1.0,
+            }
+            for i in range(3)
+        ]
+
+        results = self.index_updater.update_indexes_batch(items)
+
+        assert len(results) == 3
+        assert len({r["operation_id"] for r in results}) == 3
+        for result in results:
+            assert result["results"]["audit_log"]["success"] is True
+            assert result["results"]["status_update"]["success"] is True
+
+        records = self.index_updater.get_audit_records()
+        assert {r["id"] for r in records} == {r["operation_id"] for r in results}
+
+        # 再次写入同一文件时更新状态而不是新增
+        self.index_updater.update_indexes_batch(items[:1])
+        with sqlite3.connect(self.config["database"]["sqlite_path"]) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM file_status").fetchone()[0]
+        assert count == 3
+        assert len(self.index_updater.get_files_needing_review()) == 1
+
+        assert self.index_updater.update_indexes_batch([]) == []
+
+    def test_update_indexes_batch_shares_timestamp(self):
+        """测试同一批次的记录使用同一个时间戳"""
+        items = [
+            {
+                "move_result": {
+                    "moved": True,
+                    "primary_target_path": f"/test/dst/file{i}.pdf",
+                },
+                "classification_result": {"primary_category": "工作"},
+            }
+            for i in range(3)
+        ]
+
+        results = self.index_updater.update_indexes_batch(items)
+
+        assert len({r["timestamp"] for r in results}) == 1
+        statuses = [
+            self.index_updater.get_file_status(f"/test/dst/file{i}.pdf")
+            for i in range(3)
+        ]
+        assert {s["last_classified"] for s in statuses} == {results[0]["timestamp"]}
+
+    def test_database_pragmas(self):
+        """测试连接启用 WAL 并在 close 后释放"""
+        conn = self.index_updater._pool.write_conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # NORMAL = 1
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+        self.index_updater.close()
+        assert self.index_updater._pool is None
+        # 重复关闭不报错
+        self.index_updater.close()
+
+    def test_reader_connections_are_read_only(self):
+        """测试只读连接被复用且不能写入"""
+        pool = self.index_updater._pool
+        with pool.reader() as first:
+            with pytest.raises(sqlite3.OperationalError):
+                first.execute("DELETE FROM file_operations")
+        with pool.reader() as second:
+            assert second is first
+        assert len(pool._readers) == 1
+
     def test_log_audit_record(self):
         """测试审计日志记录"""
         operation_id = "test-operation-123"
@@ -183,7 +268,7 @@ class TestIndexUpdater:
             assert row is not None
             assert row[1] == "/test/document.pdf"  # file_path
             assert row[6] == "工作"  # category
-            assert row[7] == '["工作", "项目A"]'  # tags
+            assert json.loads(row[7]) == ["工作", "项目A"]  # tags
 
     def test_update_file_status(self):
         """测试文件状态更新"""
@@ -252,6 +337,51 @@ class TestIndexUpdater:
         assert len(records) >= 1
         assert records[0]["category"] == "工作"
 
+    def test_iter_audit_records(self):
+        """测试逐条迭代审计记录并在关闭后归还连接"""
+        items = [
+            {
+                "move_result": {"primary_target_path": f"/test/file{i}.pdf"},
+                "classification_result": {"primary_category": "工作"},
+            }
+            for i in range(300)
+        ]
+        self.index_updater.update_indexes_batch(items)
+
+        assert len(list(self.index_updater.iter_audit_records())) == 300
+
+        records = self.index_updater.iter_audit_records(category="工作")
+        assert next(records)["category"] == "工作"
+        records.close()
+
+        pool = self.index_updater._pool
+        assert pool.read_conns.qsize() == len(pool._readers)
+
+    def test_audit_queries_use_indexes(self):
+        """测试审计查询使用索引而不是全表扫描和临时排序"""
+        conn = self.index_updater._pool.write_conn
+        queries = self.index_updater._audit_query_sql
+        for (by_path, by_category), sql in queries.items():
+            params = ["/test/a.pdf"] if by_path else []
+            params += ["工作"] if by_category else []
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params + [10])
+            plan = " ".join(row[-1] for row in rows)
+            assert "USING INDEX" in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_tags_stored_as_utf8_json_text(self):
+        """测试标签以未转义中文的 JSON 文本保存"""
+        self.index_updater._update_file_status(
+            {"primary_target_path": "/test/dst/document.pdf"},
+            {"primary_category": "工作", "tags": ["工作", "项目A"]},
+        )
+
+        status = self.index_updater.get_file_status("/test/dst/document.pdf")
+
+        assert isinstance(status["tags"], str)
+        assert "工作" in status["tags"]
+        assert json.loads(status["tags"]) == ["工作", "项目A"]
+
     def test_get_file_status(self):
         """测试文件状态查询"""
         # 创建测试文件并更新状态
@@ -419,3 +549,188 @@ class TestIndexUpdater:
 
         assert result["success"] is False
         assert result["reason"] == "no_embedding"
+
+    def test_vector_store_update_batch(self):
+        """测试批量更新只调用一次 collection.add"""
+        mock_collection = Mock()
+        self.index_updater.set_collection(mock_collection)
+
+        items = [
+            {
+                "move_result": {
+                    "moved": True,
+                    "original_path": f"/test/file{i}.pdf",
+                    "primary_target_path": f"/test/dst/file{i}.pdf",
+                },
+                "document_data": {
+                    "text_content": f"文档{i}",
+                    # 第二个文档没有嵌入向量
+                    "embedding": [0.1 * (i + 1)] * 5 if i != 1 else None,
+                },
+                "classification_result": {
+                    "primary_category": "工作",
+                    "confidence_score": 0.9,
+                    "tags": ["工作"],
+                },
+            }
+            for i in range(3)
+        ]
+
+        results = self.index_updater.update_indexes_batch(items)
+
+        mock_collection.add.assert_called_once()
+        kwargs = mock_collection.add.call_args.kwargs
+        assert len(kwargs["ids"]) == 2
+        assert kwargs["documents"] == ["文档0", "文档2"]
+        assert results[0]["results"]["vector_update"]["success"] is True
+        assert results[1]["results"]["vector_update"]["reason"] == "no_embedding"
+        assert results[2]["results"]["vector_update"]["success"] is True
+
+    def test_vector_buffer_flush(self):
+        """测试向量记录缓冲到 flush_size 后一次写入"""
+        self.config["vector_store"]["flush_size"] = 3
+        self.index_updater.close()
+        self.index_updater = IndexUpdater(self.config)
+        mock_collection = Mock()
+        self.index_updater.set_collection(mock_collection)
+
+        def update(i):
+            return self.index_updater._update_vector_store(
+                {"moved": True, "primary_target_path": f"/test/file{i}.pdf"},
+                {"text_content": f"文档{i}", "embedding": [0.1, 0.2, 0.3]},
+                {"primary_category": "工作", "tags": ["工作"]},
+            )
+
+        assert update(0)["buffered"] is True
+        assert update(1)["buffered"] is True
+        mock_collection.add.assert_not_called()
+
+        assert update(2)["flushed"] == 3
+        mock_collection.add.assert_called_once()
+        assert len(mock_collection.add.call_args.kwargs["ids"]) == 3
+
+        # close 时写入剩余记录
+        update(3)
+        self.index_updater.close()
+        assert mock_collection.add.call_count == 2
+        assert mock_collection.add.call_args.kwargs["documents"] == ["文档3"]
+
+    def test_in_memory_database(self):
+        """测试内存数据库和内存向量库"""
+        config = {
+            "database": {"sqlite_path": ":memory:"},
+            "vector_store": {"collection_name": "test_documents", "ephemeral": True},
+            "llama_index": {"enable": False},
+        }
+        index_updater = IndexUpdater(config)
+        try:
+            result = index_updater.update_indexes(
+                {
+                    "moved": True,
+                    "original_path": "/test/document.pdf",
+                    "primary_target_path": "/test/dst/document.pdf",
+                },
+                {"text_content": "测试内容", "embedding": [0.1, 0.2, 0.3]},
+                {"primary_category": "工作", "confidence_score": 0.9, "tags": []},
+                1.0,
+            )
+
+            assert result["success"] is True
+            assert index_updater.collection.count() == 1
+            assert index_updater.get_statistics()["total_operations"] == 1
+            assert index_updater.get_file_status("/test/dst/document.pdf")
+        finally:
+            index_updater.close()
+
+    def test_async_vector_writes(self):
+        """测试后台写入向量库，close 前全部完成"""
+        self.config["vector_store"]["async_writes"] = True
+        self.index_updater.close()
+        self.index_updater = IndexUpdater(self.config)
+        mock_collection = Mock()
+        self.index_updater.set_collection(mock_collection)
+
+        for i in range(3):
+            result = self.index_updater._update_vector_store(
+                {"moved": True, "primary_target_path": f"/test/file{i}.pdf"},
+                {"text_content": f"文档{i}", "embedding": [0.1, 0.2, 0.3]},
+                {"primary_category": "工作", "tags": ["工作"]},
+            )
+            assert result["pending"] is True
+
+        wait_result = self.index_updater.wait_vector_writes()
+        assert wait_result["success"] is True
+        assert mock_collection.add.call_count == 3
+
+        mock_collection.add.side_effect = RuntimeError("写入失败")
+        self.index_updater._update_vector_store(
+            {"moved": True, "primary_target_path": "/test/file3.pdf"},
+            {"text_content": "文档3", "embedding": [0.1, 0.2, 0.3]},
+            {"primary_category": "工作", "tags": ["工作"]},
+        )
+        assert self.index_updater.wait_vector_writes()["failed"] == 1
+
+        self.index_updater.close()
+        assert self.index_updater._vector_executor is None
+
+    def test_reset(self):
+        """测试清空审计日志、文件状态和向量库"""
+        self.index_updater.update_indexes(
+            {
+                "moved": True,
+                "original_path": "/test/document.pdf",
+                "primary_target_path": "/test/dst/document.pdf",
+            },
+            {"text_content": "测试内容", "embedding": [0.1, 0.2, 0.3]},
+            {"primary_category": "工作", "confidence_score": 0.9, "tags": []},
+            1.0,
+        )
+        assert self.index_updater.collection.count() == 1
+
+        self.index_updater.reset()
+
+        stats = self.index_updater.get_statistics()
+        assert stats["total_operations"] == 0
+        assert stats["total_files"] == 0
+        assert self.index_updater.collection.count() == 0
+
+    def test_embeddings_normalized_before_add(self):
+        """测试整批向量写入前归一化为单位长度"""
+        import numpy as np
+
+        mock_collection = Mock()
+        self.index_updater.set_collection(mock_collection)
+
+        items = [
+            {
+                "move_result": {
+                    "moved": True,
+                    "primary_target_path": f"/test/dst/file{i}.pdf",
+                },
+                "document_data": {"text_content": f"文档{i}", "embedding": vector},
+                "classification_result": {"primary_category": "工作", "tags": []},
+            }
+            for i, vector in enumerate([[3.0, 4.0], [0.0, 0.0]])
+        ]
+        self.index_updater.update_indexes_batch(items)
+
+        embeddings = mock_collection.add.call_args.kwargs["embeddings"]
+        np.testing.assert_allclose(embeddings, [[0.6, 0.8], [0.0, 0.0]], rtol=1e-6)
+
+    def test_analyze_after_interval(self):
+        """测试审计写入达到间隔后刷新统计信息"""
+        from ods.storage import index_updater as module
+
+        with patch.object(module, "ANALYZE_INTERVAL", 2):
+            items = [
+                {
+                    "move_result": {"primary_target_path": f"/test/file{i}.pdf"},
+                    "classification_result": {"primary_category": "工作"},
+                }
+                for i in range(3)
+            ]
+            self.index_updater.update_indexes_batch(items)
+
+        with sqlite3.connect(self.config["database"]["sqlite_path"]) as conn:
+            tables = [row[0] for row in conn.execute("SELECT tbl FROM sqlite_stat1")]
+        assert "file_operations" in tables
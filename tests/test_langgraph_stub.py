@@ -0,0 +1,38 @@
+"""
+langgraph 测试桩的图编译测试
+"""
+
+import pytest
+
+from langgraph.graph import END, StateGraph
+
+
+class TestStateGraph:
+    """状态图测试"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.graph = StateGraph(dict)
+        for name in ("parse", "embed", "classify", "rules", "move"):
+            self.graph.add_node(name, lambda state: state)
+        self.graph.set_entry_point("parse")
+        self.graph.add_edge("parse", "embed")
+        self.graph.add_edge("parse", "rules")
+        self.graph.add_edge("embed", "classify")
+        self.graph.add_edge("classify", "rules")
+        self.graph.add_edge("rules", "move")
+        self.graph.add_edge("move", END)
+
+    def test_compile_freezes_graph(self):
+        """测试编译后邻接表为元组、节点表只读"""
+        compiled = self.graph.compile()
+
+        assert compiled.edges["parse"] == ("embed", "rules")
+        with pytest.raises(TypeError):
+            compiled.nodes["extra"] = lambda state: state
+
+    def test_compile_topological_order(self):
+        """测试编译后的节点顺序满足依赖关系且不含 END"""
+        order = self.graph.compile()._node_order
+
+        assert order == ("parse", "embed", "classify", "rules", "move")
@@ -6,6 +6,7 @@
 
 import pytest
 import tempfile
+from collections.abc import Mapping
 from pathlib import Path
 
 from ods.parsers.document_parser import DocumentParser
@@ -88,6 +89,37 @@ class TestDocumentParser:
         finally:
             Path(temp_path).unlink()
 
+    def test_parse_batch_preserves_order(self, parser, tmp_path):
+        """测试并发批量解析按输入顺序返回结果"""
+        paths = []
+        for i in range(6):
+            path = tmp_path / f"doc{i}.txt"
+            path.write_text(f"第{i}号文档的内容。", encoding="utf-8")
+            paths.append(str(path))
+        paths.insert(3, str(tmp_path / "missing.txt"))
+
+        results = parser.parse_batch(paths)
+
+        assert [r.file_path for r in results] == paths
+        assert not results[3].success
+        assert all(r.success for i, r in enumerate(results) if i != 3)
+        assert "第5号文档" in results[6].text
+
+    def test_parse_batch_process_pool(self, config, tmp_path):
+        """测试 CPU 密集文件交给进程池解析"""
+        config["parser"]["process_workers"] = 1
+        parser = DocumentParser(config)
+        text_path = tmp_path / "note.txt"
+        text_path.write_text("普通文本", encoding="utf-8")
+        pdf_path = tmp_path / "broken.pdf"
+        pdf_path.write_bytes(b"not a pdf")
+
+        results = parser.parse_batch([str(pdf_path), str(text_path)])
+
+        assert results[0].file_path == str(pdf_path)
+        assert not results[0].success
+        assert results[1].success
+
     def test_unsupported_file(self, parser):
         """测试不支持的文件类型"""
         with tempfile.NamedTemporaryFile(suffix=".unknown", delete=False) as f:
@@ -113,10 +145,17 @@ class TestDocumentParser:
         """测试解析器信息"""
         info = parser.get_parser_info()
 
-        assert isinstance(info, dict)
+        assert isinstance(info, Mapping)
         assert "available_parsers" in info
         assert "supported_extensions" in info
-        assert isinstance(info["supported_extensions"], list)
+        assert isinstance(info["supported_extensions"], tuple)
+        assert parser.get_parser_info() is info
+
+        # 只读视图，调用方无法修改后续调用的结果
+        with pytest.raises(TypeError):
+            info["ocr_fallback"] = None
+        with pytest.raises(TypeError):
+            info["parser_extensions"]["text"] = ()
 
 
 class TestTextParser:
@@ -160,6 +199,12 @@ class TestTextParser:
         finally:
             Path(temp_path).unlink()
 
+    def test_invalid_json_metadata(self, text_parser):
+        """测试无效JSON的元数据标记"""
+        metadata = text_parser._extract_json_metadata('{"name": ')
+
+        assert metadata == {"json_valid": False}
+
     def test_python_file_parsing(self, text_parser):
         """测试Python文件解析"""
         python_content = '''#!/usr/bin/env python3
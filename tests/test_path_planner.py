@@ -5,6 +5,7 @@ import os
 from pathlib import Path
 from unittest.mock import Mock, patch
 import yaml
+from datetime import datetime
 
 from ods.path_planner.path_planner import PathPlanner
 
@@ -146,6 +147,20 @@ class TestPathPlanner:
         assert "month" in variables
         assert "date" in variables
 
+    def test_get_template_variables_cached_per_second(self):
+        """测试同一秒内的日期变量只计算一次，且元数据不会污染缓存"""
+        from ods.path_planner import path_planner as module
+
+        module._date_variables.cache_clear()
+        with patch.object(module.time, "time", return_value=1704067200.5):
+            first = self.path_planner._get_template_variables("工作", {"year": "x"})
+            second = self.path_planner._get_template_variables("个人", {})
+
+        assert first["year"] == "x"
+        assert second["year"] == datetime.fromtimestamp(1704067200).strftime("%Y")
+        assert second["category"] == "个人"
+        assert module._date_variables.cache_info().hits == 1
+
     def test_apply_path_template(self):
         """测试路径模板应用"""
         template = "{category}/{year}/{month}"
@@ -155,6 +170,19 @@ class TestPathPlanner:
 
         assert result == "工作/2024/01"
 
+    def test_apply_path_template_unknown_variable(self):
+        """测试未知变量原样保留，模板只拆分一次"""
+        template = "{category}/{project}/{year}"
+        variables = {"category": "工作", "year": 2024}
+
+        assert (
+            self.path_planner._apply_path_template(template, variables)
+            == "工作/{project}/2024"
+        )
+        parts = self.path_planner._compiled_templates[template]
+        self.path_planner._apply_path_template(template, variables)
+        assert self.path_planner._compiled_templates[template] is parts
+
     def test_plan_link_paths(self):
         """测试链接路径规划"""
         tags = ["工作", "项目A", "重要"]
@@ -204,6 +232,19 @@ class TestPathPlanner:
         finally:
             conflict_file.unlink()
 
+    def test_resolve_conflict_with_suffix_skips_taken_names(self, tmp_path):
+        """测试后缀递增时跳过已存在的候选名，只扫描一次目录"""
+        for name in ("document.pdf", "document_1.pdf", "document_2.pdf"):
+            (tmp_path / name).write_text("test")
+
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            result = self.path_planner._resolve_conflict_with_suffix(
+                str(tmp_path / "document.pdf")
+            )
+
+        assert result == str(tmp_path / "document_3.pdf")
+        assert mock_scandir.call_count == 1
+
     def test_resolve_conflict_with_timestamp(self):
         """测试时间戳冲突解决"""
         path = "test_output/工作/document.pdf"
@@ -248,6 +289,42 @@ class TestPathPlanner:
         assert Path("test_output/工作/2024/01").exists()
         assert Path("test_output/项目A/链接").exists()
 
+    def test_create_directory_structure_dedupes(self):
+        """测试重复目录和祖先目录只创建一次"""
+        from unittest.mock import patch
+
+        path_plan = {
+            "primary_path": "test_output/工作/2024/01/document.pdf",
+            "link_paths": [
+                {"link_path": "test_output/工作/2024/01/copy.pdf"},
+                {"link_path": "test_output/工作/2024/readme.pdf"},
+                {"link_path": "test_output/项目A/链接/document.pdf"},
+            ],
+        }
+
+        created = []
+        original_mkdir = Path.mkdir
+        depth = [0]
+
+        def record_mkdir(path, *args, **kwargs):
+            # parents=True 时 mkdir 会递归创建父目录，只记录最外层调用
+            if depth[0] == 0:
+                created.append(path)
+            depth[0] += 1
+            try:
+                return original_mkdir(path, *args, **kwargs)
+            finally:
+                depth[0] -= 1
+
+        with patch.object(Path, "mkdir", record_mkdir):
+            assert self.path_planner.create_directory_structure(path_plan) is True
+
+        assert sorted(created) == sorted(
+            [Path("test_output/工作/2024/01"), Path("test_output/项目A/链接")]
+        )
+        assert Path("test_output/工作/2024/01").exists()
+        assert Path("test_output/项目A/链接").exists()
+
     def test_validate_path_plan(self):
         """测试路径规划验证"""
         # 有效的路径规划
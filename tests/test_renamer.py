@@ -162,6 +162,25 @@ class TestRenamer:
         template = self.renamer._select_naming_template("其他", document_info)
         assert template == "{{category}}-{{title}}.pdf"
 
+    def test_select_naming_template_cache_invalidation(self):
+        """测试添加、移除模板后重新选择模板"""
+        document_info = {"ext": "pdf"}
+        template = "{{category}}-{{title}}.{{ext}}"
+
+        assert (
+            self.renamer._select_naming_template("测试类别", document_info)
+            == self.renamer.default_template
+        )
+
+        self.renamer.add_naming_template("测试类别", template)
+        assert self.renamer._select_naming_template("测试类别", document_info) == template
+
+        self.renamer.remove_naming_template("测试类别")
+        assert (
+            self.renamer._select_naming_template("测试类别", document_info)
+            == self.renamer.default_template
+        )
+
     def test_apply_naming_template(self):
         """测试命名模板应用"""
         template = "{{category}}-{{title}}-{{date}}.{{ext}}"
@@ -176,6 +195,22 @@ class TestRenamer:
 
         assert result == "工作-项目计划书-20240101.pdf"
 
+    def test_template_compiled_once(self):
+        """测试相同模板只编译一次"""
+        template = "{{category}}-{{title}}.{{ext}}"
+        document_info = {"category": "工作", "title": "报告", "ext": "pdf"}
+
+        with patch.object(
+            self.renamer.jinja_env,
+            "from_string",
+            wraps=self.renamer.jinja_env.from_string,
+        ) as from_string:
+            for _ in range(3):
+                result = self.renamer._apply_naming_template(template, document_info)
+
+        assert result == "工作-报告.pdf"
+        from_string.assert_called_once_with(template)
+
     def test_simple_template_replace(self):
         """测试简单模板替换"""
         template = "{{category}}-{{title}}-{{date}}.{{ext}}"
@@ -212,6 +247,21 @@ class TestRenamer:
         result = self.renamer._clean_filename("   ")
         assert result == "未命名文件"
 
+    def test_clean_filename_translate_matches_regex(self):
+        """测试字符类走 str.translate，且结果与正则一致"""
+        import re
+
+        assert self.renamer._clean_table is not None
+        filename = 'a<b>c:d"e/f\\g|h?i*j.pdf'
+        expected = re.sub(self.renamer.invalid_chars, "_", filename)
+        assert self.renamer._clean_filename(filename) == expected
+
+        # 无法转换为映射表的正则回退到 re.sub
+        config = {"naming": {"invalid_chars": r"[^\w.]", "replacement_char": "-"}}
+        renamer = Renamer(config)
+        assert renamer._clean_table is None
+        assert renamer._clean_filename("a b.pdf") == "a-b.pdf"
+
     def test_truncate_filename(self):
         """测试文件名截断"""
         # 测试正常长度文件名
@@ -225,6 +275,16 @@ class TestRenamer:
         assert len(result) <= self.renamer.max_filename_length
         assert result.endswith(".pdf")
 
+    def test_truncate_filename_utf8_bytes(self):
+        """测试中文文件名按 UTF-8 字节数截断"""
+        # 150 个汉字未超过字符数限制，但有 450 字节
+        filename = "测" * 150 + ".pdf"
+        result = self.renamer._truncate_filename(filename)
+
+        assert len(result.encode("utf-8")) <= self.renamer.max_filename_bytes
+        assert result.endswith(".pdf")
+        assert result.startswith("测" * 80)
+
     def test_build_new_path(self):
         """测试新路径构建"""
         primary_path = "test_output/工作/document.pdf"
@@ -264,6 +324,17 @@ class TestRenamer:
         finally:
             conflict_file.unlink()
 
+    def test_resolve_filename_conflict_skips_existing_suffixes(self):
+        """测试后缀冲突解决跳过已存在的编号"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ["document.pdf", "document_1.pdf", "document_2.pdf"]:
+                (Path(temp_dir) / name).write_text("test")
+
+            path = str(Path(temp_dir) / "document.pdf")
+            result = self.renamer._resolve_filename_conflict_with_suffix(path)
+
+            assert result == str(Path(temp_dir) / "document_3.pdf")
+
     def test_resolve_filename_conflict_with_timestamp(self):
         """测试时间戳文件名冲突解决"""
         path = "test_output/工作/document.pdf"
@@ -21,6 +21,8 @@ from ods.utils.file_utils import (
     is_binary_file,
     copy_file_safe,
     move_file_safe,
+    load_yaml_cached,
+    yaml_cache_path,
 )
 
 from ods.utils.text_utils import (
@@ -35,6 +37,8 @@ from ods.utils.text_utils import (
     get_text_statistics,
     find_text_patterns,
     replace_text_patterns,
+    extract_json_object,
+    scan_json_object,
 )
 
 
@@ -180,6 +184,68 @@ class TestFileUtils:
         # 测试不存在的源文件
         assert move_file_safe("nonexistent.txt", dest_file) is False
 
+    def test_load_yaml_cached(self):
+        """测试 YAML 解析结果的缓存与失效"""
+        yaml_file = os.path.join(self.temp_dir, "rules.yaml")
+        with open(yaml_file, "w", encoding="utf-8") as f:
+            f.write("parser:\n  max_workers: 4\n")
+
+        assert load_yaml_cached(yaml_file) == {"parser": {"max_workers": 4}}
+        assert os.path.exists(yaml_cache_path(yaml_file))
+        assert load_yaml_cached(yaml_file) == {"parser": {"max_workers": 4}}
+
+        # 文件变化后缓存失效
+        with open(yaml_file, "w", encoding="utf-8") as f:
+            f.write("parser:\n  max_workers: 8\n  process_workers: 2\n")
+        assert load_yaml_cached(yaml_file) == {
+            "parser": {"max_workers": 8, "process_workers": 2}
+        }
+
+    def test_load_yaml_cached_in_process(self):
+        """测试进程内缓存命中时不再读取文件，且返回独立的对象"""
+        from unittest.mock import patch
+
+        yaml_file = os.path.join(self.temp_dir, "memo.yaml")
+        with open(yaml_file, "w", encoding="utf-8") as f:
+            f.write("parser:\n  max_workers: 4\n")
+
+        first = load_yaml_cached(yaml_file)
+        with patch("builtins.open", side_effect=AssertionError("不应读取文件")):
+            with patch("pathlib.Path.read_bytes", side_effect=AssertionError):
+                second = load_yaml_cached(yaml_file)
+
+        assert second == first
+        second["parser"]["max_workers"] = 8
+        assert load_yaml_cached(yaml_file) == {"parser": {"max_workers": 4}}
+
+    def test_load_yaml_cached_sidecar_written_atomically(self):
+        """测试缓存文件写入后目录中不残留临时文件"""
+        yaml_file = os.path.join(self.temp_dir, "atomic.yaml")
+        with open(yaml_file, "w", encoding="utf-8") as f:
+            f.write("naming:\n  max_filename_bytes: 255\n")
+
+        load_yaml_cached(yaml_file)
+
+        names = [n for n in os.listdir(self.temp_dir) if n.startswith("atomic")]
+        assert sorted(names) == ["atomic.yaml", "atomic.yaml.cache.json"]
+
+    def test_load_yaml_cached_utf8_bom(self):
+        """测试以二进制读取时正确处理 UTF-8 BOM 和中文内容"""
+        yaml_file = os.path.join(self.temp_dir, "bom.yaml")
+        with open(yaml_file, "wb") as f:
+            f.write("\ufeff类别:\n  - 工作\n  - 财务\n".encode("utf-8"))
+
+        assert load_yaml_cached(yaml_file) == {"类别": ["工作", "财务"]}
+
+    def test_load_yaml_cached_skips_non_json_data(self):
+        """测试无法用 JSON 无损表示的 YAML 不写入缓存"""
+        yaml_file = os.path.join(self.temp_dir, "keys.yaml")
+        with open(yaml_file, "w", encoding="utf-8") as f:
+            f.write("1: one\n2: two\n")
+
+        assert load_yaml_cached(yaml_file) == {1: "one", 2: "two"}
+        assert not os.path.exists(yaml_cache_path(yaml_file))
+
 
 class TestTextUtils:
     """文本工具函数测试"""
@@ -324,6 +390,22 @@ class TestTextUtils:
         assert "test@example.com" not in result
         assert "138-0013-8000" not in result
 
+    def test_extract_json_object(self):
+        """测试提取第一个括号配平的JSON对象"""
+        text = '结果如下 {"a": {"b": "含}和{的字符串"}, "c": "\\"}"} 以上 {其他}'
+        assert extract_json_object(text) == '{"a": {"b": "含}和{的字符串"}, "c": "\\"}"}'
+
+        assert extract_json_object("没有JSON") is None
+        assert extract_json_object('{"未闭合": 1') is None
+
+    def test_scan_json_object_incremental(self):
+        """测试分段扫描时状态跨段保留"""
+        state = (0, False, False)
+        state, end = scan_json_object(state, '{"k": "a\\')
+        assert end == -1
+        state, end = scan_json_object(state, '"}"}尾')
+        assert end == 3
+
 
 class TestUtilsIntegration:
     """工具函数集成测试"""